@@ -0,0 +1,81 @@
+"""History analytics benchmark.
+
+Builds HistoryStats over synthetic histories of several sizes and reports:
+
+- full build with NumPy (when installed) and in plain Python
+- add() of one more session, which is what finishing a workout costs
+- summary() and recent_weeks(), what redrawing the Stats tab costs
+
+Run from the repository root:
+
+    python benchmarks/bench_analytics.py
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hiit_analytics
+from hiit_analytics import HistoryStats
+
+WORKOUTS = [
+    (8, [{"name": "Work", "duration": 20}, {"name": "Rest", "duration": 10}]),
+    (3, [{"name": "Squats", "duration": 40}, {"name": "Push-ups", "duration": 30}, {"name": "Rest", "duration": 20}]),
+    (1, [{"name": "Run", "duration": 1200}, {"name": "Walk", "duration": 300}]),
+]
+
+
+def make_history(count, seed=1):
+    rng = random.Random(seed)
+    day = datetime(2015, 1, 1, 7, 30)
+    entries = []
+    for _ in range(count):
+        day += timedelta(hours=rng.choice([12, 24, 24, 36, 72]))
+        sets, reps = rng.choice(WORKOUTS)
+        entries.append({"date": day.isoformat(), "sets": sets, "reps": reps, "total_time": rng.randrange(200, 2000)})
+    return entries
+
+
+def best_ms(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return round(1000 * best, 3)
+
+
+def run_benchmark(sizes=(1000, 10000, 100000), repeat=3, adds=1000):
+    results = {"numpy": hiit_analytics.np is not None}
+    for size in sizes:
+        entries = make_history(size)
+        extra = make_history(size + adds)[size:]
+        result = {"build_python_ms": best_ms(lambda: HistoryStats(entries, vectorized=False), repeat)}
+        if hiit_analytics.np is not None:
+            result["build_numpy_ms"] = best_ms(lambda: HistoryStats(entries, vectorized=True), repeat)
+        stats = HistoryStats(entries)
+        start = time.perf_counter()
+        for entry in extra:
+            stats.add(entry)
+        result["add_us"] = round(1e6 * (time.perf_counter() - start) / adds, 3)
+        result["summary_ms"] = best_ms(lambda: (stats.summary(), stats.recent_weeks(8), stats.top_exercises(10)), repeat)
+        results[str(size)] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.sizes, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
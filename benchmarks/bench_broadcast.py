@@ -0,0 +1,174 @@
+"""Broadcast fan-out benchmark, entirely over localhost.
+
+Starts a BroadcastServer on 127.0.0.1, connects simulated WebSocket clients
+(most reading as fast as they can, some barely reading with tiny socket
+buffers) and publishes state deltas from a separate thread, as the timer
+would. Reports:
+
+- delivery latency from publish() to each fast client, and any gaps in the
+  sequence numbers they saw
+- how slow clients were resynced with snapshots instead of queueing
+- how long publish() itself takes, i.e. whether clients can stall the timer
+
+Run from the repository root:
+
+    python benchmarks/bench_broadcast.py
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hiit_broadcast import OP_TEXT, BroadcastServer, accept_key, read_frame
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class SimClient:
+    def __init__(self, slow=False):
+        self.slow = slow
+        self.latencies = []
+        self.snapshots = 0
+        self.deltas = 0
+        self.gaps = 0
+        self.last_seq = None
+        
+    async def connect(self, port):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if self.slow:
+            # A phone on bad Wi-Fi: hardly any buffering on the way
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 2048)
+        sock.connect(("127.0.0.1", port))
+        sock.setblocking(False)
+        # A small stream limit stops the reader from slurping the socket dry
+        reader, writer = await asyncio.open_connection(sock=sock, limit=2048 if self.slow else 1 << 20)
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        writer.write((
+            "GET / HTTP/1.1\r\n"
+            f"Host: 127.0.0.1:{port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        ).encode("ascii"))
+        response = await reader.readuntil(b"\r\n\r\n")
+        if accept_key(key).encode("ascii") not in response:
+            raise RuntimeError("bad handshake")
+        self.reader, self.writer = reader, writer
+        
+    async def listen(self):
+        try:
+            while True:
+                opcode, payload = await read_frame(self.reader, max_size=1 << 20)
+                if opcode != OP_TEXT:
+                    continue
+                received = time.perf_counter()
+                message = json.loads(payload)
+                if message["t"] == "s":
+                    self.snapshots += 1
+                else:
+                    self.deltas += 1
+                    if self.last_seq is not None and message["seq"] != self.last_seq + 1:
+                        self.gaps += 1
+                    if "sent_at" in message:
+                        self.latencies.append(received - message["sent_at"])
+                self.last_seq = message["seq"]
+                if self.slow:
+                    await asyncio.sleep(0.5)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+
+def publisher(server, count, rate, padding, call_times):
+    interval = 1.0 / rate
+    next_at = time.perf_counter()
+    for i in range(count):
+        # Only changed keys are sent, so the padding has to change too
+        state = {"state": "running", "name": "Work", "remaining": count - i, "pad": f"{i:0{padding}d}"}
+        state["sent_at"] = time.perf_counter()
+        server.publish(state)
+        call_times.append(time.perf_counter() - state["sent_at"])
+        next_at += interval
+        time.sleep(max(0.0, next_at - time.perf_counter()))
+
+
+async def run_clients(port, fast, slow, messages, rate, padding, server):
+    clients = [SimClient() for _ in range(fast)] + [SimClient(slow=True) for _ in range(slow)]
+    for client in clients:
+        await client.connect(port)
+    tasks = [asyncio.ensure_future(client.listen()) for client in clients]
+    await asyncio.sleep(0.2)
+    
+    call_times = []
+    thread = threading.Thread(target=publisher, args=(server, messages, rate, padding, call_times))
+    thread.start()
+    while thread.is_alive():
+        await asyncio.sleep(0.05)
+    # Give fast clients a moment to drain the last messages
+    await asyncio.sleep(0.5)
+    stats = server.stats()
+    for task in tasks:
+        task.cancel()
+    for client in clients:
+        client.writer.close()
+    return clients, call_times, stats
+
+
+def run_benchmark(fast=200, slow=20, messages=200, rate=20, padding=200, queue_size=16):
+    server = BroadcastServer("127.0.0.1", 0, queue_size=queue_size).start()
+    try:
+        clients, call_times, stats = asyncio.run(run_clients(server.port, fast, slow, messages, rate, padding, server))
+    finally:
+        server.stop()
+    fast_clients = [client for client in clients if not client.slow]
+    slow_clients = [client for client in clients if client.slow]
+    latencies = [latency for client in fast_clients for latency in client.latencies]
+    return {
+        "clients": {"fast": fast, "slow": slow},
+        "published": messages,
+        "rate_hz": rate,
+        "fast": {
+            "deltas_received_min": min((client.deltas for client in fast_clients), default=0),
+            "gaps": sum(client.gaps for client in fast_clients),
+            "latency_p50_ms": round(1000 * percentile(latencies, 0.5), 3),
+            "latency_p95_ms": round(1000 * percentile(latencies, 0.95), 3),
+            "latency_max_ms": round(1000 * max(latencies, default=0.0), 3),
+        },
+        "slow": {
+            "frames_received_max": max((client.deltas + client.snapshots for client in slow_clients), default=0),
+            "snapshots_received": sum(client.snapshots for client in slow_clients),
+        },
+        "publish_call_us": {
+            "p50": round(1e6 * percentile(call_times, 0.5), 2),
+            "max": round(1e6 * max(call_times, default=0.0), 2),
+        },
+        "server": stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fast", type=int, default=200, help="clients reading as fast as they can")
+    parser.add_argument("--slow", type=int, default=20, help="clients reading one message every 0.5s")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=20, help="published deltas per second")
+    parser.add_argument("--padding", type=int, default=200, help="extra bytes per delta")
+    parser.add_argument("--queue-size", type=int, default=16)
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.fast, args.slow, args.messages, args.rate, args.padding, args.queue_size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Timer drift benchmark.
+
+Simulates a 60-minute, 500-segment workout with pauses on a virtual clock
+whose sleeps overshoot and whose UI dispatch takes time, then reports how far
+the timer's idea of elapsed workout time strays from the true active time.
+The legacy sleep(1)-and-decrement loop is run against the same conditions
+for comparison.
+
+Run from the repository root:
+
+    python benchmarks/bench_drift.py
+"""
+import argparse
+import heapq
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hiit_engine import COMPLETE_EVENT, TICK, WorkoutEngine
+
+# 100 rounds of these segments give 500 segments and exactly 3600 seconds
+SEGMENT_PATTERN = [10, 5, 8, 6, 7]
+
+
+class SimClock:
+    """Virtual monotonic clock with sleep overshoot and timed callbacks."""
+    
+    def __init__(self, rng, jitter=0.004, jitter_max=0.030):
+        self.now = 0.0
+        self.rng = rng
+        self.jitter = jitter
+        self.jitter_max = jitter_max
+        self._events = []
+        self._seq = 0
+        
+    def __call__(self):
+        return self.now
+        
+    def at(self, when, callback):
+        heapq.heappush(self._events, (when, self._seq, callback))
+        self._seq += 1
+        
+    def overshoot(self):
+        return min(self.rng.expovariate(1 / self.jitter), self.jitter_max)
+        
+    def sleep(self, seconds):
+        self.advance(max(seconds, 0.0) + self.overshoot())
+        
+    def advance(self, seconds):
+        target = self.now + seconds
+        while self._events and self._events[0][0] <= target:
+            when, _, callback = heapq.heappop(self._events)
+            self.now = max(self.now, when)
+            callback()
+        self.now = target
+
+
+def make_pauses(rng, total, count):
+    # (start, length) pairs in true active time, spread over the workout
+    pauses = []
+    for start in sorted(rng.uniform(60, total - 60) for _ in range(count)):
+        pauses.append((start, rng.uniform(3, 45)))
+    return pauses
+
+
+class ActiveTime:
+    """Ground truth: wall time minus the real pause intervals."""
+    
+    def __init__(self):
+        self.intervals = []
+        
+    def begin(self, now):
+        self.intervals.append([now, None])
+        
+    def end(self, now):
+        self.intervals[-1][1] = now
+        
+    def at(self, now):
+        paused = 0.0
+        for start, end in self.intervals:
+            if start >= now:
+                break
+            paused += min(end if end is not None else now, now) - start
+        return now - paused
+
+
+def schedule_pauses(clock, truth, pauses, on_pause, on_resume):
+    # Pauses are placed on the wall clock by accumulating earlier pause lengths
+    offset = 0.0
+    for start, length in pauses:
+        begin = start + offset
+        
+        def pause(begin=begin):
+            truth.begin(clock.now)
+            on_pause()
+            
+        def resume():
+            truth.end(clock.now)
+            on_resume()
+            
+        clock.at(begin, pause)
+        clock.at(begin + length, resume)
+        offset += length
+
+
+def run_legacy(durations, pauses, seed, dispatch):
+    rng = random.Random(seed)
+    clock = SimClock(rng)
+    truth = ActiveTime()
+    state = {"paused": False}
+    schedule_pauses(clock, truth, pauses,
+                    lambda: state.update(paused=True),
+                    lambda: state.update(paused=False))
+    total_elapsed = 0
+    worst = 0.0
+    for duration in durations:
+        time_remaining = duration
+        while time_remaining > 0:
+            if not state["paused"]:
+                # root.after(0, update_display) renders the counter
+                worst = max(worst, abs(total_elapsed - truth.at(clock.now)))
+                clock.sleep(1)
+                time_remaining -= 1
+                total_elapsed += 1
+            else:
+                clock.sleep(0.1)
+        # root.after(0, start_current_rep) before the next thread starts
+        clock.advance(rng.uniform(*dispatch))
+    return worst, truth.at(clock.now)
+
+
+def run_deadline(durations, pauses, seed, dispatch, tick_interval=1.0):
+    # The engine never waits on the UI, so dispatch latency does not apply
+    rng = random.Random(seed)
+    clock = SimClock(rng)
+    truth = ActiveTime()
+    reps = [{"name": f"Segment {i + 1}", "duration": d} for i, d in enumerate(durations)]
+    engine = WorkoutEngine(reps, 1, clock=clock, sleep=clock.sleep, tick_interval=tick_interval)
+    schedule_pauses(clock, truth, pauses, engine.pause, engine.resume)
+    stats = {"worst": 0.0, "late": 0.0, "finish": None}
+    
+    def on_event(event):
+        if event.kind == TICK:
+            stats["worst"] = max(stats["worst"], abs(engine.elapsed() - truth.at(clock.now)))
+            stats["late"] = max(stats["late"], (event.duration - event.remaining) % tick_interval)
+        elif event.kind == COMPLETE_EVENT:
+            stats["finish"] = truth.at(clock.now)
+            
+    engine.subscribe(on_event)
+    engine.run()
+    return stats["worst"], stats["finish"], stats["late"]
+
+
+def run_benchmark(segments=500, pause_count=8, seed=1, dispatch=(0.001, 0.015)):
+    rounds = -(-segments // len(SEGMENT_PATTERN))
+    durations = (SEGMENT_PATTERN * rounds)[:segments]
+    planned = float(sum(durations))
+    pauses = make_pauses(random.Random(seed), planned, pause_count)
+    
+    results = {
+        "segments": len(durations),
+        "planned_s": planned,
+        "pauses": len(pauses),
+        "paused_s": round(sum(length for _, length in pauses), 3),
+    }
+    for name, runner in (("legacy", run_legacy), ("deadline", run_deadline)):
+        worst, active_at_finish, *late = runner(durations, pauses, seed, dispatch)
+        results[name] = {
+            "worst_case_drift_s": round(worst, 4),
+            "cumulative_drift_s": round(active_at_finish - planned, 4),
+        }
+        if late:
+            results[name]["worst_tick_lateness_s"] = round(late[0], 4)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, default=500)
+    parser.add_argument("--pauses", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.segments, args.pauses, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
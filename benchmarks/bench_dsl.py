@@ -0,0 +1,90 @@
+"""Structured program benchmark.
+
+Builds day-long programs and compares a ProgramTimeline, which computes
+segments from the program tree, with the same intervals typed out as a flat
+reps list in a WorkoutTimeline. Reports for each:
+
+- build time and tracemalloc memory
+- total duration (what preview and remaining time need)
+- segment(i) and index_at(t) lookups at random points, as seeking does
+
+Run from the repository root:
+
+    python benchmarks/bench_dsl.py
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hiit_dsl import ProgramTimeline, expand
+from hiit_timeline import WorkoutTimeline
+
+PROGRAMS = {
+    # 24 hours of 25s run / 5s walk
+    "endurance_24h": {"repeat": 2880, "do": [{"name": "Run", "duration": 25}, {"name": "Walk", "duration": 5}]},
+    # Nested circuit with rest that shrinks every round, then pyramids
+    "circuits_24h": {"repeat": 43, "do": [
+        {"repeat": 20, "do": [
+            {"name": "Squats", "duration": 40},
+            {"name": "Rest", "duration": 40, "step": -2, "min": 10},
+        ]},
+        {"pyramid": "Burpees", "from": 10, "to": 60, "step": 10, "rest": 15},
+        {"emom": 4, "work": [{"name": "Swings", "duration": 40}, {"name": "Push-ups", "duration": 30}]},
+    ]},
+}
+
+
+def measure(build, lookups, rng):
+    tracemalloc.start()
+    start = time.perf_counter()
+    timeline = build()
+    built = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    indexes = [rng.randrange(len(timeline)) for _ in range(lookups)]
+    times = [rng.uniform(0, timeline.total) for _ in range(lookups)]
+    start = time.perf_counter()
+    for i in indexes:
+        timeline.segment(i)
+    segment_us = 1e6 * (time.perf_counter() - start) / lookups
+    start = time.perf_counter()
+    for t in times:
+        timeline.index_at(t)
+    index_us = 1e6 * (time.perf_counter() - start) / lookups
+    return timeline, {
+        "build_ms": round(1000 * built, 3),
+        "memory_kb": round(memory / 1024, 1),
+        "segment_us": round(segment_us, 3),
+        "index_at_us": round(index_us, 3),
+    }
+
+
+def run_benchmark(lookups=20000, seed=1):
+    results = {}
+    for name, program in PROGRAMS.items():
+        program_timeline, lazy = measure(lambda: ProgramTimeline(program), lookups, random.Random(seed))
+        _, flat = measure(lambda: WorkoutTimeline(list(expand(program)), 1), lookups, random.Random(seed))
+        results[name] = {
+            "intervals": len(program_timeline),
+            "total_s": program_timeline.total,
+            "program": lazy,
+            "flat_reps": flat,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.lookups), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Write-behind persistence benchmark.
+
+Times what the Tk thread pays for saving, with fsync on, when it writes
+itself and when the writes go to a WriteBehind queue:
+
+- save_settings repeated quickly, as toggling dark mode does, and how
+  many files were actually written once the queue drained
+- appending sessions to the history store
+- saving workouts to the library
+
+Point --dir at the SD card (or other slow disk) to see the difference
+that matters on a kiosk; on a tmpfs both sides are fast.
+
+Run from the repository root:
+
+    python benchmarks/bench_persist.py
+    python benchmarks/bench_persist.py --dir /media/sdcard/bench
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hiit_persist
+from hiit_history_store import HistoryStore
+from hiit_library import WorkoutStore
+from hiit_persist import WriteBehind
+from hiit_storage import atomic_write
+
+REPS = [{"name": "Work", "duration": 20}, {"name": "Rest", "duration": 10}]
+
+
+def caller_ms(fn, count):
+    """(mean, max) milliseconds per call of fn(i) on the calling thread."""
+    worst = 0.0
+    start = time.perf_counter()
+    for i in range(count):
+        t = time.perf_counter()
+        fn(i)
+        worst = max(worst, time.perf_counter() - t)
+    return round(1000 * (time.perf_counter() - start) / count, 3), round(1000 * worst, 3)
+
+
+def settings(i):
+    return json.dumps({"dark_mode": bool(i % 2), "tick_hz": 20, "max_fps": 30, "broadcast": None}, indent=2)
+
+
+def entry(i):
+    return {"date": f"2024-01-01T{i % 24:02d}:{i % 60:02d}:00", "sets": 8, "reps": REPS, "total_time": 240}
+
+
+def run_case(directory, name, count, writer):
+    path = os.path.join(directory, name)
+    os.makedirs(path)
+    results = {}
+    writes = [0]
+    
+    def counted(target, data, fsync=True):
+        writes[0] += 1
+        atomic_write(target, data, fsync)
+        
+    settings_file = os.path.join(path, "settings.json")
+    if writer is None:
+        results["settings_ms"], results["settings_max_ms"] = caller_ms(lambda i: counted(settings_file, settings(i)), count)
+    else:
+        hiit_persist.atomic_write = counted
+        try:
+            results["settings_ms"], results["settings_max_ms"] = caller_ms(lambda i: writer.replace(settings_file, settings(i)), count)
+            writer.flush()
+        finally:
+            hiit_persist.atomic_write = atomic_write
+    results["settings_files_written"] = writes[0]
+    
+    history = HistoryStore(os.path.join(path, "history.jsonl"), os.path.join(path, "history.json"), writer=writer).open()
+    results["history_append_ms"], results["history_append_max_ms"] = caller_ms(lambda i: history.append(entry(i)), count)
+    library = WorkoutStore(os.path.join(path, "workouts.json"), writer=writer)
+    results["workout_save_ms"], results["workout_save_max_ms"] = caller_ms(
+        lambda i: library.put({"name": f"Workout {i}", "sets": 8, "reps": REPS}), count)
+    if writer is not None:
+        start = time.perf_counter()
+        writer.close()
+        results["drain_ms"] = round(1000 * (time.perf_counter() - start), 3)
+    return results
+
+
+def run_benchmark(count=50, directory=None):
+    base = tempfile.mkdtemp(prefix="hiit-persist-", dir=directory)
+    try:
+        return {
+            "count": count,
+            "directory": base,
+            "sync": run_case(base, "sync", count, None),
+            "write_behind": run_case(base, "write_behind", count, WriteBehind()),
+        }
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=50, help="saves of each kind")
+    parser.add_argument("--dir", help="directory to write in (default: the system temp directory)")
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.count, args.dir), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Profile startup and switching benchmark.
+
+Creates directories of 10 to 10,000 profiles, each with a few sessions
+of history, and times:
+
+- startup: reading the active profile and opening its history store
+- a switch to another member, done the same way
+- the first search in the switcher, which reads the profile index, and
+  the searches after it
+
+Startup and switching should stay flat as the member count grows; only
+the first search grows with it.
+
+Run from the repository root:
+
+    python benchmarks/bench_profiles.py
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hiit_history_store import HistoryStore
+from hiit_profiles import ProfileDirectory
+
+REPS = [{"name": "Work", "duration": 20}, {"name": "Rest", "duration": 10}]
+
+
+def open_history(profile):
+    return HistoryStore(profile.file("hiit_history.jsonl"), profile.file("hiit_history.json"), fsync=False).open()
+
+
+def timed_ms(fn):
+    start = time.perf_counter()
+    result = fn()
+    return round(1000 * (time.perf_counter() - start), 3), result
+
+
+def run_case(base, members, sessions):
+    root = os.path.join(base, str(members))
+    os.makedirs(root)
+    setup = ProfileDirectory(root)
+    created = [setup.create(f"Member {i:05d}") for i in range(members)]
+    for profile in (created[0], created[-1]):
+        store = HistoryStore(profile.file("hiit_history.jsonl"), profile.file("hiit_history.json"), fsync=False).open()
+        for i in range(sessions):
+            store.append({"date": f"2024-01-01T00:{i % 60:02d}:00", "sets": 8, "reps": REPS, "total_time": 240})
+    setup.activate(created[0])
+    
+    # A fresh directory each time, as the app has at startup
+    profiles = ProfileDirectory(root)
+    
+    def startup():
+        profile = profiles.active()
+        open_history(profile)
+        return profile
+        
+    startup_ms, active = timed_ms(startup)
+    
+    def switch():
+        profiles.activate(created[-1])
+        open_history(profiles.active())
+        
+    switch_ms, _ = timed_ms(switch)
+    first_search_ms, _ = timed_ms(lambda: profiles.search("member 0"))
+    search_ms, found = timed_ms(lambda: profiles.search(f"Member {members - 1:05d}"))
+    return {
+        "startup_ms": startup_ms,
+        "switch_ms": switch_ms,
+        "first_search_ms": first_search_ms,
+        "search_ms": search_ms,
+        "found": [profile.name for profile in found],
+        "active": active.name,
+    }
+
+
+def run_benchmark(counts=(10, 1000, 10000), sessions=200):
+    base = tempfile.mkdtemp(prefix="hiit-profiles-")
+    try:
+        return {str(members): run_case(base, members, sessions) for members in counts}
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--sessions", type=int, default=200, help="history sessions of the profiles opened")
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.members, args.sessions), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Workout search benchmark.
+
+Builds a synthetic 50k-workout library, indexes it with WorkoutSearchIndex
+and replays queries one keystroke at a time, the way the Load Workout
+dialog issues them. A linear substring scan over the same library is timed
+for comparison. A frame at 60 Hz is ~16.7 ms.
+
+Run from the repository root:
+
+    python benchmarks/bench_search.py
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hiit_search import WorkoutSearchIndex
+
+ADJECTIVES = ["Brutal", "Quick", "Morning", "Evening", "Core", "Full Body", "Leg", "Upper", "Sprint",
+              "Endurance", "Power", "Cardio", "Beginner", "Advanced", "Tabata", "Ladder", "Pyramid"]
+NOUNS = ["Blast", "Burner", "Circuit", "Crusher", "Session", "Builder", "Challenge", "Flow", "Grind",
+         "Intervals", "Finisher", "Shred", "Routine", "Express", "Marathon"]
+EXERCISES = ["Burpees", "Squats", "Lunges", "Push Ups", "Plank", "Mountain Climbers", "Jumping Jacks",
+             "High Knees", "Kettlebell Swings", "Rowing", "Box Jumps", "Sit Ups", "Rest"]
+QUERIES = ["brutal leg", "tabata", "kettlebell", "morning cardio blast", "pyramd", "crush", "squats 1234"]
+
+
+def make_library(count, seed=1):
+    rng = random.Random(seed)
+    workouts = {}
+    while len(workouts) < count:
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.randint(1, 9999)}"
+        reps = [{"name": rng.choice(EXERCISES), "duration": rng.choice([10, 20, 30, 45, 60])}
+                for _ in range(rng.randint(2, 8))]
+        workouts[name] = {"name": name, "sets": rng.randint(1, 10), "reps": reps}
+    return workouts
+
+
+def keystrokes(query):
+    return [query[:i] for i in range(1, len(query) + 1)]
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def timings(search, queries):
+    samples = []
+    for query in queries:
+        for text in keystrokes(query):
+            start = time.perf_counter()
+            search(text)
+            samples.append(time.perf_counter() - start)
+    return {
+        "queries": len(samples),
+        "p50_ms": round(1000 * percentile(samples, 0.5), 3),
+        "p95_ms": round(1000 * percentile(samples, 0.95), 3),
+        "max_ms": round(1000 * max(samples), 3),
+    }
+
+
+def linear_scan(workouts, limit=50):
+    def search(text):
+        text = text.lower()
+        results = []
+        for name, workout in workouts.items():
+            haystack = (name + " " + " ".join(rep["name"] for rep in workout["reps"])).lower()
+            if text in haystack:
+                results.append(name)
+                if len(results) >= limit:
+                    break
+        return results
+    return search
+
+
+def run_benchmark(count=50000, seed=1):
+    workouts = make_library(count, seed)
+    index = WorkoutSearchIndex()
+    start = time.perf_counter()
+    index.build(workouts)
+    build_s = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for i in range(100):
+        name = f"Benchmark Added {i}"
+        index.add(name, {"name": name, "sets": 1, "reps": [{"name": "Squats", "duration": 20}]})
+    add_ms = 1000 * (time.perf_counter() - start) / 100
+    
+    return {
+        "workouts": count,
+        "build_s": round(build_s, 3),
+        "incremental_add_ms": round(add_ms, 3),
+        "index": timings(index.search, QUERIES),
+        "linear_scan": timings(linear_scan(workouts), QUERIES),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workouts", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.workouts, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Sensor ingestion benchmark.
+
+Feeds an hour of samples at several rates through a SensorReader with
+the subscribers the app uses (Downsampler for the Timer tab, SegmentStats
+over a workout of 30s intervals) and reports:
+
+- reader cost per sample, and the share of one core an hour-long
+  session at that rate would take
+- peak traced memory, which should not grow with the rate or the length
+
+Batches are generated in memory, and that is included in the timings,
+so this measures the pipeline rather than any real source.
+
+Run from the repository root:
+
+    python benchmarks/bench_sensors.py
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hiit_engine import SEGMENT_START, EngineEvent
+from hiit_sensors import Downsampler, SampleSource, SegmentStats, SensorReader
+
+SEGMENT = 30.0
+
+
+class SyntheticSource(SampleSource):
+    """`seconds` of samples at `rate` Hz, in batches of `batch` seconds."""
+    
+    def __init__(self, rate, seconds, batch=0.1, on_batch=None):
+        super().__init__()
+        self.rate = rate
+        self.seconds = seconds
+        self.size = max(1, int(rate * batch))
+        self.on_batch = on_batch
+        self._sent = 0
+        
+    def read(self):
+        start = self._sent / self.rate
+        if start >= self.seconds or self._closed.is_set():
+            return None
+        if self.on_batch is not None:
+            self.on_batch(start)
+        times = [(self._sent + i) / self.rate for i in range(self.size)]
+        self._sent += self.size
+        return times, [120 + 30 * math.sin(t / 20) for t in times]
+
+
+def run_case(rate, seconds):
+    stats = SegmentStats()
+    segment = [-1]
+    
+    def on_batch(start):
+        # Segment changes as the engine would send them
+        index = int(start // SEGMENT)
+        if index != segment[0]:
+            segment[0] = index
+            stats(EngineEvent(SEGMENT_START, 0, 0, "Work", SEGMENT, SEGMENT, index * SEGMENT, index))
+            
+    shown = [0]
+    reader = SensorReader(SyntheticSource(rate, seconds, on_batch=on_batch))
+    reader.subscribe(Downsampler(1.0, lambda start, value: shown.__setitem__(0, shown[0] + 1)))
+    reader.subscribe(stats)
+    tracemalloc.start()
+    start = time.perf_counter()
+    # The reader thread's loop, run here so it can be timed
+    reader._run()
+    took = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "samples": reader.samples,
+        "us_per_sample": round(1e6 * took / reader.samples, 3),
+        "core_share_pct": round(100 * took / seconds, 3),
+        "peak_kb": round(peak / 1024, 1),
+        "display_updates": shown[0],
+        "segments": len(stats.summary()["segments"]),
+    }
+
+
+def run_benchmark(rates=(50, 1000, 10000), seconds=3600):
+    return {str(rate): run_case(rate, seconds) for rate in rates}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rates", type=int, nargs="+", default=[50, 1000, 10000])
+    parser.add_argument("--seconds", type=int, default=3600, help="session length to simulate")
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.rates, args.seconds), indent=2))
+
+
+if __name__ == "__main__":
+    main()
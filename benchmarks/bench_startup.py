@@ -0,0 +1,129 @@
+"""Startup time benchmark.
+
+Times fresh interpreter processes for the headless CLI and the desktop app
+and checks them against a startup budget:
+
+- cli: `hiit_cli.py run --tabata --dry-run`, from exec to exit
+- cli_modules: GUI modules the CLI run pulled in (the budget is none)
+- gui_import: importing hiit_timer_app
+- gui_first_frame: HIITTimer's own time-to-first-frame (needs a display)
+
+GUI measurements are reported as skipped when customtkinter or a display is
+not available. Exits with status 1 if any measurement is over budget.
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GUI_MODULES = ("customtkinter", "tkinter", "_tkinter", "winsound", "hiit_timer_app")
+
+# Seconds, p50 over the runs
+BUDGETS = {"cli": 0.25, "gui_import": 1.5, "gui_first_frame": 3.0}
+
+CLI_MODULES = f"""
+import sys
+import hiit_cli
+hiit_cli.main(["run", "--tabata", "--dry-run"])
+print(sorted(m for m in {GUI_MODULES!r} if m in sys.modules), file=sys.stderr)
+"""
+
+GUI_IMPORT = """
+import sys
+import time
+start = time.perf_counter()
+import hiit_timer_app
+print(time.perf_counter() - start, file=sys.stderr)
+"""
+
+GUI_FIRST_FRAME = """
+import sys
+import hiit_timer_app
+app = hiit_timer_app.HIITTimer()
+app.root.update()
+print(app.startup_metrics["first_frame"], file=sys.stderr)
+app.root.destroy()
+"""
+
+
+def spawn(args, env=None):
+    """Run a fresh interpreter; return (wall seconds, returncode, stderr)."""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable] + args, cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, text=True)
+    return time.perf_counter() - start, proc.returncode, proc.stderr.strip()
+
+
+def gui_available():
+    _, code, _ = spawn(["-c", "import customtkinter"])
+    return code == 0
+
+
+def summarize(samples, budget):
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2]
+    return {
+        "runs": len(samples),
+        "p50_s": round(p50, 4),
+        "max_s": round(samples[-1], 4),
+        "budget_s": budget,
+        "ok": p50 <= budget,
+    }
+
+
+def run_benchmark(runs=10, budgets=BUDGETS):
+    results = {}
+    env = dict(os.environ, HIIT_AUDIO="null")
+    
+    samples = [spawn(["hiit_cli.py", "run", "--tabata", "--dry-run"], env)[0] for _ in range(runs)]
+    results["cli"] = summarize(samples, budgets["cli"])
+    
+    _, _, stderr = spawn(["-c", CLI_MODULES], env)
+    loaded = stderr.splitlines()[-1] if stderr else "[]"
+    results["cli_modules"] = {"gui_modules_loaded": loaded, "ok": loaded == "[]"}
+    
+    if not gui_available():
+        results["gui_import"] = results["gui_first_frame"] = {"skipped": "customtkinter is not installed"}
+        return results
+        
+    # Timed inside the child, so interpreter startup is not counted twice
+    samples = [float(spawn(["-c", GUI_IMPORT], env)[2].splitlines()[-1]) for _ in range(runs)]
+    results["gui_import"] = summarize(samples, budgets["gui_import"])
+    
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        results["gui_first_frame"] = {"skipped": "no display; try xvfb-run"}
+        return results
+    samples = []
+    for _ in range(runs):
+        _, code, stderr = spawn(["-c", GUI_FIRST_FRAME], env)
+        if code != 0:
+            results["gui_first_frame"] = {"skipped": stderr.splitlines()[-1] if stderr else f"exit {code}"}
+            return results
+        samples.append(float(stderr.splitlines()[-1]))
+    results["gui_first_frame"] = summarize(samples, budgets["gui_first_frame"])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    for name, budget in BUDGETS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}-budget", type=float, default=budget,
+                            help=f"seconds (default: {budget})")
+    args = parser.parse_args()
+    budgets = {name: getattr(args, f"{name}_budget") for name in BUDGETS}
+    results = run_benchmark(args.runs, budgets)
+    print(json.dumps(results, indent=2))
+    return 0 if all(result.get("ok", True) for result in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Multi-station scaling benchmark.
+
+Runs N stations (staggered Tabata-style programs ticking once a second) on
+one StationGroup and reports, as N grows:
+
+- simulated: a whole 4-minute class on a virtual clock; CPU seconds spent
+  per second of class time, per station, and tracemalloc memory per station
+- realtime: a few seconds on the real clock with every station running;
+  CPU usage and thread count, next to the same stations each driven by its
+  own engine thread
+
+Run from the repository root:
+
+    python benchmarks/bench_stations.py
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hiit_engine import ManualClock, WorkoutEngine
+from hiit_stations import StationGroup
+
+PROGRAM = [{"name": "Work", "duration": 20}, {"name": "Rest", "duration": 10}]
+SETS = 8
+STAGGER = 0.25
+
+
+class EventCounter:
+    def __init__(self):
+        self.events = 0
+        
+    def __call__(self, *args):
+        self.events += 1
+
+
+def build_group(count, clock=time.monotonic, sleep=None, stagger=STAGGER):
+    group = StationGroup(clock=clock, sleep=sleep, tick_interval=1.0)
+    for i in range(count):
+        group.add(f"Station {i + 1}", PROGRAM, SETS, offset=i * stagger)
+    return group
+
+
+def run_simulated(count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    clock = ManualClock()
+    group = build_group(count, clock, clock.sleep)
+    counter = group.subscribe(EventCounter())
+    built = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    cpu = time.process_time()
+    group.run()
+    cpu = time.process_time() - cpu
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "class_seconds": round(clock.now, 2),
+        "events": counter.events,
+        "cpu_per_class_second_ms": round(1000 * cpu / clock.now, 4),
+        "cpu_per_station_second_us": round(1e6 * cpu / clock.now / count, 2),
+        "memory_per_station_kb": round((built - before) / count / 1024, 2),
+        "run_peak_per_station_kb": round((peak - before) / count / 1024, 2),
+    }
+
+
+def run_realtime(count, seconds, threaded):
+    threads_before = threading.active_count()
+    counter = EventCounter()
+    if threaded:
+        engines = []
+        for _ in range(count):
+            engine = WorkoutEngine(PROGRAM, SETS, tick_interval=1.0)
+            engine.subscribe(counter)
+            engines.append(engine)
+        cpu, wall = time.process_time(), time.perf_counter()
+        workers = [engine.run_in_thread() for engine in engines]
+    else:
+        # No stagger, so every station is running for the whole window
+        group = build_group(count, stagger=0)
+        group.subscribe(counter)
+        cpu, wall = time.process_time(), time.perf_counter()
+        workers = [group.run_in_thread()]
+    time.sleep(seconds)
+    threads = threading.active_count() - threads_before
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    if threaded:
+        for engine in engines:
+            engine.stop()
+    else:
+        group.stop()
+    for worker in workers:
+        worker.join()
+    return {
+        "cpu_percent": round(100 * cpu / wall, 2),
+        "threads": threads,
+        "events": counter.events,
+    }
+
+
+def run_benchmark(counts=(1, 10, 20, 50, 100, 200), realtime_seconds=2.0):
+    results = []
+    for count in counts:
+        result = {"stations": count, "simulated": run_simulated(count)}
+        if realtime_seconds:
+            result["realtime"] = {
+                "shared_scheduler": run_realtime(count, realtime_seconds, threaded=False),
+                "thread_per_station": run_realtime(count, realtime_seconds, threaded=True),
+            }
+        results.append(result)
+    return {"program": {"reps": PROGRAM, "sets": SETS, "stagger_s": STAGGER}, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stations", type=int, nargs="+", default=[1, 10, 20, 50, 100, 200])
+    parser.add_argument("--realtime-seconds", type=float, default=2.0, help="0 skips the real-clock runs")
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.stations, args.realtime_seconds), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,451 @@
+"""Benchmark suite for the timer, persistence and UI hot paths.
+
+Runs headless and prints one JSON document of flat, lower-is-better
+millisecond metrics, then compares them with a stored baseline:
+
+- timer: tick lateness of a real-clock WorkoutEngine run (what run_timer
+  does), plus drift on the simulated hour-long workout from bench_drift
+- history: journal append, load and date indexing and a date-range query,
+  then the same for the session store the app uses (migration, open,
+  indexing the extras, range query, decoding one page of rows, append)
+  at 1k, 10k and 100k entries, each carrying the telemetry and heart-rate
+  extras the app saves
+- library: cold and cached WorkoutStore loads and saves
+  (load_saved_workouts_data / save_workout)
+- export: export_history in every format
+- reps: building and reading the rep list model (add_rep / get_reps_data);
+  with customtkinter installed the real widgets are timed too, on $DISPLAY
+  or a private Xvfb server when one is available
+
+Timings are the fastest of at least --repeat runs, with the garbage
+collector off; fast functions are run until they have taken 0.2 s. A
+metric regresses when it is more than --tolerance slower than the
+baseline and by at least --min-delta-ms (more for the metrics in
+MIN_DELTA_MS). Even the fastest run moves by up to 1.8x between runs on a
+shared single-core VM, so the default tolerance only flags metrics that
+got twice as slow: a change in how the work scales, not a few percent;
+pass a smaller --tolerance on a quiet machine. Real-clock tick lateness,
+which depends on machine load, and the one-off store migration are
+reported but never gated. The baseline is only meaningful on the machine
+it was recorded on; refresh it there with --save-baseline. Exits with
+status 1 if anything regressed.
+
+Run from the repository root:
+
+    python benchmarks/run_all.py
+    python benchmarks/run_all.py --save-baseline
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_drift
+from hiit_engine import TICK, WorkoutEngine
+from hiit_export import FORMATS, export_history
+from hiit_history import HistoryIndex, HistoryJournal
+from hiit_history_store import HistoryStore
+from hiit_library import WorkoutStore
+from hiit_reps import RepListModel
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SUITES = ("timer", "history", "library", "export", "reps")
+HISTORY_SIZES = (1000, 10000, 100000)
+
+# Larger floors where a run does a lot of I/O or allocation, whose best
+# case moves the most between runs; everything else uses --min-delta-ms
+MIN_DELTA_MS = {"export.": 15.0, "history.": 2.0, "library.load_cold": 2.0}
+# Reported, but too noisy to gate: real-clock scheduling jitter depends on
+# machine load, and migration is timed once per size
+UNGATED = ("timer.tick_late_", "store_migrate_ms")
+
+GUI_REPS = """
+import json
+import sys
+import time
+import hiit_timer_app
+app = hiit_timer_app.HIITTimer()
+app.root.update()
+add = []
+for _ in range({count}):
+    start = time.perf_counter()
+    app.add_rep()
+    app.root.update()
+    add.append(time.perf_counter() - start)
+start = time.perf_counter()
+reps = app.get_reps_data()
+read = time.perf_counter() - start
+assert len(reps) >= {count}
+print(json.dumps({{"add": add, "read": read}}), file=sys.stderr)
+app.root.destroy()
+"""
+
+
+def ms(seconds):
+    return round(1000 * seconds, 4)
+
+
+def best_time(fn, repeat, budget=0.2, limit=1000):
+    """Fastest of `repeat` runs of fn(), or more until `budget` seconds are spent.
+    
+    The garbage collector is off while fn() runs, as in timeit, so a
+    collection over everything the suite holds isn't charged to it.
+    """
+    best = float("inf")
+    spent = 0.0
+    runs = 0
+    enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        while runs < repeat or (spent < budget and runs < limit):
+            start = time.perf_counter()
+            fn()
+            took = time.perf_counter() - start
+            best = min(best, took)
+            spent += took
+            runs += 1
+    finally:
+        if enabled:
+            gc.enable()
+    return best
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def make_history(count, seed=1):
+    rng = random.Random(seed)
+    day = datetime(2020, 1, 1, 7, 0)
+    entries = []
+    offset = 0
+    for _ in range(count):
+        day += timedelta(minutes=rng.randint(30, 600))
+        reps = [{"name": "Work" if i % 2 == 0 else "Rest", "duration": rng.choice((10, 20, 30, 45))}
+                for i in range(rng.randint(2, 8))]
+        sets = rng.randint(1, 8)
+        entry = {
+            "date": day.isoformat(),
+            "sets": sets,
+            "reps": reps,
+            "total_time": sets * sum(rep["duration"] for rep in reps),
+        }
+        # What workout_complete adds: every session has telemetry, and those
+        # run with a sensor have heart-rate stats per segment
+        length = 1 + 4 * sets * len(reps)
+        entry["telemetry"] = [offset, length]
+        offset += length
+        if rng.random() < 0.3:
+            rates = [[i, rng.randint(90, 120), rng.randint(120, 150), rng.randint(150, 185)] for i in range(sets * len(reps))]
+            entry["heart_rate"] = {
+                "segments": rates,
+                "min": min(rate[1] for rate in rates),
+                "avg": round(sum(rate[2] for rate in rates) / len(rates), 1),
+                "max": max(rate[3] for rate in rates),
+            }
+        entries.append(entry)
+    return entries
+
+
+def write_journal(path, entries):
+    with open(path, "w") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+def bench_timer(seconds=2.0, tick_interval=0.05):
+    metrics = {}
+    lateness = []
+    
+    def on_event(event):
+        if event.kind == TICK:
+            late = (event.duration - event.remaining) % tick_interval
+            lateness.append(0.0 if tick_interval - late < 1e-6 else late)
+            
+    reps = [{"name": "Work", "duration": seconds / 2}, {"name": "Rest", "duration": seconds / 2}]
+    engine = WorkoutEngine(reps, 1, tick_interval=tick_interval)
+    engine.subscribe(on_event)
+    engine.run()
+    metrics["timer.tick_late_p50_ms"] = ms(percentile(lateness, 0.5))
+    metrics["timer.tick_late_p95_ms"] = ms(percentile(lateness, 0.95))
+    
+    # Deterministic: a simulated hour with pauses, sleep overshoot and UI lag
+    drift = bench_drift.run_benchmark()["deadline"]
+    metrics["timer.sim_worst_drift_ms"] = ms(drift["worst_case_drift_s"])
+    metrics["timer.sim_cumulative_drift_ms"] = ms(abs(drift["cumulative_drift_s"]))
+    return metrics
+
+
+def bench_history(repeat, workdir, sizes=HISTORY_SIZES):
+    metrics = {}
+    for count in sizes:
+        entries = make_history(count)
+        path = os.path.join(workdir, f"history_{count}.jsonl")
+        write_journal(path, entries)
+        journal = HistoryJournal(path, legacy_path=os.path.join(workdir, "none.json"), compact_every=10 ** 9)
+        
+        loaded = [None]
+        metrics[f"history.{count}.load_ms"] = ms(best_time(lambda: loaded.__setitem__(0, journal.load()), repeat))
+        entries = loaded[0]
+        index = [None]
+        metrics[f"history.{count}.index_ms"] = ms(best_time(lambda: index.__setitem__(0, HistoryIndex(entries)), repeat))
+        index = index[0]
+        middle = datetime.fromisoformat(entries[len(entries) // 2]["date"])
+        metrics[f"history.{count}.select_month_ms"] = ms(best_time(
+            lambda: index.select(middle, middle + timedelta(days=30)), repeat))
+            
+        # save_history: one fsync'd line, however long the journal already is
+        new = make_history(20, seed=count)
+        samples = []
+        for entry in new:
+            start = time.perf_counter()
+            journal.append(entry)
+            samples.append(time.perf_counter() - start)
+        metrics[f"history.{count}.append_ms"] = ms(statistics.median(samples))
+        
+        # The session store: load_history maps it and indexes the extras,
+        # render_history decodes a page
+        start = time.perf_counter()
+        HistoryStore(path, legacy_path=None).open().close()
+        metrics[f"history.{count}.store_migrate_ms"] = ms(time.perf_counter() - start)
+        
+        def reopen():
+            if stores:
+                stores.pop().close()
+            stores.append(HistoryStore(path, legacy_path=None).open())
+            
+        stores = []
+        metrics[f"history.{count}.store_open_ms"] = ms(best_time(reopen, repeat))
+        store = stores.pop()
+        
+        def extras():
+            store._extra_offsets = store._next_extra = None
+            store.load_extras()
+            
+        metrics[f"history.{count}.store_extras_ms"] = ms(best_time(extras, repeat))
+        metrics[f"history.{count}.store_select_month_ms"] = ms(best_time(
+            lambda: store.select(middle, middle + timedelta(days=30)), repeat))
+        metrics[f"history.{count}.store_page_ms"] = ms(best_time(
+            lambda: [store[store.row_at(pos)] for pos in range(len(store) - 1, len(store) - 13, -1)], repeat))
+        samples = []
+        for entry in make_history(20, seed=count + 1):
+            start = time.perf_counter()
+            store.append(entry)
+            samples.append(time.perf_counter() - start)
+        metrics[f"history.{count}.store_append_ms"] = ms(statistics.median(samples))
+        store.close()
+        for leftover in (path + ".migrated", *(os.path.splitext(path)[0] + ext for ext in (".sessions", ".templates.jsonl", ".extra.jsonl"))):
+            os.unlink(leftover)
+    return metrics
+
+
+def bench_library(repeat, workdir, count=1000):
+    rng = random.Random(2)
+    workouts = {}
+    for i in range(count):
+        name = f"Workout {i:05d}"
+        reps = [{"name": f"Move {j}", "duration": rng.choice((20, 30, 40))} for j in range(rng.randint(2, 12))]
+        workouts[name] = {"name": name, "reps": reps, "sets": rng.randint(1, 6), "created": datetime(2021, 1, 1).isoformat()}
+    path = os.path.join(workdir, "workouts.json")
+    with open(path, "w") as f:
+        json.dump(workouts, f, indent=2)
+        
+    def cold():
+        WorkoutStore(path).load()
+        
+    metrics = {"library.load_cold_ms": ms(best_time(cold, repeat))}
+    store = WorkoutStore(path)
+    store.load()
+    metrics["library.load_cached_ms"] = ms(best_time(store.load, repeat))
+    samples = []
+    for i in range(20):
+        workout = dict(workouts[f"Workout {i:05d}"], name=f"Saved {i}")
+        start = time.perf_counter()
+        store.put(workout)
+        samples.append(time.perf_counter() - start)
+    metrics["library.save_ms"] = ms(statistics.median(samples))
+    return metrics
+
+
+def bench_export(repeat, workdir, count=10000):
+    entries = make_history(count)
+    metrics = {}
+    for fmt in FORMATS:
+        out = os.path.join(workdir, f"export.{fmt}")
+        metrics[f"export.{count}.{fmt}_ms"] = ms(best_time(lambda: export_history(entries, out, fmt), repeat))
+        os.unlink(out)
+    return metrics
+
+
+def bench_reps(repeat, workdir, count=200):
+    def build():
+        model = RepListModel()
+        for i in range(count):
+            model.append("Work" if i % 2 == 0 else "Rest", 30 if i % 2 == 0 else 10)
+        return model
+        
+    model = build()
+    metrics = {
+        f"reps.model_add_{count}_ms": ms(best_time(build, repeat)),
+        f"reps.model_read_{count}_ms": ms(best_time(model.to_reps, repeat)),
+    }
+    skipped = {}
+    gui = bench_reps_gui(workdir, count)
+    if isinstance(gui, str):
+        skipped["reps.gui"] = gui
+    else:
+        metrics.update(gui)
+    return metrics, skipped
+
+
+@contextmanager
+def virtual_display():
+    """Yield a DISPLAY to use, starting a private Xvfb if there is none."""
+    if os.environ.get("DISPLAY") or not sys.platform.startswith("linux"):
+        yield os.environ.get("DISPLAY", "")
+        return
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        yield None
+        return
+    number = next(n for n in range(99, 199) if not os.path.exists(f"/tmp/.X11-unix/X{n}"))
+    proc = subprocess.Popen([xvfb, f":{number}", "-nolisten", "tcp", "-screen", "0", "1280x1024x24"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 5.0
+        while not os.path.exists(f"/tmp/.X11-unix/X{number}") and time.monotonic() < deadline:
+            time.sleep(0.05)
+        yield f":{number}" if proc.poll() is None else None
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def bench_reps_gui(workdir, count):
+    # In a child process and directory so the app's files stay out of the repo
+    code = subprocess.run([sys.executable, "-c", "import customtkinter"], capture_output=True).returncode
+    if code != 0:
+        return "customtkinter is not installed"
+    with virtual_display() as display:
+        if display is None:
+            return "no display and Xvfb is not installed"
+        env = dict(os.environ, HIIT_AUDIO="null", PYTHONPATH=ROOT)
+        if display:
+            env["DISPLAY"] = display
+        proc = subprocess.run([sys.executable, "-c", GUI_REPS.format(count=count)], cwd=workdir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        return proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+    samples = json.loads(proc.stderr.strip().splitlines()[-1])
+    return {
+        "reps.gui_add_rep_p50_ms": ms(percentile(samples["add"], 0.5)),
+        "reps.gui_add_rep_p95_ms": ms(percentile(samples["add"], 0.95)),
+        f"reps.gui_get_reps_{count}_ms": ms(samples["read"]),
+    }
+
+
+def run_benchmark(suites=SUITES, repeat=7, sizes=HISTORY_SIZES):
+    metrics = {}
+    skipped = {}
+    with tempfile.TemporaryDirectory(prefix="hiit-bench-") as workdir:
+        for suite in suites:
+            if suite == "timer":
+                metrics.update(bench_timer())
+            elif suite == "history":
+                metrics.update(bench_history(repeat, workdir, sizes))
+            elif suite == "library":
+                metrics.update(bench_library(repeat, workdir))
+            elif suite == "export":
+                metrics.update(bench_export(repeat, workdir))
+            elif suite == "reps":
+                suite_metrics, suite_skipped = bench_reps(repeat, workdir)
+                metrics.update(suite_metrics)
+                skipped.update(suite_skipped)
+    return {
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.machine(),
+        },
+        "recorded": datetime.now().isoformat(timespec="seconds"),
+        "metrics": metrics,
+        "skipped": skipped,
+    }
+
+
+def compare(metrics, baseline, tolerance=1.0, min_delta_ms=1.0):
+    """Return {metric: {...}} for every metric present in both runs."""
+    report = {}
+    for name, current in sorted(metrics.items()):
+        before = baseline.get(name)
+        if before is None:
+            continue
+        floor = max(min_delta_ms, next((value for prefix, value in MIN_DELTA_MS.items() if name.startswith(prefix)), 0.0))
+        if any(part in name for part in UNGATED):
+            status = "ungated"
+        elif current > before * (1 + tolerance) and current - before >= floor:
+            status = "regressed"
+        elif before > current * (1 + tolerance) and before - current >= floor:
+            status = "improved"
+        else:
+            status = "ok"
+        report[name] = {
+            "baseline": before,
+            "current": current,
+            "ratio": round(current / before, 3) if before else None,
+            "status": status,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", dest="suites", choices=SUITES, action="append",
+                        help="run only this suite (repeatable; default: all)")
+    parser.add_argument("--repeat", type=int, default=7, help="runs per measurement at least; the fastest is reported")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(HISTORY_SIZES), help="history sizes")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="allowed slowdown as a fraction")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore smaller differences")
+    args = parser.parse_args()
+    
+    results = run_benchmark(args.suites or SUITES, args.repeat, args.sizes)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(json.dumps(results, indent=2))
+        return 0
+        
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["metrics"]
+    except FileNotFoundError:
+        baseline = None
+    if baseline is not None:
+        results["comparison"] = compare(results["metrics"], baseline, args.tolerance, args.min_delta_ms)
+        results["regressions"] = sorted(name for name, row in results["comparison"].items()
+                                        if row["status"] == "regressed")
+    print(json.dumps(results, indent=2))
+    return 1 if results.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
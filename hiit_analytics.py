@@ -0,0 +1,265 @@
+"""Aggregate statistics over the workout history.
+
+HistoryStats keeps session counts and time per ISO week and per month,
+training-day streaks, work vs rest time and cumulative time per exercise.
+It is built once from the whole history (on the loader thread) and then
+updated with add() as each workout completes, so nothing rescans the
+journal.
+
+The full build is vectorized with NumPy when it is installed: dates are
+parsed to day numbers in one call and totals are bincounts over the
+distinct weeks and months. build_store() goes further and reads the
+session store's mapped columns directly, without decoding any entries.
+Without NumPy the same figures are computed in plain Python.
+
+Work, rest and per-exercise figures use each interval's planned duration;
+session, weekly and monthly totals use the recorded total_time. Entries
+that ran the same workout share one per-interval breakdown, so a history
+of thousands of sessions only expands each distinct workout once.
+"""
+from bisect import bisect_left
+from datetime import date
+
+from hiit_dsl import ProgramError, compile_program
+from hiit_history_store import RECORD_FIELDS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Intervals whose name contains one of these count as rest
+REST_WORDS = ("rest", "recover", "break")
+
+# date.toordinal() of 1970-01-01, where datetime64 day numbers start
+EPOCH_ORDINAL = 719163
+
+
+def is_rest(name):
+    name = str(name).lower()
+    return any(word in name for word in REST_WORDS)
+
+
+def entry_day(entry):
+    # Day ordinal of the session, in the local time it was recorded in
+    return date.fromisoformat(entry["date"][:10]).toordinal()
+
+
+def week_start(day):
+    # Ordinal of the Monday starting the ISO week; ordinal 1 is a Monday
+    return day - (day - 1) % 7
+
+
+def month_key(day):
+    d = date.fromordinal(day)
+    return d.year * 12 + d.month - 1
+
+
+def streak_runs(days):
+    """(longest, last) lengths of runs of consecutive days in sorted `days`."""
+    longest = run = 0
+    previous = None
+    for day in days:
+        run = run + 1 if previous is not None and day == previous + 1 else 1
+        longest = max(longest, run)
+        previous = day
+    return longest, run
+
+
+class HistoryStats:
+    def __init__(self, entries=(), vectorized=None):
+        self.vectorized = np is not None if vectorized is None else vectorized and np is not None
+        self.clear()
+        if entries:
+            self.build(entries)
+            
+    def clear(self):
+        self.sessions = 0
+        self.total_time = 0.0
+        self.work_time = 0.0
+        self.rest_time = 0.0
+        self.weekly = {}  # week start ordinal -> [sessions, seconds]
+        self.monthly = {}  # year * 12 + month - 1 -> [sessions, seconds]
+        self.exercises = {}  # interval name -> planned seconds
+        self.longest_streak = 0
+        self._days = []  # distinct training days, sorted
+        self._run = 0  # consecutive days ending at self._days[-1]
+        self._breakdowns = {}
+        
+    def build(self, entries):
+        """Recompute everything from a full list of history entries."""
+        self.clear()
+        if not entries:
+            return
+        if self.vectorized:
+            self._build_numpy(entries)
+        else:
+            for entry in entries:
+                self._count(entry)
+            self._days = sorted(set(self._days))
+        self.longest_streak, self._run = streak_runs(self._days)
+        
+    def build_store(self, store):
+        """Recompute from a HistoryStore, reading its columns rather than entries."""
+        if not self.vectorized:
+            self.build(store.rows())
+            return
+        self.clear()
+        buffer, count = store.buffer()
+        if not count:
+            return
+        records = np.frombuffer(buffer, dtype=np.dtype(RECORD_FIELDS), count=count)
+        # Timestamps are local wall-clock seconds, so days are exact divisions
+        days = (records["timestamp"] // 86400).astype(np.int64) + EPOCH_ORDINAL
+        self._aggregate(days, records["total_time"].copy())
+        
+        # A session's workout is its template and its number of sets
+        workouts = np.stack([records["template"], records["sets"].astype(np.uint64)], axis=1)
+        keys, runs = np.unique(workouts, axis=0, return_counts=True)
+        for (tid, sets), times in zip(keys.tolist(), runs.tolist()):
+            self._add_breakdown(self.breakdown({"sets": sets, **store.template(tid)}), times)
+        self.longest_streak, self._run = streak_runs(self._days)
+        
+    def add(self, entry):
+        """Fold one new session into the aggregates."""
+        day = self._count(entry, insert=False)
+        days = self._days
+        if days and day == days[-1]:
+            return
+        if not days or day > days[-1]:
+            # Sessions normally arrive in date order
+            self._run = self._run + 1 if days and day == days[-1] + 1 else 1
+            days.append(day)
+            self.longest_streak = max(self.longest_streak, self._run)
+            return
+        pos = bisect_left(days, day)
+        if days[pos] != day:
+            # A back-dated session can join two runs; recount them
+            days.insert(pos, day)
+            self.longest_streak, self._run = streak_runs(days)
+            
+    def _count(self, entry, insert=True):
+        day = entry_day(entry)
+        seconds = entry.get("total_time", 0)
+        self.sessions += 1
+        self.total_time += seconds
+        for table, key in ((self.weekly, week_start(day)), (self.monthly, month_key(day))):
+            totals = table.setdefault(key, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+        self._add_breakdown(self.breakdown(entry))
+        if insert:
+            self._days.append(day)
+        return day
+        
+    def _add_breakdown(self, breakdown, times=1):
+        work, rest, names = breakdown
+        self.work_time += work * times
+        self.rest_time += rest * times
+        for name, seconds in names.items():
+            self.exercises[name] = self.exercises.get(name, 0.0) + seconds * times
+            
+    def _build_numpy(self, entries):
+        entries = list(entries)
+        days = np.array([entry["date"][:10] for entry in entries], dtype="datetime64[D]").astype(np.int64) + EPOCH_ORDINAL
+        seconds = np.array([entry.get("total_time", 0) for entry in entries], dtype=np.float64)
+        self._aggregate(days, seconds)
+        
+        # One breakdown per distinct workout, weighted by how often it ran
+        ids = {}
+        signatures = np.array([ids.setdefault(self.signature(entry), len(ids)) for entry in entries])
+        runs = np.bincount(signatures)
+        first = {}
+        for entry, sid in zip(entries, signatures.tolist()):
+            first.setdefault(sid, entry)
+        for sid, entry in first.items():
+            self._add_breakdown(self.breakdown(entry), int(runs[sid]))
+            
+    def _aggregate(self, days, seconds):
+        months = (days - EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) + 1970 * 12
+        self.sessions = len(days)
+        self.total_time = float(seconds.sum())
+        self.weekly = self._group(week_start(days), seconds)
+        self.monthly = self._group(months, seconds)
+        self._days = np.unique(days).tolist()
+        
+    @staticmethod
+    def _group(keys, seconds):
+        keys, inverse = np.unique(keys, return_inverse=True)
+        sessions = np.bincount(inverse)
+        totals = np.bincount(inverse, weights=seconds)
+        return {key: [count, total] for key, count, total in zip(keys.tolist(), sessions.tolist(), totals.tolist())}
+        
+    @staticmethod
+    def signature(entry):
+        # Cache key only: workouts that differ just in key order get two
+        # identical breakdowns, which is harmless and much cheaper than
+        # canonical JSON
+        return repr((entry.get("sets", 1), entry.get("program", entry.get("reps"))))
+        
+    def breakdown(self, entry):
+        """(work seconds, rest seconds, {name: seconds}) planned for `entry`."""
+        key = self.signature(entry)
+        cached = self._breakdowns.get(key)
+        if cached is not None:
+            return cached
+        sets = entry.get("sets", 1)
+        names = {}
+        if "program" in entry:
+            try:
+                intervals = compile_program(entry["program"], sets).iter(0)
+                for name, duration in intervals:
+                    names[name] = names.get(name, 0.0) + duration
+            except ProgramError:
+                names = {}
+        else:
+            for rep in entry.get("reps", []):
+                names[rep["name"]] = names.get(rep["name"], 0.0) + rep["duration"] * sets
+        rest = sum(seconds for name, seconds in names.items() if is_rest(name))
+        cached = self._breakdowns[key] = (sum(names.values()) - rest, rest, names)
+        return cached
+        
+    def current_streak(self, today=None):
+        """Consecutive training days up to today, or yesterday if not yet today."""
+        today = (today or date.today()).toordinal()
+        if not self._days or today - self._days[-1] > 1:
+            return 0
+        return self._run
+        
+    def work_rest_ratio(self):
+        return self.work_time / self.rest_time if self.rest_time else None
+        
+    def week(self, day):
+        """(sessions, seconds) in the ISO week containing `day`."""
+        return tuple(self.weekly.get(week_start(day.toordinal()), (0, 0.0)))
+        
+    def month(self, day):
+        return tuple(self.monthly.get(day.year * 12 + day.month - 1, (0, 0.0)))
+        
+    def recent_weeks(self, count=8, today=None):
+        """[(monday, sessions, seconds)] for the last `count` weeks, oldest first."""
+        monday = week_start((today or date.today()).toordinal())
+        weeks = []
+        for n in range(count - 1, -1, -1):
+            start = monday - 7 * n
+            sessions, seconds = self.weekly.get(start, (0, 0.0))
+            weeks.append((date.fromordinal(start), sessions, seconds))
+        return weeks
+        
+    def top_exercises(self, count=10, include_rest=False):
+        names = ((name, seconds) for name, seconds in self.exercises.items() if include_rest or not is_rest(name))
+        return sorted(names, key=lambda item: (-item[1], item[0]))[:count]
+        
+    def summary(self, today=None):
+        today = today or date.today()
+        return {
+            "sessions": self.sessions,
+            "total_time": self.total_time,
+            "current_streak": self.current_streak(today),
+            "longest_streak": self.longest_streak,
+            "this_week": self.week(today),
+            "this_month": self.month(today),
+            "work_time": self.work_time,
+            "rest_time": self.rest_time,
+            "work_rest_ratio": self.work_rest_ratio(),
+        }
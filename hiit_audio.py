@@ -0,0 +1,222 @@
+"""Non-blocking audio cues.
+
+Cue tones are rendered once into cached 16-bit PCM buffers and played by a
+dedicated worker thread, so asking for a beep never stalls the UI. Output
+goes through a small backend interface: winsound on Windows, aplay/paplay
+on Linux, and null or WAV-file sinks for headless machines and tests.
+
+Set HIIT_AUDIO to pick a backend explicitly: "null", "bell", "winsound",
+"aplay", "paplay" or "wav:<directory>".
+"""
+import io
+import math
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import wave
+from array import array
+from collections import deque
+
+import hiit_metrics
+
+SAMPLE_RATE = 22050
+
+# Each cue is a list of (frequency Hz, duration ms); frequency 0 is silence.
+# "complete" replaces the old three beeps separated by sleep(0.2).
+CUES = {
+    "beep": [(800, 300)],
+    "complete": [(800, 300), (0, 200), (800, 300), (0, 200), (800, 300)],
+}
+
+
+def render_tone(frequency, duration_ms, rate=SAMPLE_RATE, volume=0.5):
+    count = int(rate * duration_ms / 1000)
+    samples = array("h", bytes(2 * count))
+    if frequency:
+        # Short linear fades keep the speaker from clicking
+        fade = max(1, min(count // 2, int(rate * 0.005)))
+        amplitude = 32767 * volume
+        step = 2 * math.pi * frequency / rate
+        for i in range(count):
+            envelope = min(1.0, i / fade, (count - 1 - i) / fade)
+            samples[i] = int(amplitude * envelope * math.sin(step * i))
+    if sys.byteorder != "little":
+        samples.byteswap()
+    return samples.tobytes()
+
+
+def render_cue(parts, rate=SAMPLE_RATE):
+    return b"".join(render_tone(frequency, duration, rate) for frequency, duration in parts)
+
+
+def wav_bytes(pcm, rate=SAMPLE_RATE):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm)
+    return buffer.getvalue()
+
+
+class NullBackend:
+    """Discards audio; useful on headless machines and in tests."""
+    
+    name = "null"
+    
+    def __init__(self):
+        self.played = 0
+        
+    def play(self, cue, pcm, rate):
+        self.played += 1
+
+
+class BellBackend:
+    """Terminal bell, the last resort when nothing else can make a sound."""
+    
+    name = "bell"
+    
+    def play(self, cue, pcm, rate):
+        print('\a', end="", flush=True)
+
+
+class WavFileBackend:
+    """Writes every cue played to a numbered WAV file in `directory`."""
+    
+    name = "wav"
+    
+    def __init__(self, directory):
+        self.directory = directory
+        self.played = 0
+        os.makedirs(directory, exist_ok=True)
+        
+    def play(self, cue, pcm, rate):
+        self.played += 1
+        path = os.path.join(self.directory, f"{self.played:05d}_{cue}.wav")
+        with open(path, "wb") as f:
+            f.write(wav_bytes(pcm, rate))
+
+
+class WinsoundBackend:
+    name = "winsound"
+    
+    def __init__(self):
+        import winsound
+        self._winsound = winsound
+        self._wavs = {}
+        
+    def play(self, cue, pcm, rate):
+        data = self._wavs.get(cue)
+        if data is None:
+            data = self._wavs[cue] = wav_bytes(pcm, rate)
+        # SND_MEMORY plays synchronously, which is fine on the audio thread
+        self._winsound.PlaySound(data, self._winsound.SND_MEMORY)
+
+
+class PipeBackend:
+    """Streams raw PCM into a command-line player such as aplay or paplay."""
+    
+    COMMANDS = {
+        "aplay": ["aplay", "-q", "-t", "raw", "-f", "S16_LE", "-c", "1", "-r", "{rate}"],
+        "paplay": ["paplay", "--raw", "--format=s16le", "--channels=1", "--rate={rate}"],
+    }
+    
+    def __init__(self, name):
+        if not shutil.which(name):
+            raise OSError(f"{name} not found")
+        self.name = name
+        self._command = self.COMMANDS[name]
+        
+    def play(self, cue, pcm, rate):
+        command = [arg.format(rate=rate) for arg in self._command]
+        subprocess.run(command, input=pcm, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+
+
+def backend_from_spec(spec):
+    if spec == "null":
+        return NullBackend()
+    if spec == "bell":
+        return BellBackend()
+    if spec == "winsound":
+        return WinsoundBackend()
+    if spec in PipeBackend.COMMANDS:
+        return PipeBackend(spec)
+    if spec.startswith("wav:"):
+        return WavFileBackend(spec[4:])
+    raise ValueError(f"Unknown audio backend: {spec}")
+
+
+def default_backend():
+    spec = os.environ.get("HIIT_AUDIO")
+    if spec:
+        return backend_from_spec(spec)
+    candidates = ["winsound"] if sys.platform == "win32" else ["paplay", "aplay"]
+    for name in candidates:
+        try:
+            return backend_from_spec(name)
+        except (ImportError, OSError):
+            continue
+    return BellBackend()
+
+
+class AudioEngine:
+    def __init__(self, backend=None, rate=SAMPLE_RATE, max_delay=0.5):
+        # Cues that waited longer than `max_delay` seconds are dropped: a
+        # late beep is worse than none
+        self.backend = backend if backend is not None else default_backend()
+        self.rate = rate
+        self.max_delay = max_delay
+        self.buffers = {name: render_cue(parts, rate) for name, parts in CUES.items()}
+        self.latencies = deque(maxlen=256)
+        self.dropped = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        
+    def play(self, cue="beep"):
+        self._queue.put((cue, time.perf_counter()))
+        
+    def latency_stats(self):
+        """Latency from play() to the buffer reaching the backend, in ms."""
+        samples = sorted(self.latencies)
+        if not samples:
+            return {"count": 0, "mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0, "dropped": self.dropped}
+        return {
+            "count": len(samples),
+            "mean_ms": round(1000 * sum(samples) / len(samples), 3),
+            "p95_ms": round(1000 * samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+            "max_ms": round(1000 * samples[-1], 3),
+            "dropped": self.dropped,
+        }
+        
+    def close(self, timeout=1.0):
+        self._queue.put(None)
+        self._thread.join(timeout)
+        
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            cue, requested = item
+            pcm = self.buffers.get(cue)
+            if pcm is None:
+                continue
+            delay = time.perf_counter() - requested
+            if delay > self.max_delay:
+                self.dropped += 1
+                hiit_metrics.inc("cues_dropped_total")
+                continue
+            self.latencies.append(delay)
+            hiit_metrics.observe("cue_latency_seconds", delay)
+            try:
+                self.backend.play(cue, pcm, self.rate)
+            except Exception:
+                # A broken audio device must never take the timer down
+                self.dropped += 1
+                hiit_metrics.inc("cues_dropped_total")
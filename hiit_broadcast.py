@@ -0,0 +1,368 @@
+"""Broadcast live timer state to remote displays over WebSocket.
+
+An optional, standard-library-only asyncio server that runs on its own
+thread. The timer publishes its display state as a dict; the server sends
+each client only the keys that changed (a delta), encoded once and shared
+by every client. Every client has a small bounded queue: a client that
+can't keep up has its backlog dropped and is sent one full snapshot once it
+drains, so slow phones cost a bounded amount of memory and can never stall
+the timer or the other displays.
+
+Messages are JSON text frames:
+
+    {"t": "s", "seq": 12, "state": "running", "name": "Work", ...}   snapshot
+    {"t": "d", "seq": 13, "remaining": 7, "elapsed": 53}             delta
+
+Opening http://host:port/ in a browser shows a minimal full-screen display.
+Set HIIT_BROADCAST=host:port (or "broadcast" in the settings file) to turn
+it on in the app.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import socket
+import threading
+from collections import deque
+
+from hiit_engine import COMPLETE_EVENT, PAUSE, STOP
+
+DEFAULT_PORT = 8765
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_CLIENT_FRAME = 4096
+
+OP_TEXT = 0x1
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><meta name="viewport" content="width=device-width,initial-scale=1">
+<title>HIIT Me Up</title>
+<style>body{margin:0;height:100vh;display:flex;flex-direction:column;align-items:center;justify-content:center;
+background:#111;color:#fff;font-family:sans-serif}#name{font-size:8vw}#time{font-size:28vw;font-weight:bold}
+#info{font-size:4vw;color:#aaa}</style></head>
+<body><div id="name">Waiting</div><div id="time">--:--</div><div id="info"></div>
+<script>
+let state = {};
+function show() {
+  const r = state.remaining || 0;
+  document.getElementById("name").textContent = state.state === "running" ? state.name : (state.state || "Waiting");
+  document.getElementById("name").style.color = /rest/i.test(state.name || "") ? "#4FC3F7" : "#FF5722";
+  document.getElementById("time").textContent = String(Math.floor(r / 60)).padStart(2, "0") + ":" + String(r % 60).padStart(2, "0");
+  document.getElementById("info").textContent = state.sets ? "Set " + (state.set + 1) + " of " + state.sets : "";
+}
+function connect() {
+  const ws = new WebSocket("ws://" + location.host + "/");
+  ws.onmessage = (m) => { const msg = JSON.parse(m.data); if (msg.t === "s") state = {}; Object.assign(state, msg); show(); };
+  ws.onclose = () => setTimeout(connect, 1000);
+}
+connect();
+</script></body></html>
+"""
+
+
+def parse_address(text, default_port=DEFAULT_PORT):
+    """'host:port', 'host' or ':port' -> (host, port)."""
+    host, sep, port = text.strip().rpartition(":")
+    if not sep:
+        host, port = port, ""
+    return host or "0.0.0.0", int(port) if port else default_port
+
+
+def accept_key(key):
+    digest = hashlib.sha1((key + WS_GUID).encode("ascii")).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+def encode_frame(payload, opcode=OP_TEXT):
+    # Server frames are never masked
+    header = bytearray([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header.append(length)
+    elif length < 1 << 16:
+        header.append(126)
+        header += length.to_bytes(2, "big")
+    else:
+        header.append(127)
+        header += length.to_bytes(8, "big")
+    return bytes(header) + payload
+
+
+async def read_frame(reader, max_size=MAX_CLIENT_FRAME):
+    """Read one frame; return (opcode, payload). Unmasks client frames."""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = int.from_bytes(await reader.readexactly(2), "big")
+    elif length == 127:
+        length = int.from_bytes(await reader.readexactly(8), "big")
+    if length > max_size:
+        raise ValueError(f"frame of {length} bytes is too large")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return first & 0x0F, payload
+
+
+class Client:
+    def __init__(self, writer, queue_size):
+        self.writer = writer
+        self.queue = deque()
+        self.queue_size = queue_size
+        self.ready = asyncio.Event()
+        # Set when the backlog was dropped; the next send is a snapshot
+        self.resync = True
+        self.resyncs = 0
+        self.sent = 0
+        
+    def push(self, frame):
+        if len(self.queue) >= self.queue_size:
+            self.queue.clear()
+            self.resync = True
+            self.resyncs += 1
+        else:
+            self.queue.append(frame)
+        self.ready.set()
+
+
+class BroadcastServer:
+    def __init__(self, host="0.0.0.0", port=DEFAULT_PORT, queue_size=16, send_buffer=16384, send_timeout=10.0):
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.send_buffer = send_buffer
+        self.send_timeout = send_timeout
+        self.state = {}
+        self.seq = 0
+        self.clients = set()
+        self.published = 0
+        self.resyncs = 0
+        self.dropped_clients = 0
+        self._snapshot = None
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._started = threading.Event()
+        self._error = None
+        
+    def start(self, timeout=5.0):
+        """Start the server thread; returns once it is listening."""
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        self._started.wait(timeout)
+        if self._error is not None:
+            raise self._error
+        return self
+        
+    def stop(self, timeout=2.0, grace=0.5):
+        """Stop serving; clients get up to `grace` seconds to receive what's queued."""
+        if self._loop is not None and self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._shutdown(grace), self._loop)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            
+    def publish(self, state):
+        """Queue new state for broadcast; safe to call from any thread.
+        
+        Never blocks: the work of diffing and fanning out happens on the
+        server's own loop.
+        """
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._apply, dict(state))
+            except RuntimeError:
+                # The loop closed between the check and the call
+                pass
+                
+    def stats(self):
+        return {
+            "clients": len(self.clients),
+            "published": self.published,
+            "seq": self.seq,
+            "resyncs": self.resyncs + sum(client.resyncs for client in list(self.clients)),
+            "dropped_clients": self.dropped_clients,
+        }
+        
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port))
+            self.port = self._server.sockets[0].getsockname()[1]
+        except OSError as e:
+            self._error = e
+            self._started.set()
+            self._loop.close()
+            return
+        self._started.set()
+        try:
+            self._loop.run_forever()
+            # The aborted connections make the handlers return on their own
+            tasks = asyncio.all_tasks(self._loop)
+            if tasks:
+                self._loop.run_until_complete(asyncio.wait(tasks, timeout=1.0))
+        finally:
+            self._loop.close()
+            
+    async def _shutdown(self, grace):
+        self._server.close()
+        # The final "complete" delta is usually published just before stop()
+        deadline = self._loop.time() + grace
+        while self._loop.time() < deadline and any(client.queue or client.resync for client in self.clients):
+            await asyncio.sleep(0.01)
+        for client in list(self.clients):
+            client.writer.transport.abort()
+        self._loop.stop()
+        
+    def _apply(self, state):
+        # On the loop thread: work out what changed and fan it out
+        delta = {key: value for key, value in state.items() if self.state.get(key) != value}
+        if not delta:
+            return
+        self.state.update(delta)
+        self.seq += 1
+        self.published += 1
+        frame = encode_frame(self._encode("d", delta))
+        for client in self.clients:
+            client.push(frame)
+            
+    def _encode(self, kind, fields):
+        message = {"t": kind, "seq": self.seq}
+        message.update(fields)
+        return json.dumps(message, separators=(",", ":")).encode("utf-8")
+        
+    def _snapshot_frame(self):
+        if self._snapshot is None or self._snapshot[0] != self.seq:
+            self._snapshot = (self.seq, encode_frame(self._encode("s", self.state)))
+        return self._snapshot[1]
+        
+    async def _handle(self, reader, writer):
+        try:
+            headers = await self._read_request(reader)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, ConnectionError):
+            writer.close()
+            return
+        if headers is None:
+            return await self._respond(writer, "404 Not Found", "text/plain", b"Not found")
+        key = headers.get("sec-websocket-key")
+        if "websocket" not in headers.get("upgrade", "").lower() or not key:
+            return await self._respond(writer, "200 OK", "text/html; charset=utf-8", PAGE.encode("utf-8"))
+            
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept_key(key)}\r\n\r\n"
+        ).encode("ascii"))
+        # Keep the socket and transport buffers small so a stalled client
+        # backs up into its bounded queue instead of megabytes of buffers
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer)
+        writer.transport.set_write_buffer_limits(high=self.send_buffer)
+        client = Client(writer, self.queue_size)
+        self.clients.add(client)
+        sender = asyncio.ensure_future(self._send_loop(client))
+        try:
+            await self._receive_loop(reader, client)
+        finally:
+            sender.cancel()
+            self.clients.discard(client)
+            self.resyncs += client.resyncs
+            writer.close()
+            
+    async def _read_request(self, reader):
+        request = await reader.readuntil(b"\r\n\r\n")
+        lines = request.decode("latin-1").split("\r\n")
+        method, path, _ = lines[0].split(" ", 2)
+        if method != "GET" or path not in ("/", "/index.html"):
+            return None
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        return headers
+        
+    async def _respond(self, writer, status, content_type, body):
+        writer.write((
+            f"HTTP/1.1 {status}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode("ascii") + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+        
+    async def _receive_loop(self, reader, client):
+        # Clients only send control frames; anything else is ignored
+        while True:
+            try:
+                opcode, payload = await read_frame(reader)
+            except (asyncio.IncompleteReadError, ValueError, ConnectionError):
+                return
+            if opcode == OP_CLOSE:
+                client.writer.write(encode_frame(b"", OP_CLOSE))
+                return
+            if opcode == OP_PING:
+                client.writer.write(encode_frame(payload, OP_PONG))
+                
+    async def _send_loop(self, client):
+        writer = client.writer
+        try:
+            while True:
+                if not client.queue and not client.resync:
+                    client.ready.clear()
+                    await client.ready.wait()
+                if client.resync:
+                    client.resync = False
+                    client.queue.clear()
+                    frame = self._snapshot_frame()
+                else:
+                    frame = client.queue.popleft()
+                writer.write(frame)
+                client.sent += 1
+                await asyncio.wait_for(writer.drain(), self.send_timeout)
+        except asyncio.TimeoutError:
+            # Stalled for too long: hang up rather than hold its buffers
+            self.dropped_clients += 1
+            writer.transport.abort()
+        except ConnectionError:
+            writer.transport.abort()
+
+
+class EngineBroadcaster:
+    """Engine listener that publishes the timer's display state."""
+    
+    def __init__(self, server, engine):
+        self.server = server
+        self.engine = engine
+        
+    def __call__(self, event):
+        if event.kind == PAUSE:
+            state = "paused"
+        elif event.kind == COMPLETE_EVENT:
+            state = "complete"
+        elif event.kind == STOP:
+            state = "stopped"
+        else:
+            state = "running"
+        self.server.publish({
+            "state": state,
+            "name": event.name,
+            "set": event.set_index,
+            "sets": self.engine.sets,
+            "rep": event.rep_index,
+            "duration": event.duration,
+            "remaining": 0 if state == "complete" else event.remaining_seconds,
+            "elapsed": int(event.elapsed),
+            "total": self.engine.total_duration,
+        })
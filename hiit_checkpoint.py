@@ -0,0 +1,224 @@
+"""Crash-resumable checkpoints of the running workout.
+
+The session being timed is written to a fixed 128-byte file mapped into
+memory: two 64-byte slots, each a sequence number, the workout id, segment
+index, elapsed time, pause state, wall-clock time and a CRC-32. Updates
+alternate between the slots, so a write torn by a crash or power cut
+leaves the other slot intact, and the reader takes the valid slot with
+the highest sequence number.
+
+An update is a struct.pack_into() and a crc32 over 40 bytes in memory,
+with no system call; the dirty page is handed to the kernel at most every
+`flush_interval` seconds (and on pause and stop), so an SD card sees one
+small write every few seconds rather than a file rewrite per tick. The
+workout itself (reps, sets or program) changes only when a session
+starts, so it is written once, atomically, to a JSON file alongside, and
+the record refers to it by a CRC-32 of its contents.
+
+With a `writer` (a hiit_persist.WriteBehind) the workout file and the
+flushes are queued to it, so neither the Tk thread nor the engine waits
+on the disk.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import NamedTuple
+
+import hiit_engine
+from hiit_storage import atomic_write
+
+MAGIC = b"HIIT"
+VERSION = 1
+
+# State byte in a record
+CLEARED = 0
+RUNNING = 1
+PAUSED = 2
+
+# magic, version, state, seq, workout id, segment index, elapsed, wall time
+RECORD = struct.Struct("<4sBBxxQIidd")
+CRC = struct.Struct("<I")
+SLOT_SIZE = 64
+FILE_SIZE = 2 * SLOT_SIZE
+
+
+class Checkpoint(NamedTuple):
+    workout: dict
+    segment_index: int
+    elapsed: float
+    paused: bool
+    saved_at: float
+
+
+def session_workout(reps, sets, program=None, name=None):
+    """The workout record a session is resumed from."""
+    workout = {"sets": sets}
+    if name:
+        workout["name"] = name
+    if program is not None:
+        workout["program"] = program
+    else:
+        workout["reps"] = list(reps)
+    return workout
+
+
+def workout_id(workout):
+    return zlib.crc32(json.dumps(workout, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+
+
+def decode_slot(data):
+    """(seq, state, workout id, segment index, elapsed, saved at) or None."""
+    body = data[:RECORD.size]
+    (crc,) = CRC.unpack_from(data, RECORD.size)
+    if zlib.crc32(body) != crc:
+        return None
+    magic, version, state, seq, wid, index, elapsed, saved_at = RECORD.unpack(body)
+    if magic != MAGIC or version != VERSION:
+        return None
+    return seq, state, wid, index, elapsed, saved_at
+
+
+class SessionCheckpoint:
+    def __init__(self, path="hiit_session.ckpt", flush_interval=5.0, writer=None):
+        self.path = path
+        self.workout_path = os.path.splitext(path)[0] + ".json"
+        self.flush_interval = flush_interval
+        self.writer = writer
+        self.generation = 0
+        self._map = None
+        self._flush_queued = False
+        self._seq = 0
+        self._workout_id = 0
+        self._flushed_at = 0.0
+        # The engine thread writes while Tk may close the map
+        self._lock = threading.Lock()
+        
+    def load(self, max_age=24 * 3600):
+        """The interrupted session, if one was checkpointed in the last `max_age` seconds."""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read(FILE_SIZE)
+        except OSError:
+            return None
+        if len(data) < FILE_SIZE:
+            return None
+        slots = [decode_slot(data[i:i + SLOT_SIZE]) for i in (0, SLOT_SIZE)]
+        slots = [slot for slot in slots if slot is not None]
+        if not slots:
+            return None
+        seq, state, wid, index, elapsed, saved_at = max(slots)
+        if state == CLEARED or time.time() - saved_at > max_age:
+            return None
+        try:
+            with open(self.workout_path, "r", encoding="utf-8") as f:
+                workout = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if workout_id(workout) != wid:
+            # The workout file belongs to a different session
+            return None
+        return Checkpoint(workout, index, elapsed, state == PAUSED, saved_at)
+        
+    def begin(self, workout):
+        """Start checkpointing a new session; returns its engine listener."""
+        data = json.dumps(workout, indent=2)
+        if self.writer is None:
+            atomic_write(self.workout_path, data)
+        else:
+            self.writer.replace(self.workout_path, data)
+        with self._lock:
+            self._workout_id = workout_id(workout)
+            self.generation += 1
+            self._write(self._open(), RUNNING, 0, 0.0, flush=True)
+            return CheckpointWriter(self, self.generation)
+            
+    def update(self, generation, segment_index, elapsed, paused=False, flush=False):
+        with self._lock:
+            mapped = self._map
+            if generation != self.generation or mapped is None:
+                # A listener left over from an earlier session
+                return
+            self._write(mapped, PAUSED if paused else RUNNING, segment_index, elapsed, flush)
+            
+    def clear(self, generation=None):
+        """Forget the session: it finished or was stopped on purpose."""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._write(self._open(), CLEARED, 0, 0.0, flush=True)
+            
+    def close(self):
+        # Keeps the last record, so the session can still be resumed. Once
+        # the map is swapped out under the lock nothing writes to it again.
+        with self._lock:
+            self.generation += 1
+            mapped, self._map = self._map, None
+        if mapped is None:
+            return
+        if self.writer is None:
+            self._close_map(mapped)
+        else:
+            # Behind any flush still queued for this map
+            self.writer.submit(self._close_map, mapped, description="session checkpoint")
+            
+    @staticmethod
+    def _close_map(mapped):
+        mapped.flush()
+        mapped.close()
+        
+    def _open(self):
+        if self._map is not None:
+            return self._map
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < FILE_SIZE:
+                os.ftruncate(fd, FILE_SIZE)
+            self._map = mmap.mmap(fd, FILE_SIZE)
+        finally:
+            # The mapping keeps its own reference to the file
+            os.close(fd)
+        slots = [decode_slot(self._map[i:i + SLOT_SIZE]) for i in (0, SLOT_SIZE)]
+        self._seq = max((slot[0] for slot in slots if slot is not None), default=0)
+        return self._map
+        
+    def _write(self, mapped, state, segment_index, elapsed, flush):
+        self._seq += 1
+        offset = (self._seq % 2) * SLOT_SIZE
+        now = time.time()
+        RECORD.pack_into(mapped, offset, MAGIC, VERSION, state, self._seq, self._workout_id, segment_index, elapsed, now)
+        CRC.pack_into(mapped, offset + RECORD.size, zlib.crc32(mapped[offset:offset + RECORD.size]))
+        if flush or now - self._flushed_at >= self.flush_interval:
+            self._flushed_at = now
+            if self.writer is None:
+                mapped.flush()
+            elif not self._flush_queued:
+                # One flush in the queue covers every write before it runs
+                self._flush_queued = True
+                self.writer.submit(self._flush, mapped, description="session checkpoint")
+                
+    def _flush(self, mapped):
+        self._flush_queued = False
+        if not mapped.closed:
+            mapped.flush()
+
+
+class CheckpointWriter:
+    """Engine listener that records the session on every event."""
+    
+    def __init__(self, checkpoint, generation):
+        self.checkpoint = checkpoint
+        self.generation = generation
+        
+    def __call__(self, event):
+        kind = event.kind
+        if kind in (hiit_engine.COMPLETE_EVENT, hiit_engine.STOP):
+            self.checkpoint.clear(self.generation)
+        elif kind == hiit_engine.PAUSE:
+            self.checkpoint.update(self.generation, event.segment_index, event.elapsed, paused=True, flush=True)
+        elif kind != hiit_engine.SEEK:
+            # A seek is followed by the segment_start where it landed
+            self.checkpoint.update(self.generation, event.segment_index, event.elapsed)
@@ -0,0 +1,500 @@
+"""Command-line entry point for HIIT Me Up.
+
+    python hiit_cli.py                                  # the desktop app
+    python hiit_cli.py run --tabata
+    python hiit_cli.py run --sets 8 --rep Work:20 --rep Rest:10
+    python hiit_cli.py run --workout "Leg Day"
+    python hiit_cli.py run --program pyramid.json --dry-run
+    python hiit_cli.py run --resume                     # after a crash or reboot
+    python hiit_cli.py list
+    python hiit_cli.py stats --json
+    python hiit_cli.py stats --profile "Ana Lopez"    # another member's history
+    python hiit_cli.py replay                           # how the last session went
+
+Only the timer engine is imported up front. The library, history and audio
+modules are imported by the commands that use them, and customtkinter only
+by `gui`, so the headless commands start fast and work over SSH or on a
+kiosk with no display or GUI toolkit installed.
+"""
+import argparse
+import itertools
+import math
+import os
+import sys
+
+import hiit_engine
+import hiit_metrics
+from hiit_timeline import format_time
+
+TABATA = [{"name": "Work", "duration": 20}, {"name": "Rest", "duration": 10}]
+TABATA_SETS = 8
+DRY_RUN_LIMIT = 50
+
+
+def parse_rep(text):
+    # NAME:SECONDS; the name may itself contain colons
+    name, _, duration = text.rpartition(":")
+    name = name.strip()
+    try:
+        seconds = int(duration)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}' is not NAME:SECONDS")
+    if not name or seconds <= 0:
+        raise argparse.ArgumentTypeError(f"'{text}' needs a name and a positive number of seconds")
+    return {"name": name, "duration": seconds}
+
+
+def parse_interval(text):
+    # Seconds between countdown refreshes; 0 or less would never sleep
+    try:
+        seconds = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}' is not a number of seconds")
+    if not math.isfinite(seconds) or seconds <= 0:
+        raise argparse.ArgumentTypeError(f"'{text}' needs to be a positive number of seconds")
+    return seconds
+
+
+class TerminalDisplay:
+    """Engine listener that prints the workout to a terminal or a log.
+    
+    On a terminal the countdown is redrawn in place on one line; otherwise
+    only segment changes are printed, one line each.
+    """
+    
+    def __init__(self, engine, stream=None, live=None):
+        self.engine = engine
+        self.stream = stream if stream is not None else sys.stdout
+        self.live = self.stream.isatty() if live is None else live
+        self._line = ""
+        
+    def __call__(self, event):
+        if event.kind == hiit_engine.TICK:
+            if self.live:
+                remaining = self.engine.timeline.remaining(event.elapsed)
+                self._redraw(f"  {format_time(event.remaining_seconds)}   "
+                             f"elapsed {format_time(int(event.elapsed))}   "
+                             f"remaining {format_time(int(remaining + 0.999))}")
+        elif event.kind == hiit_engine.SEGMENT_START:
+            self._print(f"Set {event.set_index + 1} of {self.engine.sets} — {event.name} ({event.duration:g}s)")
+        elif event.kind == hiit_engine.PAUSE:
+            self._print("Paused")
+        elif event.kind == hiit_engine.RESUME:
+            self._print("Resumed")
+        elif event.kind == hiit_engine.STOP:
+            self._print("Stopped")
+        elif event.kind == hiit_engine.COMPLETE_EVENT:
+            self._print(f"Workout complete in {format_time(round(self.engine.active_time()))}!")
+            
+    def _redraw(self, text):
+        # Pad over whatever the previous, possibly longer, line left behind
+        self.stream.write("\r" + text.ljust(len(self._line)))
+        self.stream.flush()
+        self._line = text
+        
+    def _print(self, text):
+        if self._line:
+            self.stream.write("\r" + " " * len(self._line) + "\r")
+            self._line = ""
+        self.stream.write(text + "\n")
+        self.stream.flush()
+
+
+def program_timeline(program, sets):
+    from hiit_dsl import ProgramError, ProgramTimeline
+    
+    try:
+        return ProgramTimeline(program, sets)
+    except ProgramError as e:
+        raise SystemExit(f"Invalid program: {e}")
+
+
+def resolve_workout(args):
+    """Return (reps, sets, program) from the run options, or raise SystemExit.
+    
+    `program` is the structured definition for program workouts, whose
+    reps list is empty, and None otherwise.
+    """
+    if args.workout:
+        from hiit_library import WorkoutStore
+        
+        workout = WorkoutStore(args.workouts).get(args.workout)
+        if workout is None:
+            raise SystemExit(f"No saved workout named '{args.workout}' in {args.workouts}")
+        return workout.get("reps", []), args.sets or workout.get("sets", 1), workout.get("program")
+    if args.program:
+        import json
+        
+        try:
+            with open(args.program) as f:
+                program = json.load(f)
+        except (OSError, ValueError) as e:
+            raise SystemExit(f"Could not read {args.program}: {e}")
+        # A whole saved workout works as well as a bare program
+        if isinstance(program, dict) and "program" in program:
+            return [], args.sets or program.get("sets", 1), program["program"]
+        return [], args.sets or 1, program
+    if args.tabata:
+        return TABATA, args.sets or TABATA_SETS, None
+    if args.rep:
+        return args.rep, args.sets or 1, None
+    raise SystemExit("Nothing to run: pass --workout NAME, --program FILE, --tabata or one or more --rep NAME:SECONDS")
+
+
+def resolve_files(args):
+    """Fill in the file options left at their defaults, the way the app does.
+    
+    The workout library is the shared one in the data directory (see
+    hiit_persist); history and checkpoint belong to --profile, or else to
+    the profile that is active in the app.
+    """
+    from hiit_persist import data_path
+    from hiit_profiles import ProfileDirectory
+    
+    if getattr(args, "workouts", "") is None:
+        args.workouts = data_path("hiit_workouts.json")
+    # None is an option left at its default; "" is --no-history and the like
+    history = getattr(args, "history", "") is None
+    checkpoint = getattr(args, "checkpoint", "") is None
+    if not history and not checkpoint:
+        return
+    profiles = ProfileDirectory()
+    if args.profile is None:
+        profile = profiles.active()
+    else:
+        profile = profiles.find(args.profile)
+        if profile is None:
+            raise SystemExit(f"No profile called '{args.profile}'")
+    if history:
+        args.history = profile.file("hiit_history.jsonl")
+    if checkpoint:
+        args.checkpoint = profile.file("hiit_session.ckpt")
+
+
+def legacy_history(history):
+    # The hiit_history.json saved before the journal, next to the journal
+    return os.path.splitext(history)[0] + ".json"
+
+
+def load_checkpoint(args):
+    from hiit_checkpoint import SessionCheckpoint
+    
+    if not args.checkpoint:
+        raise SystemExit("--resume needs a checkpoint file")
+    saved = SessionCheckpoint(args.checkpoint).load()
+    if saved is None:
+        raise SystemExit(f"No interrupted workout to resume in {args.checkpoint}")
+    return saved
+
+
+def cmd_run(args):
+    resume = None
+    if args.resume:
+        resume = load_checkpoint(args)
+        workout = resume.workout
+        reps, sets, program = workout.get("reps", []), workout.get("sets", 1), workout.get("program")
+    else:
+        reps, sets, program = resolve_workout(args)
+    timeline = program_timeline(program, sets) if program is not None else None
+    
+    live = sys.stdout.isatty() if args.live is None else args.live
+    # Remote displays need the per-second countdown even when the terminal doesn't
+    ticking = live or bool(args.broadcast)
+    engine = hiit_engine.WorkoutEngine(reps, sets, tick_interval=args.tick if ticking else None, timeline=timeline)
+    if timeline is not None:
+        print(f"Program of {len(timeline)} intervals, total {format_time(int(engine.total_duration))}")
+    else:
+        print(f"{len(reps)} reps x {sets} sets, total {format_time(int(engine.total_duration))}")
+    if args.dry_run:
+        if timeline is None:
+            for rep in reps:
+                print(f"  {rep['name']}: {rep['duration']}s")
+            return 0
+        # Programs can run for hours; only the start is listed
+        for segment in itertools.islice(timeline, DRY_RUN_LIMIT):
+            print(f"  {format_time(int(segment.start))}  {segment.name}: {segment.duration:g}s")
+        if len(timeline) > DRY_RUN_LIMIT:
+            print(f"  ... and {len(timeline) - DRY_RUN_LIMIT} more")
+        return 0
+        
+    hiit_metrics.configure_from_env()
+    engine.subscribe(TerminalDisplay(engine, live=live))
+    
+    server = None
+    if args.broadcast:
+        from hiit_broadcast import BroadcastServer, EngineBroadcaster, parse_address
+        
+        host, port = parse_address(args.broadcast)
+        try:
+            server = BroadcastServer(host, port).start()
+        except OSError as e:
+            raise SystemExit(f"Could not listen on {args.broadcast}: {e}")
+        print(f"Broadcasting on http://{host}:{server.port}/")
+        engine.subscribe(EngineBroadcaster(server, engine))
+        
+    audio = None
+    if args.audio != "null":
+        from hiit_audio import AudioEngine, backend_from_spec
+        
+        audio = AudioEngine(backend_from_spec(args.audio))
+        
+        def cue(event):
+            if event.kind == hiit_engine.SEGMENT_START:
+                audio.play("beep")
+            elif event.kind == hiit_engine.COMPLETE_EVENT:
+                audio.play("complete")
+                
+        engine.subscribe(cue)
+        
+    checkpoint = None
+    if args.checkpoint:
+        from hiit_checkpoint import SessionCheckpoint, session_workout
+        
+        checkpoint = SessionCheckpoint(args.checkpoint)
+        try:
+            engine.subscribe(checkpoint.begin(session_workout(reps, sets, program)))
+        except OSError as e:
+            # Timing matters more than being able to resume
+            print(f"Checkpoints disabled: {e}", file=sys.stderr)
+            checkpoint = None
+            
+    telemetry = None
+    if args.history:
+        from hiit_telemetry import TelemetryRecorder
+        
+        telemetry = engine.subscribe(TelemetryRecorder())
+        
+    elapsed = 0.0
+    if resume is not None:
+        elapsed = resume.elapsed
+        print(f"Resuming at {format_time(int(elapsed))}")
+    try:
+        engine.run(elapsed)
+    except KeyboardInterrupt:
+        # Like Reset in the app: nothing is recorded and nothing to resume
+        engine.stop()
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        if audio is not None:
+            audio.close()
+        if server is not None:
+            server.stop()
+            
+    if engine.state != hiit_engine.COMPLETE:
+        return 130
+    if args.history:
+        from datetime import datetime
+        from hiit_history_store import HistoryStore
+        from hiit_telemetry import TelemetryLog, telemetry_path
+        
+        # Same entry the app writes, so the History tab shows CLI sessions
+        with hiit_metrics.timer("save_history_seconds"):
+            entry = {
+                "date": datetime.now().isoformat(),
+                "sets": sets,
+                "reps": list(reps),
+                "total_time": round(engine.active_time())
+            }
+            if program is not None:
+                entry["program"] = program
+            if telemetry.events:
+                try:
+                    entry["telemetry"] = TelemetryLog(telemetry_path(args.history)).append(telemetry.encode())
+                except OSError as e:
+                    print(f"Telemetry not saved: {e}", file=sys.stderr)
+            HistoryStore(args.history, legacy_history(args.history)).append(entry)
+    return 0
+
+
+def cmd_list(args):
+    from hiit_library import WorkoutStore, workout_summary, workout_total_duration
+    
+    workouts = WorkoutStore(args.workouts).load()
+    if not workouts:
+        print("No saved workouts found.")
+        return 0
+    for name, workout in sorted(workouts.items()):
+        print(f"{name}  ({workout_summary(workout)}, {format_time(int(workout_total_duration(workout)))})")
+    return 0
+
+
+def cmd_stats(args):
+    import json
+    
+    from hiit_analytics import HistoryStats
+    from hiit_history_store import HistoryStore
+    
+    stats = HistoryStats()
+    stats.build_store(HistoryStore(args.history, legacy_history(args.history)).open())
+    if args.json:
+        summary = stats.summary()
+        summary["weeks"] = [(monday.isoformat(), sessions, seconds) for monday, sessions, seconds in stats.recent_weeks(args.weeks)]
+        summary["exercises"] = dict(stats.top_exercises(None, include_rest=True))
+        print(json.dumps(summary, indent=2))
+        return 0
+    if not stats.sessions:
+        print("No workout history found.")
+        return 0
+    summary = stats.summary()
+    ratio = summary["work_rest_ratio"]
+    print(f"Sessions:        {summary['sessions']} ({format_time(int(summary['total_time']))})")
+    print(f"Current streak:  {summary['current_streak']} days (longest {summary['longest_streak']})")
+    print(f"This week:       {summary['this_week'][0]} sessions, {format_time(int(summary['this_week'][1]))}")
+    print(f"This month:      {summary['this_month'][0]} sessions, {format_time(int(summary['this_month'][1]))}")
+    print(f"Work : rest:     {'-' if ratio is None else f'{ratio:.2f} : 1'}")
+    print()
+    for monday, sessions, seconds in stats.recent_weeks(args.weeks):
+        print(f"week of {monday}  {sessions:>3} sessions  {format_time(int(seconds))}")
+    print()
+    for name, seconds in stats.top_exercises(10):
+        print(f"{name:<24} {format_time(int(seconds))}")
+    return 0
+
+
+def cmd_replay(args):
+    import json
+    
+    from hiit_history_store import HistoryStore
+    from hiit_telemetry import TelemetryLog, rebuild, telemetry_path
+    from hiit_timeline import WorkoutTimeline
+    
+    store = HistoryStore(args.history, legacy_history(args.history)).open()
+    if not len(store):
+        print("No workout history found.")
+        return 0
+    try:
+        entry = store[args.session]
+    except IndexError:
+        raise SystemExit(f"No session {args.session}: the history has {len(store)}")
+    ref = entry.get("telemetry")
+    data = TelemetryLog(telemetry_path(args.history)).read(ref) if ref else None
+    if data is None:
+        raise SystemExit(f"The session of {entry['date']} was recorded without telemetry")
+    try:
+        trace = rebuild(data)
+    except ValueError as e:
+        raise SystemExit(f"Could not replay the session of {entry['date']}: {e}")
+    if "program" in entry:
+        timeline = program_timeline(entry["program"], entry.get("sets", 1))
+    else:
+        timeline = WorkoutTimeline(entry.get("reps", []), entry.get("sets", 1))
+        
+    def planned(run):
+        # (name, seconds) the timeline had for the run's segment
+        if 0 <= run.index < len(timeline):
+            segment = timeline.segment(run.index)
+            return segment.name, segment.duration
+        return "?", 0
+        
+    if args.json:
+        runs = []
+        for run in trace.segments:
+            name, duration = planned(run)
+            runs.append(dict(run._asdict(), name=name, planned=duration, active=run.active))
+        print(json.dumps({
+            "date": entry["date"],
+            "completed": trace.completed,
+            "duration": trace.duration,
+            "paused": trace.paused,
+            "segments": runs,
+            "pauses": [pause._asdict() for pause in trace.pauses],
+        }, indent=2))
+        return 0
+    status = "completed" if trace.completed else "stopped"
+    print(f"{entry['date']}  {status} in {format_time(round(trace.duration))}, "
+          f"{len(trace.pauses)} pauses ({format_time(round(trace.paused))})")
+    for run in trace.segments:
+        name, duration = planned(run)
+        line = f"  {format_time(int(run.elapsed_start))}  {name:<20} planned {duration:g}s  ran {run.active:.1f}s"
+        if run.paused:
+            line += f"  paused {run.paused:.1f}s"
+        if run.skipped:
+            line += "  left early"
+        print(line)
+    return 0
+
+
+def cmd_gui(args):
+    # The only place the GUI toolkit gets imported
+    try:
+        import hiit_timer_app
+    except ImportError as e:
+        if "customtkinter" in str(e) or "tkinter" in str(e):
+            print("The desktop app needs CustomTkinter. Install it with:", file=sys.stderr)
+            print("pip install customtkinter", file=sys.stderr)
+            print("or use `python hiit_cli.py run` to time workouts in the terminal.", file=sys.stderr)
+            return 1
+        raise
+    hiit_timer_app.main()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="hiit_cli.py", description="HIIT Me Up timer.")
+    commands = parser.add_subparsers(dest="command")
+    
+    commands.add_parser("gui", help="open the desktop app (the default)")
+    
+    run = commands.add_parser("run", help="run a workout in the terminal")
+    source = run.add_mutually_exclusive_group()
+    source.add_argument("--workout", help="name of a saved workout")
+    source.add_argument("--program", metavar="FILE", help="JSON file with a structured program (see hiit_dsl)")
+    source.add_argument("--tabata", action="store_true", help="8 rounds of 20s work / 10s rest")
+    source.add_argument("--rep", action="append", type=parse_rep, metavar="NAME:SECONDS",
+                        help="add a rep; repeat for more")
+    source.add_argument("--resume", action="store_true", help="resume the workout that was interrupted by a crash or reboot")
+    run.add_argument("--sets", type=int, help="number of sets (overrides the saved workout)")
+    run.add_argument("--workouts", help="saved workouts file (default: the app's library)")
+    run.add_argument("--profile", help="member whose history and checkpoint to use (default: the app's active profile)")
+    run.add_argument("--history",
+                     help="history to record to (default: the profile's); a journal at this path is converted to the session store next to it")
+    run.add_argument("--no-history", dest="history", action="store_const", const="",
+                     help="don't record the session")
+    run.add_argument("--audio", default=os.environ.get("HIIT_AUDIO", "bell"),
+                     help="cue backend: null, bell, aplay, paplay, winsound or wav:DIR (default: bell)")
+    run.add_argument("--tick", type=parse_interval, default=0.25, help="countdown refresh interval in seconds")
+    run.add_argument("--live", action=argparse.BooleanOptionalAction, default=None,
+                     help="redraw the countdown in place (default: when stdout is a terminal)")
+    run.add_argument("--broadcast", metavar="HOST:PORT", default=os.environ.get("HIIT_BROADCAST"),
+                     help="mirror the timer to browsers and remote displays, e.g. :8765")
+    run.add_argument("--checkpoint",
+                     help="file the running session is checkpointed to, for --resume (default: the profile's)")
+    run.add_argument("--no-checkpoint", dest="checkpoint", action="store_const", const="",
+                     help="don't checkpoint the session")
+    run.add_argument("--dry-run", action="store_true", help="print the workout and exit")
+    
+    workouts = commands.add_parser("list", help="list saved workouts")
+    workouts.add_argument("--workouts", help="saved workouts file (default: the app's library)")
+    
+    stats = commands.add_parser("stats", help="show streaks and training totals from the history")
+    stats.add_argument("--profile", help="member whose history to read, as for run")
+    stats.add_argument("--history", help="history to read, as for run")
+    stats.add_argument("--weeks", type=int, default=8, help="number of recent weeks to list")
+    stats.add_argument("--json", action="store_true", help="print the figures as JSON")
+    
+    replay = commands.add_parser("replay", help="show how long each interval of a session really ran, and its pauses")
+    replay.add_argument("--profile", help="member whose history to read, as for run")
+    replay.add_argument("--history", help="history to read, as for run")
+    replay.add_argument("--session", type=int, default=-1, help="session number in the history, -1 for the latest (default)")
+    replay.add_argument("--json", action="store_true", help="print the session as JSON")
+    return parser
+
+
+COMMANDS = {"gui": cmd_gui, "run": cmd_run, "list": cmd_list, "stats": cmd_stats, "replay": cmd_replay}
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "run" and args.sets is not None and args.sets <= 0:
+        raise SystemExit("--sets must be at least 1")
+    resolve_files(args)
+    try:
+        return COMMANDS[args.command or "gui"](args)
+    finally:
+        # Final dump of any metrics collected by the command
+        hiit_metrics.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,486 @@
+"""Structured workout programs: circuits, ladders, pyramids and EMOM.
+
+A saved workout may carry a "program" instead of a flat reps list:
+
+    {
+      "name": "Burpee Pyramid",
+      "sets": 1,
+      "program": [
+        {"pyramid": "Burpees", "from": 10, "to": 40, "step": 10, "rest": 15},
+        {"repeat": 4, "do": [
+          {"name": "Sprint", "duration": 30},
+          {"name": "Rest", "duration": 60, "step": -10, "min": 20}
+        ]},
+        {"emom": 10, "work": [{"name": "Swings", "duration": 40},
+                              {"name": "Push-ups", "duration": 30}]}
+      ]
+    }
+
+Blocks are:
+
+- {"name", "duration"}: one interval. "step" changes the duration by that
+  much every round of the nearest enclosing repeat (or every set), kept
+  between "min" (default 1) and "max"
+- a list: the blocks one after another
+- {"repeat": N, "do": block}: the block N times
+- {"ladder": NAME, "from", "to", "step", "rest"}: intervals of from, from +
+  step, ... up to "to" seconds, with an optional rest (seconds or an
+  interval) between rungs
+- {"pyramid": NAME, ...}: a ladder up to "to" and back down again
+- {"emom": MINUTES, "work": interval(s), "every": 60, "rest": NAME}: at the
+  start of every minute one work interval, rotating through the list, and
+  rest for what is left of the minute
+
+Programs compile to a small tree that knows its segment count and, in
+closed form, its total duration. Segments are produced by generators or
+found by index or time with a walk down the tree, so a day-long program
+never exists as a list: ProgramTimeline offers the WorkoutTimeline
+interface on top of it for the engine, previews and remaining time.
+"""
+import math
+from bisect import bisect_right
+from itertools import accumulate
+
+from hiit_timeline import Segment, WorkoutTimeline
+
+MAX_DEPTH = 32
+
+
+class ProgramError(ValueError):
+    pass
+
+
+def clamped_sum(start, step, low, high, n):
+    """Sum of clamp(start + step * k, low, high) for k in range(n)."""
+    if n <= 0:
+        return 0.0
+    if step == 0:
+        return n * min(max(start, low), high)
+    if step > 0:
+        # Held at `low` until k_in, linear until k_out, then held at `high`
+        k_in = min(n, max(0, math.ceil((low - start) / step)))
+        k_out = n if high == math.inf else min(n, max(k_in, math.floor((high - start) / step) + 1))
+        edge_before, edge_after = low, high
+    else:
+        k_in = 0 if high == math.inf else min(n, max(0, math.ceil((start - high) / -step)))
+        k_out = min(n, max(k_in, math.floor((start - low) / -step) + 1))
+        edge_before, edge_after = high, low
+    linear = (k_out - k_in) * start + step * (k_in + k_out - 1) * (k_out - k_in) / 2
+    # Skip empty edges so an infinite bound never meets a zero count
+    before = edge_before * k_in if k_in else 0.0
+    after = edge_after * (n - k_out) if n > k_out else 0.0
+    return before + linear + after
+
+
+class Interval:
+    def __init__(self, name, duration, step=0, low=1, high=math.inf):
+        self.name = name
+        self.base = duration
+        self.step = step
+        self.low = low
+        self.high = high
+        self.count = 1
+        self.varies = step != 0
+        
+    def duration(self, r):
+        return min(max(self.base + self.step * r, self.low), self.high)
+        
+    def total(self, r):
+        return self.duration(r)
+        
+    def total_rounds(self, n):
+        return clamped_sum(self.base, self.step, self.low, self.high, n)
+        
+    def iter(self, r):
+        yield self.name, self.duration(r)
+        
+    def segment(self, i, r):
+        return self.name, self.duration(r), 0.0
+        
+    def find(self, t, r):
+        return 0, self.name, self.duration(r), 0.0
+        
+    def names(self):
+        yield self.name
+
+
+class Sequence:
+    def __init__(self, children):
+        self.children = children
+        self._counts = [0] + list(accumulate(child.count for child in children))
+        self.count = self._counts[-1]
+        self.varies = any(child.varies for child in children)
+        # Start offsets don't change between rounds unless a child varies
+        self._offsets = None if self.varies else [0.0] + list(accumulate(child.total(0) for child in children))
+        
+    def total(self, r):
+        if self._offsets is not None:
+            return self._offsets[-1]
+        return sum(child.total(r) for child in self.children)
+        
+    def total_rounds(self, n):
+        if self._offsets is not None:
+            return n * self._offsets[-1]
+        return sum(child.total_rounds(n) for child in self.children)
+        
+    def iter(self, r):
+        for child in self.children:
+            yield from child.iter(r)
+            
+    def names(self):
+        for child in self.children:
+            yield from child.names()
+            
+    def segment(self, i, r):
+        j = bisect_right(self._counts, i) - 1
+        if self._offsets is not None:
+            offset = self._offsets[j]
+        else:
+            offset = sum(child.total(r) for child in self.children[:j])
+        name, duration, inner = self.children[j].segment(i - self._counts[j], r)
+        return name, duration, offset + inner
+        
+    def find(self, t, r):
+        if self._offsets is not None:
+            j = min(bisect_right(self._offsets, t) - 1, len(self.children) - 1)
+            offset = self._offsets[j]
+        else:
+            offset = 0.0
+            for j, child in enumerate(self.children):
+                length = child.total(r)
+                if t < offset + length or j == len(self.children) - 1:
+                    break
+                offset += length
+        i, name, duration, inner = self.children[j].find(t - offset, r)
+        return self._counts[j] + i, name, duration, offset + inner
+
+
+class Repeat:
+    def __init__(self, times, body):
+        self.times = times
+        self.body = body
+        self.count = times * body.count
+        self.varies = False
+        self._total = body.total_rounds(times)
+        
+    def total(self, r):
+        return self._total
+        
+    def total_rounds(self, n):
+        return n * self._total
+        
+    def iter(self, r):
+        for k in range(self.times):
+            yield from self.body.iter(k)
+            
+    def names(self):
+        return self.body.names()
+        
+    def segment(self, i, r):
+        k, j = divmod(i, self.body.count)
+        name, duration, inner = self.body.segment(j, k)
+        return name, duration, self.body.total_rounds(k) + inner
+        
+    def find(self, t, r):
+        body = self.body
+        if not body.varies:
+            k = min(int(t // body.total(0)), self.times - 1)
+        else:
+            # Last round starting at or before t; round starts are closed form
+            lo, hi = 0, self.times - 1
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                if body.total_rounds(mid) <= t:
+                    lo = mid
+                else:
+                    hi = mid - 1
+            k = lo
+        start = body.total_rounds(k)
+        j, name, duration, inner = body.find(t - start, k)
+        return k * body.count + j, name, duration, start + inner
+
+
+class Ladder:
+    def __init__(self, name, start, step, rungs, rest=None):
+        self.name = name
+        self.start = start
+        self.step = step
+        self.rungs = rungs
+        self.rest = rest
+        self.count = rungs + (rungs - 1 if rest else 0)
+        self.varies = bool(rest and rest.varies)
+        self._work = rungs * start + step * rungs * (rungs - 1) / 2
+        
+    def rung(self, k):
+        return self.start + self.step * k
+        
+    def rung_start(self, k, rest):
+        # Work of the first k rungs plus the k rests after them
+        return k * self.start + self.step * k * (k - 1) / 2 + k * rest
+        
+    def total(self, r):
+        return self._work + (self.rungs - 1) * (self.rest.duration(r) if self.rest else 0)
+        
+    def total_rounds(self, n):
+        rests = (self.rungs - 1) * self.rest.total_rounds(n) if self.rest else 0
+        return n * self._work + rests
+        
+    def iter(self, r):
+        for k in range(self.rungs):
+            if k and self.rest:
+                yield self.rest.name, self.rest.duration(r)
+            yield self.name, self.rung(k)
+            
+    def names(self):
+        yield self.name
+        if self.rest and self.rungs > 1:
+            yield self.rest.name
+            
+    def segment(self, i, r):
+        rest = self.rest.duration(r) if self.rest else 0
+        k, is_rest = divmod(i, 2) if self.rest else (i, 0)
+        offset = self.rung_start(k, rest)
+        if is_rest:
+            return self.rest.name, rest, offset + self.rung(k)
+        return self.name, self.rung(k), offset
+        
+    def find(self, t, r):
+        rest = self.rest.duration(r) if self.rest else 0
+        # rung_start(k) = step/2 k^2 + (start + rest - step/2) k; solve for k
+        a, b = self.step / 2, self.start + rest - self.step / 2
+        if a:
+            disc = max(b * b + 4 * a * t, 0.0)
+            k = int((-b + math.sqrt(disc)) / (2 * a))
+        else:
+            k = int(t // b)
+        k = min(max(k, 0), self.rungs - 1)
+        while k > 0 and self.rung_start(k, rest) > t:
+            k -= 1
+        while k + 1 < self.rungs and self.rung_start(k + 1, rest) <= t:
+            k += 1
+        offset = self.rung_start(k, rest)
+        index = 2 * k if self.rest else k
+        if self.rest and k + 1 < self.rungs and t >= offset + self.rung(k):
+            return index + 1, self.rest.name, rest, offset + self.rung(k)
+        return index, self.name, self.rung(k), offset
+
+
+class Emom:
+    def __init__(self, minutes, every, work, rest_name="Rest"):
+        self.minutes = minutes
+        self.every = every
+        self.work = work
+        self.rest_name = rest_name
+        # Segments in each minute: the work, plus rest if it leaves any
+        self._per_minute = [1 + (item.base < every) for item in work]
+        self._cycle = [0] + list(accumulate(self._per_minute))
+        cycles, extra = divmod(minutes, len(work))
+        self.count = cycles * self._cycle[-1] + self._cycle[extra]
+        self.varies = False
+        
+    def total(self, r):
+        return self.minutes * self.every
+        
+    def total_rounds(self, n):
+        return n * self.minutes * self.every
+        
+    def iter(self, r):
+        for m in range(self.minutes):
+            item = self.work[m % len(self.work)]
+            yield item.name, item.base
+            if item.base < self.every:
+                yield self.rest_name, self.every - item.base
+                
+    def names(self):
+        # Only the work intervals that get a minute, each followed by the
+        # rest if it leaves some
+        for item in self.work[:self.minutes]:
+            yield item.name
+            if item.base < self.every:
+                yield self.rest_name
+                
+    def _minute(self, m, second):
+        item = self.work[m % len(self.work)]
+        start = m * self.every
+        if second:
+            return self.rest_name, self.every - item.base, start + item.base
+        return item.name, item.base, start
+        
+    def segment(self, i, r):
+        cycle, rest = divmod(i, self._cycle[-1])
+        j = bisect_right(self._cycle, rest) - 1
+        return self._minute(cycle * len(self.work) + j, rest - self._cycle[j])
+        
+    def find(self, t, r):
+        m = min(int(t // self.every), self.minutes - 1)
+        item = self.work[m % len(self.work)]
+        second = int(t - m * self.every >= item.base and item.base < self.every)
+        cycle, j = divmod(m, len(self.work))
+        index = cycle * self._cycle[-1] + self._cycle[j] + second
+        return (index,) + self._minute(m, second)
+
+
+def _number(spec, key, path, default=None, minimum=None):
+    value = spec.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ProgramError(f"{path}: '{key}' must be a number")
+    if minimum is not None and value < minimum:
+        raise ProgramError(f"{path}: '{key}' must be at least {minimum}")
+    return value
+
+
+def _count(spec, key, path):
+    value = spec.get(key)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ProgramError(f"{path}: '{key}' must be a whole number of at least 1")
+    return value
+
+
+def _interval(spec, path, name=None):
+    if isinstance(spec, (int, float)) and not isinstance(spec, bool):
+        # A bare number of seconds, as allowed for rests
+        spec = {"name": name or "Rest", "duration": spec}
+    if not isinstance(spec, dict) or "duration" not in spec:
+        raise ProgramError(f"{path}: expected an interval with a name and duration")
+    label = spec.get("name", name)
+    if not isinstance(label, str) or not label.strip():
+        raise ProgramError(f"{path}: interval needs a name")
+    low = _number(spec, "min", path, 1, minimum=1)
+    return Interval(
+        label.strip(),
+        _number(spec, "duration", path, minimum=low),
+        _number(spec, "step", path, 0),
+        low,
+        _number(spec, "max", path, math.inf, minimum=low),
+    )
+
+
+def _ladder(spec, path, name, pyramid):
+    if not isinstance(name, str) or not name.strip():
+        raise ProgramError(f"{path}: ladder needs an interval name")
+    start = _number(spec, "from", path, minimum=1)
+    stop = _number(spec, "to", path, minimum=1)
+    step = abs(_number(spec, "step", path))
+    if not step and start != stop:
+        raise ProgramError(f"{path}: 'step' must not be 0")
+    step = step if stop >= start else -step
+    rungs = int((stop - start) / step + 1e-9) + 1 if step else 1
+    rest = _interval(spec["rest"], f"{path}.rest") if spec.get("rest") else None
+    up = Ladder(name.strip(), start, step, rungs, rest)
+    if not pyramid or rungs == 1:
+        return up
+    down = Ladder(name.strip(), up.rung(rungs - 2), -step, rungs - 1, rest)
+    return Sequence([up, rest, down] if rest else [up, down])
+
+
+def compile_block(spec, path="program", depth=0):
+    """Compile one block of a program definition into its tree."""
+    if depth > MAX_DEPTH:
+        raise ProgramError(f"{path}: nested more than {MAX_DEPTH} levels deep")
+    if isinstance(spec, list):
+        children = [compile_block(child, f"{path}[{i}]", depth + 1) for i, child in enumerate(spec)]
+        if not children:
+            raise ProgramError(f"{path}: empty list of blocks")
+        return children[0] if len(children) == 1 else Sequence(children)
+    if not isinstance(spec, dict):
+        raise ProgramError(f"{path}: expected a block, got {type(spec).__name__}")
+    if "repeat" in spec:
+        if "do" not in spec:
+            raise ProgramError(f"{path}: repeat needs a 'do' block")
+        return Repeat(_count(spec, "repeat", path), compile_block(spec["do"], f"{path}.do", depth + 1))
+    if "ladder" in spec:
+        return _ladder(spec, path, spec["ladder"], pyramid=False)
+    if "pyramid" in spec:
+        return _ladder(spec, path, spec["pyramid"], pyramid=True)
+    if "emom" in spec:
+        every = _number(spec, "every", path, 60, minimum=1)
+        work = spec.get("work")
+        work = work if isinstance(work, list) else [work]
+        items = [_interval(item, f"{path}.work[{i}]") for i, item in enumerate(work)]
+        if not items:
+            raise ProgramError(f"{path}: emom needs at least one work interval")
+        for i, item in enumerate(items):
+            if item.step:
+                raise ProgramError(f"{path}.work[{i}]: emom work cannot change per round")
+            if item.base > every:
+                raise ProgramError(f"{path}.work[{i}]: longer than the {every}s EMOM interval")
+        return Emom(_count(spec, "emom", path), every, items, spec.get("rest") or "Rest")
+    return _interval(spec, path)
+
+
+def compile_program(program, sets=1):
+    """Compile a program, repeated `sets` times, into its tree."""
+    root = compile_block(program)
+    if sets > 1:
+        root = Repeat(sets, root)
+    return root
+
+
+def program_names(program):
+    """Distinct interval names in a program, in order, without expanding it.
+    
+    Raises ProgramError if the definition does not compile.
+    """
+    return list(dict.fromkeys(compile_block(program).names()))
+
+
+class ProgramTimeline:
+    """WorkoutTimeline for a program; segments are computed, never stored."""
+    
+    def __init__(self, program, sets=1):
+        self.program = program
+        self.sets = max(sets, 1)
+        self.root = compile_program(program, self.sets)
+        self.per_set = self.root.count // self.sets
+        self.reps = []
+        self._total = float(self.root.total(0))
+        
+    def __len__(self):
+        return self.root.count
+        
+    @property
+    def total(self):
+        return self._total
+        
+    def offset(self, index):
+        if index >= len(self):
+            return self._total
+        return float(self.root.segment(max(index, 0), 0)[2])
+        
+    def _segment(self, index, name, duration, start):
+        set_index, rep_index = divmod(index, self.per_set)
+        return Segment(index, set_index, rep_index, name, duration, float(start))
+        
+    def segment(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._segment(index, *self.root.segment(index, 0))
+        
+    def index_at(self, t):
+        if t >= self._total:
+            return len(self)
+        return self.root.find(max(t, 0.0), 0)[0]
+        
+    segment_at = WorkoutTimeline.segment_at
+    remaining = WorkoutTimeline.remaining
+    progress = WorkoutTimeline.progress
+    
+    def __iter__(self):
+        start = 0.0
+        for index, (name, duration) in enumerate(self.root.iter(0)):
+            yield self._segment(index, name, duration, start)
+            start += duration
+
+
+def expand(program, sets=1):
+    """Yield the program's intervals as {'name', 'duration'} dicts, lazily."""
+    for name, duration in compile_program(program, sets).iter(0):
+        yield {"name": name, "duration": duration}
+
+
+def workout_timeline(workout):
+    """Timeline for a saved workout, flat reps or program."""
+    sets = workout.get("sets", 1)
+    if "program" in workout:
+        return ProgramTimeline(workout["program"], sets)
+    return WorkoutTimeline(workout["reps"], sets)
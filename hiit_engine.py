@@ -0,0 +1,287 @@
+"""Headless workout state machine.
+
+The engine knows nothing about Tk: it walks through the sets and reps of a
+workout on an injectable clock and publishes events to its subscribers. The
+GUI is just one subscriber; tests, simulations and other front ends can be
+others.
+"""
+import math
+import threading
+import time
+from typing import Callable, List, NamedTuple
+
+import hiit_metrics
+from hiit_scheduler import TIME_EPSILON, DeadlineScheduler
+from hiit_timeline import WorkoutTimeline
+
+# Engine states
+IDLE = "idle"
+RUNNING = "running"
+PAUSED = "paused"
+COMPLETE = "complete"
+STOPPED = "stopped"
+
+# Event kinds
+SEGMENT_START = "segment_start"
+TICK = "tick"
+PAUSE = "pause"
+RESUME = "resume"
+COMPLETE_EVENT = "complete"
+STOP = "stop"
+SEEK = "seek"
+
+
+class EngineEvent(NamedTuple):
+    kind: str
+    set_index: int
+    rep_index: int
+    name: str
+    duration: float
+    remaining: float
+    elapsed: float
+    segment_index: int = -1
+    
+    @property
+    def remaining_seconds(self):
+        # Whole seconds as shown on a countdown display
+        return max(0, math.ceil(self.remaining - 1e-6))
+
+
+class ManualClock:
+    """Clock that only moves when told to, for simulations and tests."""
+    
+    def __init__(self, start=0.0):
+        self.now = start
+        
+    def __call__(self):
+        return self.now
+        
+    def sleep(self, seconds):
+        self.now += max(seconds, 0.0)
+        
+    advance = sleep
+
+
+class WorkoutEngine:
+    def __init__(self, reps, sets, clock=time.monotonic, sleep=None, tick_interval=1.0, timeline=None):
+        # `reps` is a list of {'name': str, 'duration': int}, repeated `sets`
+        # times. A tick_interval of None disables ticks so that simulations
+        # only pay for segment changes.
+        self.reps = list(reps)
+        self.sets = sets
+        self.timeline = timeline if timeline is not None else WorkoutTimeline(self.reps, sets)
+        self.tick_interval = tick_interval
+        self.scheduler = DeadlineScheduler(clock=clock, sleep=sleep)
+        self.state = IDLE
+        self.segment = None
+        self.segment_index = -1
+        self.segment_start = 0.0
+        self.segment_end = 0.0
+        self._next_tick = None
+        self._listeners: List[Callable[[EngineEvent], None]] = []
+        self._lock = threading.RLock()
+        self._thread = None
+        
+    @property
+    def segment_count(self):
+        return len(self.timeline)
+        
+    @property
+    def total_duration(self):
+        return self.timeline.total
+        
+    @property
+    def current_set(self):
+        return self.segment.set_index if self.segment else 0
+        
+    @property
+    def current_rep(self):
+        return self.segment.rep_index if self.segment else 0
+        
+    @property
+    def is_running(self):
+        return self.state in (RUNNING, PAUSED)
+        
+    @property
+    def is_paused(self):
+        return self.state == PAUSED
+        
+    def elapsed(self):
+        return self.scheduler.elapsed()
+        
+    def active_time(self):
+        # Time actually trained: pauses and skipped stretches don't count
+        return self.scheduler.active()
+        
+    def remaining(self):
+        return self.timeline.remaining(self.scheduler.elapsed())
+        
+    def progress(self):
+        return self.timeline.progress(self.scheduler.elapsed())
+        
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+        return listener
+        
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+            
+    def start(self, elapsed=0.0):
+        with self._lock:
+            if self.state != IDLE:
+                return
+            if not self.segment_count or elapsed >= self.timeline.total:
+                self.state = COMPLETE
+                self._emit(COMPLETE_EVENT, self.timeline.total)
+                return
+            self.scheduler.start(elapsed)
+            self.state = RUNNING
+            self._enter_segment(self.timeline.index_at(elapsed), elapsed)
+            self.poll()
+            
+    def poll(self):
+        """Emit every event that is due at the current clock time."""
+        with self._lock:
+            if self.state != RUNNING:
+                return
+            elapsed = self.scheduler.elapsed()
+            # Compared with the same tolerance sleep_until() wakes up with
+            due = elapsed + TIME_EPSILON
+            while due >= self.segment_end:
+                if self.segment_index + 1 >= self.segment_count:
+                    self._complete()
+                    return
+                self._enter_segment(self.segment_index + 1)
+            if self._next_tick is not None and due >= self._next_tick:
+                hiit_metrics.observe("tick_lateness_seconds", max(0.0, elapsed - self._next_tick))
+                self._emit(TICK, elapsed)
+                # Keep ticks on the segment's own grid even after a seek
+                ticks = math.floor((due - self.segment_start) / self.tick_interval) + 1
+                self._next_tick = self.segment_start + ticks * self.tick_interval
+                
+    def next_deadline(self):
+        # Workout time of the next event, in seconds of elapsed time
+        if self._next_tick is None:
+            return self.segment_end
+        return min(self._next_tick, self.segment_end)
+        
+    def run(self, elapsed=0.0):
+        """Drive the engine on the calling thread until it finishes."""
+        self.start(elapsed)
+        while self.is_running:
+            self.poll()
+            if not self.is_running:
+                break
+            if not self.scheduler.sleep_until(self.next_deadline()):
+                break
+                
+    def run_in_thread(self, elapsed=0.0):
+        self._thread = threading.Thread(target=self.run, args=(elapsed,))
+        self._thread.daemon = True
+        self._thread.start()
+        return self._thread
+        
+    def pause(self):
+        with self._lock:
+            if self.state != RUNNING:
+                return
+            self.scheduler.pause()
+            self.state = PAUSED
+            self._emit(PAUSE)
+            
+    def resume(self):
+        with self._lock:
+            if self.state != PAUSED:
+                return
+            self.scheduler.resume()
+            self.state = RUNNING
+            self._emit(RESUME)
+            
+    def toggle_pause(self):
+        if self.state == PAUSED:
+            self.resume()
+        else:
+            self.pause()
+            
+    def seek(self, t):
+        """Jump to workout time `t`, keeping the paused/running state."""
+        with self._lock:
+            if not self.is_running:
+                return
+            t = min(max(t, 0.0), self.timeline.total)
+            # The seek event reports the position being left; the following
+            # segment_start reports where we landed
+            self._emit(SEEK)
+            self.scheduler.seek(t)
+            if t >= self.timeline.total:
+                self._complete()
+                return
+            self._enter_segment(self.timeline.index_at(t), t)
+            self.poll()
+            
+    def skip(self):
+        self.seek(self.timeline.offset(self.segment_index + 1))
+        
+    def back(self):
+        # Restart the current segment, or go to the previous one when we
+        # are already at its very start
+        with self._lock:
+            index = self.segment_index
+            if self.scheduler.elapsed() - self.segment_start < 1.0:
+                index -= 1
+            self.seek(self.timeline.offset(max(index, 0)))
+            
+    def stop(self):
+        with self._lock:
+            if not self.is_running:
+                return
+            self.state = STOPPED
+            self.scheduler.stop()
+            self._emit(STOP)
+            
+    def _enter_segment(self, index, elapsed=None):
+        self.segment = self.timeline.segment(index)
+        self.segment_index = index
+        self.segment_start = self.segment.start
+        self.segment_end = self.segment.end
+        if elapsed is None:
+            elapsed = self.segment_start
+        if self.tick_interval:
+            self._next_tick = elapsed
+        self._emit(SEGMENT_START, elapsed)
+        
+    def _complete(self):
+        self.state = COMPLETE
+        self.scheduler.stop(self.timeline.total)
+        self._emit(COMPLETE_EVENT, self.timeline.total)
+        
+    def _emit(self, kind, elapsed=None):
+        if elapsed is None:
+            elapsed = self.scheduler.elapsed()
+        segment = self.segment
+        if segment is not None:
+            event = EngineEvent(
+                kind,
+                segment.set_index,
+                segment.rep_index,
+                segment.name,
+                segment.duration,
+                max(0.0, segment.end - elapsed),
+                elapsed,
+                segment.index,
+            )
+        else:
+            event = EngineEvent(kind, 0, 0, "", 0, 0.0, elapsed)
+        for listener in list(self._listeners):
+            listener(event)
+
+
+def simulate_workout(reps, sets, tick_interval=None, listener=None):
+    """Run a whole workout instantly on a ManualClock and return the engine."""
+    clock = ManualClock()
+    engine = WorkoutEngine(reps, sets, clock=clock, sleep=clock.sleep, tick_interval=tick_interval)
+    if listener is not None:
+        engine.subscribe(listener)
+    engine.run()
+    return engine
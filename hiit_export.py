@@ -0,0 +1,235 @@
+"""Streaming workout history export.
+
+Entries are written in chunks on a worker thread with progress reporting
+and cancellation, so exporting a long history never blocks the UI. The
+output goes to a temporary file that only replaces the target once the
+export has finished.
+
+Headless use:
+
+    python hiit_export.py --format csv --out history.csv
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+
+from hiit_dsl import ProgramError, compile_block
+from hiit_timeline import format_time
+
+
+FORMATS = ("txt", "csv", "jsonl")
+CSV_COLUMNS = ["date", "sets", "reps_per_set", "total_time", "reps", "program"]
+
+DONE = "done"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+
+def format_for_path(path, default="txt"):
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    return ext if ext in FORMATS else default
+
+
+def program_text(workout):
+    # Programs are exported as written; expanded they can be huge
+    program = workout.get("program")
+    return "" if program is None else json.dumps(program, separators=(",", ":"))
+
+
+def reps_per_set(workout):
+    # Intervals per set; a program's are counted from its compiled tree
+    program = workout.get("program")
+    if program is None:
+        return len(workout.get("reps") or [])
+    try:
+        return compile_block(program).count
+    except ProgramError:
+        return ""
+
+
+class TextWriter:
+    def header(self):
+        return "HIIT Me Up - Workout History\n" + "=" * 40 + "\n\n"
+        
+    def entry(self, workout):
+        date = datetime.fromisoformat(workout["date"]).strftime("%Y-%m-%d %H:%M:%S")
+        lines = [
+            f"Date: {date}\n",
+            f"Sets: {workout['sets']}\n",
+            f"Total Time: {format_time(workout['total_time'])}\n",
+        ]
+        reps = workout.get("reps") or []
+        if "program" in workout:
+            lines.append(f"Program: {program_text(workout)}\n")
+        if reps or "program" not in workout:
+            lines.append("Reps:\n")
+        for rep in reps:
+            lines.append(f"  - {rep['name']}: {rep['duration']}s\n")
+        lines.append("\n" + "-" * 40 + "\n\n")
+        return "".join(lines)
+
+
+class CsvWriter:
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        
+    def _row(self, row):
+        self._writer.writerow(row)
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return text
+        
+    def header(self):
+        return self._row(CSV_COLUMNS)
+        
+    def entry(self, workout):
+        reps = ";".join(f"{rep['name']}:{rep['duration']}" for rep in workout.get("reps") or [])
+        return self._row([workout["date"], workout["sets"], reps_per_set(workout), workout["total_time"], reps, program_text(workout)])
+
+
+class JsonlWriter:
+    def header(self):
+        return ""
+        
+    def entry(self, workout):
+        return json.dumps(workout, separators=(",", ":")) + "\n"
+
+
+WRITERS = {"txt": TextWriter, "csv": CsvWriter, "jsonl": JsonlWriter}
+
+
+class HistoryExporter:
+    def __init__(self, entries, path, fmt=None, chunk_size=500, total=None, on_progress=None, on_done=None):
+        # `entries` may be a list or any iterable, e.g. a journal read lazily.
+        # Callbacks run on the worker thread: on_progress(written, total) after
+        # each chunk and on_done(status, written, error) at the end.
+        self.entries = entries
+        self.path = path
+        self.fmt = fmt or format_for_path(path)
+        if self.fmt not in WRITERS:
+            raise ValueError(f"Unknown export format: {self.fmt}")
+        self.chunk_size = chunk_size
+        self.total = total if total is not None else (len(entries) if hasattr(entries, "__len__") else None)
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.written = 0
+        self.status = None
+        self.error = None
+        self._cancel = threading.Event()
+        self._thread = None
+        
+    def cancel(self):
+        self._cancel.set()
+        
+    def join(self, timeout=None):
+        # Wait for the worker to finish, e.g. after cancel()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+        
+    def start(self):
+        self._thread = threading.Thread(target=self.run)
+        self._thread.daemon = True
+        self._thread.start()
+        return self._thread
+        
+    def run(self):
+        writer = WRITERS[self.fmt]()
+        part_path = self.path + ".part"
+        try:
+            with open(part_path, "w", newline="", encoding="utf-8") as f:
+                f.write(writer.header())
+                chunk = []
+                for workout in self.entries:
+                    chunk.append(writer.entry(workout))
+                    if len(chunk) >= self.chunk_size:
+                        if self._flush(f, chunk):
+                            break
+                        chunk = []
+                else:
+                    self._flush(f, chunk)
+            if self._cancel.is_set():
+                os.unlink(part_path)
+                self.status = CANCELLED
+            else:
+                os.replace(part_path, self.path)
+                self.status = DONE
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.error = e
+            self.status = FAILED
+            try:
+                os.unlink(part_path)
+            except OSError:
+                pass
+        if self.on_done:
+            self.on_done(self.status, self.written, self.error)
+        return self.status
+        
+    def _flush(self, f, chunk):
+        # Returns True when the export has been cancelled
+        f.write("".join(chunk))
+        self.written += len(chunk)
+        if self.on_progress:
+            self.on_progress(self.written, self.total)
+        return self._cancel.is_set()
+
+
+def export_history(entries, path, fmt=None, chunk_size=500):
+    """Export on the calling thread; returns the number of entries written."""
+    exporter = HistoryExporter(entries, path, fmt=fmt, chunk_size=chunk_size)
+    if exporter.run() == FAILED:
+        raise exporter.error
+    return exporter.written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export HIIT Me Up workout history.")
+    parser.add_argument("--profile", help="member whose history to export (default: the app's active profile)")
+    parser.add_argument("--history", help="history to read (default: the profile's); a journal is converted to the session store first")
+    parser.add_argument("--out", required=True, help="file to write")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the --out extension, else txt")
+    args = parser.parse_args(argv)
+    if args.history is None:
+        from hiit_profiles import ProfileDirectory
+        
+        # The same history the app shows for that member
+        profiles = ProfileDirectory()
+        profile = profiles.active() if args.profile is None else profiles.find(args.profile)
+        if profile is None:
+            parser.error(f"no profile called '{args.profile}'")
+        args.history = profile.file("hiit_history.jsonl")
+        
+    def progress(written, total):
+        print(f"\rExported {written} entries", end="", file=sys.stderr)
+        
+    if args.history.endswith(".json"):
+        # History saved before the journal existed
+        with open(args.history, "r") as f:
+            entries = json.load(f)
+    else:
+        from hiit_history_store import HistoryStore
+        
+        entries = HistoryStore(args.history, os.path.splitext(args.history)[0] + ".json").open()
+        
+    exporter = HistoryExporter(entries, args.out, fmt=args.format, on_progress=progress)
+    status = exporter.run()
+    print(file=sys.stderr)
+    if status != DONE:
+        print(f"Export {status}", file=sys.stderr)
+        return 1
+    print(f"History exported to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
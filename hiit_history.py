@@ -0,0 +1,130 @@
+"""Append-only workout history journal.
+
+Each completed workout is one JSON line appended (and fsync'd) to the
+journal, so saving costs the same no matter how long the history is and a
+crash can at worst lose the line being written. The pre-journal
+hiit_history.json file is migrated once on first load.
+
+The app and the command line now keep history in hiit_history_store. This
+module is kept only so HistoryStore can migrate an existing journal, and so
+benchmarks/run_all.py can compare the store against the journal and
+HistoryIndex; nothing else should use it.
+"""
+import json
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+
+from hiit_storage import append_line, atomic_write, read_jsonl
+
+
+class HistoryJournal:
+    def __init__(self, path="hiit_history.jsonl", legacy_path="hiit_history.json", compact_every=1000, fsync=True):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.bad_lines = 0
+        self._appends = 0
+        self._lock = threading.Lock()
+        self._compactor = None
+        
+    def load(self):
+        """Read every entry, migrating the legacy file first if needed."""
+        self.migrate()
+        with self._lock:
+            entries, self.bad_lines = read_jsonl(self.path)
+        if self.bad_lines:
+            # Drop the damaged lines left behind by a crash
+            self.compact_async()
+        return entries
+        
+    def append(self, entry):
+        line = json.dumps(entry, separators=(",", ":"))
+        with self._lock:
+            append_line(self.path, line, fsync=self.fsync)
+            self._appends += 1
+            due = self.compact_every and self._appends >= self.compact_every
+        if due:
+            self.compact_async()
+            
+    def migrate(self):
+        if not self.legacy_path or os.path.exists(self.path) or not os.path.exists(self.legacy_path):
+            return False
+        with open(self.legacy_path, "r") as f:
+            entries = json.load(f)
+        with self._lock:
+            atomic_write(self.path, self._encode(entries), fsync=self.fsync)
+        # Keep the old file around as a backup rather than deleting it
+        os.replace(self.legacy_path, self.legacy_path + ".migrated")
+        return True
+        
+    def compact(self, force=False):
+        """Rewrite the journal without damaged lines, atomically.
+        
+        A clean journal is left alone unless `force` is set, so the periodic
+        check costs a read rather than a rewrite.
+        """
+        with self._lock:
+            entries, bad_lines = read_jsonl(self.path)
+            if bad_lines or force:
+                atomic_write(self.path, self._encode(entries), fsync=self.fsync)
+            self._appends = 0
+            self.bad_lines = 0
+        return bad_lines
+        
+    def compact_async(self):
+        if self._compactor and self._compactor.is_alive():
+            return self._compactor
+        self._compactor = threading.Thread(target=self.compact)
+        self._compactor.daemon = True
+        self._compactor.start()
+        return self._compactor
+        
+    @staticmethod
+    def _encode(entries):
+        return "".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries)
+
+
+class HistoryIndex:
+    """Sorted in-memory index of history entries by date.
+    
+    Keeps the session timestamps in a flat array so date-range filters are
+    two binary searches, however long the history is.
+    """
+    
+    def __init__(self, entries=()):
+        self._keys = array("d")
+        self._rows = array("l")
+        for row, entry in enumerate(entries):
+            self.add(entry, row)
+            
+    def __len__(self):
+        return len(self._rows)
+        
+    @staticmethod
+    def timestamp(entry):
+        return datetime.fromisoformat(entry["date"]).timestamp()
+        
+    def add(self, entry, row):
+        key = self.timestamp(entry)
+        if not self._keys or key >= self._keys[-1]:
+            # New sessions arrive in date order, so this is the usual case
+            self._keys.append(key)
+            self._rows.append(row)
+        else:
+            pos = bisect_left(self._keys, key)
+            self._keys.insert(pos, key)
+            self._rows.insert(pos, row)
+            
+    def select(self, start=None, end=None):
+        """Return (lo, hi) positions of sessions with start <= date < end."""
+        lo = 0 if start is None else bisect_left(self._keys, start.timestamp())
+        hi = len(self._keys) if end is None else bisect_left(self._keys, end.timestamp())
+        return lo, max(lo, hi)
+        
+    def row_at(self, pos):
+        # Position in date order -> index into the history list
+        return self._rows[pos]
@@ -0,0 +1,396 @@
+"""Columnar workout history with each distinct workout stored once.
+
+Journal entries each carry a full copy of their reps list (or program),
+although members repeat the same few workouts hundreds of times. Here
+every distinct workout definition is written once to
+<name>.templates.jsonl, keyed by a 64-bit hash of its content, and every
+session is a fixed 32-byte record in <name>.sessions:
+
+    timestamp   f64  local wall-clock seconds since 1970-01-01
+    template    u64  content hash of the reps and/or program
+    sets        u32
+    extra       u32  id of a record in <name>.extra.jsonl, or 0
+    total_time  f64  seconds
+
+The sessions file is memory-mapped, so opening it reads no rows: an
+entry is decoded only when asked for, and the reps list in it is the
+template's own, shared by every session that ran that workout. Sessions
+arrive in date order in practice, so a date range is two binary searches
+straight over the mapped timestamps; a back-dated session adds a sorted
+row order in memory rather than rewriting the file. Any other keys an
+entry carries go to the extra file; it is indexed by byte offset once
+(load_extras(), which the app runs on its loader thread) and extra()
+then reads and parses only the line asked for.
+
+Sessions appended after opening are kept in memory as well, so a new
+session is readable at once; with a `writer` (a hiit_persist.WriteBehind)
+its template, extra and record are written by the writer's thread in
+that order, and nothing is remapped until the next open.
+
+The journal (and the hiit_history.json it replaced) is migrated on first
+open and kept as <journal>.migrated.
+"""
+import hashlib
+import json
+import mmap
+import operator
+import os
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import islice
+
+from hiit_history import HistoryJournal
+from hiit_storage import append_line, atomic_write, iter_jsonl, read_jsonl
+
+RECORD = struct.Struct("<dQIId")
+# The same layout for numpy.frombuffer
+RECORD_FIELDS = [("timestamp", "<f8"), ("template", "<u8"), ("sets", "<u4"), ("extra", "<u4"), ("total_time", "<f8")]
+
+EPOCH = datetime(1970, 1, 1)
+TEMPLATE_KEYS = ("reps", "program")
+CORE_KEYS = {"date", "sets", "total_time", *TEMPLATE_KEYS}
+
+
+def wall_seconds(moment):
+    # Local wall-clock time without a time zone, so dates round-trip exactly
+    return (moment.replace(tzinfo=None) - EPOCH).total_seconds()
+
+
+def wall_date(seconds):
+    return EPOCH + timedelta(seconds=seconds)
+
+
+def template_of(entry):
+    return {key: entry[key] for key in TEMPLATE_KEYS if key in entry}
+
+
+def template_id(template):
+    data = json.dumps(template, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def extra_line_id(line):
+    """The id of a line of the extra file, or None if it has none."""
+    # Lines are written as {"id":N,...}, so the id is read without parsing
+    if line.startswith(b'{"id":'):
+        head = line[6:line.find(b",", 6)]
+        if head.isdigit():
+            return int(head)
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    extra_id = record.get("id") if isinstance(record, dict) else None
+    return extra_id if isinstance(extra_id, int) else None
+
+
+class _DateOrder:
+    """Timestamps in date order as a sequence, for bisect."""
+    
+    def __init__(self, store):
+        self.store = store
+        
+    def __len__(self):
+        return len(self.store)
+        
+    def __getitem__(self, pos):
+        return self.store.timestamp(self.store.row_at(pos))
+
+
+class HistoryStore:
+    def __init__(self, journal_path="hiit_history.jsonl", legacy_path="hiit_history.json", fsync=True, writer=None):
+        root = os.path.splitext(journal_path)[0]
+        self.path = root + ".sessions"
+        self.templates_path = root + ".templates.jsonl"
+        self.extra_path = root + ".extra.jsonl"
+        self.journal = HistoryJournal(journal_path, legacy_path, compact_every=0, fsync=fsync)
+        self.fsync = fsync
+        self.writer = writer
+        self.templates = {}
+        self._extras = {}  # extras appended since opening, by id
+        self._extra_offsets = None  # id -> offset in the extra file, once indexed
+        self._extra_file = None
+        self._next_extra = None
+        self._map = None
+        self._times = ()
+        self._mapped = 0  # rows in the map; later ones are in _tail
+        self._tail = bytearray()
+        self._count = 0
+        self._order = None  # rows in date order, only once they are not
+        self._latest = float("-inf")
+        self._opened = False
+        self._lock = threading.RLock()
+        
+    def __len__(self):
+        return self._count
+        
+    def __getitem__(self, row):
+        if row < 0:
+            row += self._count
+        if not 0 <= row < self._count:
+            raise IndexError(row)
+        return self._decode(self._map, self._tail, row)
+        
+    def __iter__(self):
+        return self.rows()
+        
+    def open(self):
+        """Migrate if needed and map the sessions file; safe to call again."""
+        with self._lock:
+            if self._opened:
+                return self
+            self.migrate()
+            templates, _ = read_jsonl(self.templates_path)
+            for record in templates:
+                self.templates[int(record.pop("id"), 16)] = record
+            self._count = self._mapped = self._repair()
+            self._remap()
+            self._index()
+            self._opened = True
+        return self
+        
+    def close(self):
+        """Release the map and the extra file; open() may be called again.
+        
+        Writes already handed to the writer still happen.
+        """
+        with self._lock:
+            if self._extra_file is not None:
+                self._extra_file.close()
+            if isinstance(self._times, memoryview):
+                self._times.release()
+            if self._map is not None:
+                try:
+                    self._map.close()
+                except BufferError:
+                    # Still exported to a reader (numpy, say); it is closed
+                    # once that lets go of it
+                    pass
+            self.templates = {}
+            self._extras = {}
+            self._extra_offsets = self._extra_file = self._next_extra = None
+            self._map, self._times = None, ()
+            self._mapped = self._count = 0
+            self._tail = bytearray()
+            self._order = None
+            self._latest = float("-inf")
+            self._opened = False
+            
+    def load_extras(self):
+        """Index the extra file by id; done once, on first use otherwise."""
+        with self._lock:
+            if self._extra_offsets is not None:
+                return
+            offsets = {}
+            try:
+                f = open(self.extra_path, "rb")
+            except FileNotFoundError:
+                f = None
+            if f is not None:
+                with f:
+                    offset = 0
+                    for line in f:
+                        # A line still being written is left for later
+                        extra_id = extra_line_id(line) if line.endswith(b"\n") else None
+                        if extra_id is not None:
+                            offsets[extra_id] = offset
+                        offset += len(line)
+            self._extra_offsets = offsets
+            if self._next_extra is None:
+                self._next_extra = max(offsets, default=0) + 1
+                
+    def migrate(self):
+        """Convert the journal once; returns True if it did."""
+        if os.path.exists(self.path):
+            return False
+        self.journal.migrate()
+        if not os.path.exists(self.journal.path):
+            return False
+        templates = {}
+        extras = []
+        records = bytearray()
+        for entry in iter_jsonl(self.journal.path):
+            record, template, extra = self._encode(entry, len(extras) + 1)
+            templates.setdefault(record[1], template)
+            if extra:
+                extras.append(extra)
+            records += RECORD.pack(*record)
+        lines = [json.dumps({"id": f"{tid:016x}", **template}, separators=(",", ":")) + "\n" for tid, template in templates.items()]
+        atomic_write(self.templates_path, "".join(lines), fsync=self.fsync)
+        lines = [json.dumps(extra, separators=(",", ":")) + "\n" for extra in extras]
+        atomic_write(self.extra_path, "".join(lines), fsync=self.fsync)
+        # Written last: its existence means the migration is complete
+        atomic_write(self.path, bytes(records), fsync=self.fsync)
+        os.replace(self.journal.path, self.journal.path + ".migrated")
+        return True
+        
+    def append(self, entry):
+        """Record one session; returns its row."""
+        with self._lock:
+            self.open()
+            record, template, extra = self._encode(entry, self._next_extra_id())
+            tid = record[1]
+            lines = []
+            if tid not in self.templates:
+                lines.append((self.templates_path, json.dumps({"id": f"{tid:016x}", **template}, separators=(",", ":"))))
+                # A private copy, so later edits to the caller's reps can't leak in
+                self.templates[tid] = json.loads(json.dumps(template))
+            if extra:
+                lines.append((self.extra_path, json.dumps(extra, separators=(",", ":"))))
+                self._extras[extra["id"]] = extra
+                self._next_extra += 1
+            data = RECORD.pack(*record)
+            self._tail += data
+            row = self._count
+            self._count += 1
+            self._place(row, record[0])
+            if self.writer is None:
+                self._write_session(lines, data)
+            else:
+                self.writer.submit(self._write_session, lines, data, description="history")
+            return row
+            
+    def _write_session(self, lines, data):
+        # The record goes last: a session is only there once its template is
+        for path, line in lines:
+            append_line(path, line, fsync=self.fsync)
+        with open(self.path, "ab") as f:
+            f.write(data)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+                
+    def select(self, start=None, end=None):
+        """Return (lo, hi) positions in date order of sessions with start <= date < end."""
+        order = _DateOrder(self)
+        lo = 0 if start is None else bisect_left(order, wall_seconds(start))
+        hi = len(self) if end is None else bisect_left(order, wall_seconds(end))
+        return lo, max(lo, hi)
+        
+    def row_at(self, pos):
+        # Position in date order -> row in the file
+        return pos if self._order is None else self._order[pos]
+        
+    def timestamp(self, row):
+        if row < self._mapped:
+            return self._times[row]
+        return RECORD.unpack_from(self._tail, (row - self._mapped) * RECORD.size)[0]
+        
+    def rows(self, lo=0, hi=None):
+        """Yield the entries of rows lo..hi-1 in file order.
+        
+        The rows are fixed when the generator is made, so sessions appended
+        while it is consumed (say, during an export) are not included.
+        """
+        mapped, tail, count = self._map, self._tail, self._count
+        hi = count if hi is None else min(hi, count)
+        for row in range(lo, hi):
+            yield self._decode(mapped, tail, row)
+            
+    def buffer(self):
+        """(buffer, count): the mapped session records, for numpy.frombuffer."""
+        with self._lock:
+            if not self._tail:
+                return (self._map if self._map is not None else b""), self._count
+            head = self._map[:self._mapped * RECORD.size] if self._mapped else b""
+            return head + self._tail, self._count
+            
+    def template(self, tid):
+        return self.templates.get(tid, {"reps": []})
+        
+    def extra(self, extra_id):
+        with self._lock:
+            extra = self._extras.get(extra_id)
+            if extra is not None:
+                return extra
+            self.load_extras()
+            offset = self._extra_offsets.get(extra_id)
+            if offset is None:
+                return {}
+            try:
+                if self._extra_file is None:
+                    self._extra_file = open(self.extra_path, "rb")
+                self._extra_file.seek(offset)
+                extra = json.loads(self._extra_file.readline())
+            except (OSError, ValueError):
+                return {}
+            return extra if isinstance(extra, dict) else {}
+            
+    def _encode(self, entry, extra_id):
+        date = datetime.fromisoformat(entry["date"])
+        timestamp = wall_seconds(date)
+        template = template_of(entry)
+        extra = {key: value for key, value in entry.items() if key not in CORE_KEYS}
+        if wall_date(timestamp).isoformat() != entry["date"]:
+            # Time zones or other spellings are kept as they were written
+            extra["date"] = entry["date"]
+        if extra:
+            extra = {"id": extra_id, **extra}
+        record = (timestamp, template_id(template), entry.get("sets", 1), extra_id if extra else 0, entry.get("total_time", 0))
+        return record, template, extra
+        
+    def _decode(self, mapped, tail, row):
+        if row < self._mapped:
+            record = RECORD.unpack_from(mapped, row * RECORD.size)
+        else:
+            record = RECORD.unpack_from(tail, (row - self._mapped) * RECORD.size)
+        timestamp, tid, sets, extra_id, total_time = record
+        template = self.template(tid)
+        entry = {"date": wall_date(timestamp).isoformat(), "sets": sets}
+        if "reps" in template:
+            entry["reps"] = template["reps"]
+        entry["total_time"] = int(total_time) if total_time.is_integer() else total_time
+        if "program" in template:
+            entry["program"] = template["program"]
+        if extra_id:
+            entry.update((key, value) for key, value in self.extra(extra_id).items() if key != "id")
+        return entry
+        
+    def _next_extra_id(self):
+        if self._next_extra is None:
+            self.load_extras()
+        return self._next_extra
+        
+    def _repair(self):
+        # Drop a record torn by a crash mid-append
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+        torn = size % RECORD.size
+        if torn:
+            os.truncate(self.path, size - torn)
+        return size // RECORD.size
+        
+    def _remap(self):
+        if not self._count:
+            self._map, self._times = None, ()
+            return
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), self._count * RECORD.size, access=mmap.ACCESS_READ)
+        self._times = memoryview(self._map).cast("d")[::RECORD.size // 8]
+        
+    def _index(self):
+        # One pass over the mapped timestamp column, in C, without a copy
+        times = self._times
+        if not self._count:
+            self._latest = float("-inf")
+        elif all(map(operator.le, times, islice(times, 1, None))):
+            self._latest = times[-1]
+        else:
+            self._order = array("l", sorted(range(self._count), key=times.__getitem__))
+            self._latest = max(times)
+            
+    def _place(self, row, timestamp):
+        if self._order is None and timestamp >= self._latest:
+            # New sessions arrive in date order, so this is the usual case
+            self._latest = timestamp
+            return
+        if self._order is None:
+            self._order = array("l", range(row))
+        pos = bisect_left(_DateOrder(self), timestamp, hi=row)
+        self._order.insert(pos, row)
+        self._latest = max(self._latest, timestamp)
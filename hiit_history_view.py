@@ -0,0 +1,113 @@
+"""Virtualized list widget for the History tab.
+
+Only the rows that fit on screen exist as widgets. Scrolling moves a window
+over the data and re-labels the same pooled rows, so widget count and
+memory stay flat no matter how many sessions there are.
+"""
+import customtkinter as ctk
+
+
+class VirtualHistoryList(ctk.CTkFrame):
+    def __init__(self, master, row_height=34, empty_text="No workout history yet.", **kwargs):
+        super().__init__(master, **kwargs)
+        self.row_height = row_height
+        self.empty_text = empty_text
+        self.count = 0
+        self.row_text = None
+        self.first = 0
+        self._rows = []
+        self._shown = []
+        self._visible = 1
+        
+        self.viewport = ctk.CTkFrame(self, fg_color="transparent")
+        self.viewport.pack(side="left", fill="both", expand=True)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        
+        self.empty_label = ctk.CTkLabel(self.viewport, text=empty_text)
+        
+        self.viewport.bind("<Configure>", self.on_resize)
+        self._bind_wheel(self.viewport)
+        
+    def set_rows(self, count, row_text):
+        # `row_text(i)` returns the text of row i; it is only called for
+        # rows that are actually on screen
+        self.count = count
+        self.row_text = row_text
+        self.first = min(self.first, self.max_first())
+        self.refresh()
+        
+    def max_first(self):
+        return max(0, self.count - self._visible + 1)
+        
+    def scroll_to(self, first):
+        first = max(0, min(int(first), self.max_first()))
+        if first != self.first:
+            self.first = first
+            self.refresh()
+            
+    def on_scrollbar(self, *args):
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(float(args[1]) * self.count)
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if len(args) > 2 and args[2] == "pages":
+                step *= max(1, self._visible - 1)
+            self.scroll_to(self.first + step)
+            
+    def on_wheel(self, event):
+        if getattr(event, "num", None) == 4:
+            step = -3
+        elif getattr(event, "num", None) == 5:
+            step = 3
+        else:
+            step = -3 if event.delta > 0 else 3
+        self.scroll_to(self.first + step)
+        return "break"
+        
+    def on_resize(self, event=None):
+        height = event.height if event is not None else self.viewport.winfo_height()
+        visible = max(1, height // self.row_height + 1)
+        if visible != self._visible:
+            self._visible = visible
+            self.first = min(self.first, self.max_first())
+            self.refresh()
+            
+    def refresh(self):
+        if not self.count:
+            for row in self._rows:
+                row.pack_forget()
+            self._shown = [None] * len(self._rows)
+            self.empty_label.pack(pady=20)
+            self.scrollbar.set(0, 1)
+            return
+        self.empty_label.pack_forget()
+        
+        # Grow the pool up to what fits on screen, never with the data
+        while len(self._rows) < self._visible:
+            row = ctk.CTkLabel(self.viewport, text="", anchor="w", height=self.row_height - 4)
+            self._bind_wheel(row)
+            self._rows.append(row)
+            self._shown.append(None)
+            
+        for k, row in enumerate(self._rows):
+            index = self.first + k
+            if k < self._visible and index < self.count:
+                text = self.row_text(index)
+                if self._shown[k] is None:
+                    row.pack(fill="x", padx=10, pady=2)
+                if text != self._shown[k]:
+                    row.configure(text=text)
+                    self._shown[k] = text
+            elif self._shown[k] is not None:
+                row.pack_forget()
+                self._shown[k] = None
+                
+        self.scrollbar.set(self.first / self.count, min(1.0, (self.first + self._visible) / self.count))
+        
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self.on_wheel)
+        widget.bind("<Button-4>", self.on_wheel)
+        widget.bind("<Button-5>", self.on_wheel)
@@ -0,0 +1,229 @@
+"""Cached, indexed store for saved workouts.
+
+hiit_workouts.json stays the library file. Adds, updates and deletes are
+appended to a small operation log next to it instead of rewriting the whole
+library, and the log is folded back into the main file (atomically) once
+it grows. The parsed library is cached and only re-read when either file's
+mtime or size changes, e.g. because another machine updated a shared
+library.
+
+With a `writer` (a hiit_persist.WriteBehind) the cache is updated at once
+and the file writes are queued to it, so saving never waits on the disk.
+While writes are pending the cache is newer than the files and is not
+re-read from them.
+"""
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+from hiit_dsl import ProgramError, compile_program, program_names
+from hiit_storage import append_line, atomic_write_json, read_jsonl
+
+INDEXED_FIELDS = ("total_duration", "sets", "created")
+
+
+def workout_total_duration(workout):
+    if "program" in workout:
+        # Closed form; the program is never expanded
+        try:
+            return compile_program(workout["program"], workout.get("sets", 1)).total(0)
+        except ProgramError:
+            return 0
+    return sum(rep["duration"] for rep in workout.get("reps", [])) * workout.get("sets", 1)
+
+
+def workout_rep_names(workout):
+    if "program" in workout:
+        try:
+            return program_names(workout["program"])
+        except ProgramError:
+            return []
+    return [rep.get("name", "") for rep in workout.get("reps", [])]
+
+
+def workout_summary(workout):
+    """Short description like '8 sets, 2 reps' for lists of workouts."""
+    sets = workout.get("sets", 1)
+    if "program" in workout:
+        try:
+            intervals = compile_program(workout["program"], sets).count
+        except ProgramError:
+            return "invalid program"
+        return f"program, {intervals} intervals"
+    return f"{sets} sets, {len(workout.get('reps', []))} reps"
+
+
+def workout_key(workout, field):
+    if field == "total_duration":
+        return workout_total_duration(workout)
+    if field == "sets":
+        return workout.get("sets", 1)
+    return workout.get("created", "")
+
+
+class WorkoutStore:
+    def __init__(self, path="hiit_workouts.json", log_path=None, compact_after=200, fsync=True, writer=None):
+        self.path = path
+        self.log_path = log_path or path + ".log"
+        self.compact_after = compact_after
+        self.fsync = fsync
+        self.writer = writer
+        self._pending = 0
+        self._workouts = None
+        self._signature = None
+        self._log_ops = 0
+        self._indexes = {}
+        self._lock = threading.RLock()
+        # Bumped on every change to the cached library, so derived indexes
+        # (e.g. the search index) know when to rebuild
+        self.version = 0
+        
+    def load(self):
+        """Return the {name: workout} library, re-reading only if it changed."""
+        with self._lock:
+            if self._workouts is not None and self._pending:
+                return self._workouts
+            signature = self._stat()
+            if self._workouts is None or signature != self._signature:
+                self._read()
+            return self._workouts
+            
+    def get(self, name):
+        return self.load().get(name)
+        
+    def names(self):
+        return list(self.load())
+        
+    def __len__(self):
+        return len(self.load())
+        
+    def put(self, workout):
+        """Add or replace a workout by name."""
+        with self._lock:
+            self.load()
+            self._apply({"op": "put", "workout": workout})
+            self._append({"op": "put", "workout": workout})
+            
+    def delete(self, name):
+        with self._lock:
+            if name not in self.load():
+                return False
+            self._apply({"op": "delete", "name": name})
+            self._append({"op": "delete", "name": name})
+            return True
+            
+    def compact(self):
+        """Fold the operation log into the main file."""
+        with self._lock:
+            self.load()
+            # Workouts are replaced, never changed in place, so a shallow
+            # copy is a snapshot
+            self._write(self._write_library, dict(self._workouts))
+            self._log_ops = 0
+            
+    def _write_library(self, workouts):
+        atomic_write_json(self.path, workouts, fsync=self.fsync)
+        # Replaying a log that survived a crash here is harmless: every
+        # operation is idempotent
+        try:
+            os.unlink(self.log_path)
+        except FileNotFoundError:
+            pass
+            
+    def sorted_by(self, field, reverse=False):
+        """Names ordered by an indexed field."""
+        index = self._index(field)
+        names = [name for _, name in index]
+        return names[::-1] if reverse else names
+        
+    def between(self, field, low=None, high=None):
+        """Names whose `field` lies in [low, high]."""
+        index = self._index(field)
+        lo = 0 if low is None else bisect_left(index, (low, ""))
+        hi = len(index) if high is None else bisect_right(index, (high, "\uffff"))
+        return [name for _, name in index[lo:hi]]
+        
+    def _index(self, field):
+        if field not in INDEXED_FIELDS:
+            raise KeyError(field)
+        with self._lock:
+            self.load()
+            return self._indexes[field]
+            
+    def _read(self):
+        try:
+            with open(self.path, "r") as f:
+                workouts = json.load(f)
+        except FileNotFoundError:
+            workouts = {}
+        self._workouts = workouts
+        self.version += 1
+        ops, _ = read_jsonl(self.log_path)
+        self._rebuild_indexes()
+        for op in ops:
+            self._apply(op)
+        self._log_ops = len(ops)
+        self._signature = self._stat()
+        
+    def _rebuild_indexes(self):
+        self._indexes = {
+            field: sorted((workout_key(workout, field), name) for name, workout in self._workouts.items())
+            for field in INDEXED_FIELDS
+        }
+        
+    def _apply(self, op):
+        self.version += 1
+        if op.get("op") == "put":
+            workout = op["workout"]
+            self._unindex(workout["name"])
+            self._workouts[workout["name"]] = workout
+            for field in INDEXED_FIELDS:
+                insort(self._indexes[field], (workout_key(workout, field), workout["name"]))
+        elif op.get("op") == "delete":
+            self._unindex(op["name"])
+            self._workouts.pop(op["name"], None)
+            
+    def _unindex(self, name):
+        workout = self._workouts.get(name)
+        if workout is None:
+            return
+        for field in INDEXED_FIELDS:
+            index = self._indexes[field]
+            pos = bisect_left(index, (workout_key(workout, field), name))
+            if pos < len(index) and index[pos][1] == name:
+                del index[pos]
+                
+    def _append(self, op):
+        self._write(append_line, self.log_path, json.dumps(op, separators=(",", ":")), self.fsync)
+        self._log_ops += 1
+        if self.compact_after and self._log_ops >= self.compact_after:
+            self.compact()
+            
+    def _write(self, fn, *args):
+        if self.writer is None:
+            fn(*args)
+            self._signature = self._stat()
+            return
+        self._pending += 1
+        self.writer.submit(self._written, fn, args, description=os.path.basename(self.path))
+        
+    def _written(self, fn, args):
+        # On the writer's thread
+        try:
+            fn(*args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                if not self._pending:
+                    self._signature = self._stat()
+                    
+    def _stat(self):
+        signature = []
+        for path in (self.path, self.log_path):
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
@@ -0,0 +1,345 @@
+"""Low-overhead instrumentation for the timer's hot paths.
+
+Histograms of latencies (seconds) and counters, off by default. While
+disabled every call is a global lookup and an early return, so the
+instrumented paths cost next to nothing on a normal install. Turn it on
+with HIIT_METRICS, a comma-separated list of:
+
+    1                         collect in memory only (see snapshot())
+    file:metrics.prom         rewrite the file every HIIT_METRICS_INTERVAL
+                              seconds (default 10) and on shutdown; a .json
+                              extension writes JSON instead of Prometheus text
+    http:9108                 serve /metrics (Prometheus) and /metrics.json
+    http:127.0.0.1:9108       on localhost, or the given interface
+    
+    HIIT_METRICS=file:/var/log/hiit/metrics.prom,http:9108 python hiit_cli.py
+
+Histograms use fixed log-spaced buckets, so recording is a bisect and two
+additions and memory does not grow with the number of samples. A metric
+may be split by labels, e.g. persist_write_seconds{what="history"}.
+"""
+import json
+import math
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+from hiit_storage import atomic_write
+
+PREFIX = "hiit_"
+
+# Upper bounds in seconds, 50us to 10s, about four buckets per decade
+BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.00075, 0.001, 0.0025, 0.005, 0.0075, 0.01,
+    0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0,
+)
+
+DESCRIPTIONS = {
+    "tick_lateness_seconds": "How long after its deadline a timer tick fired",
+    "update_display_seconds": "Time to build and submit one display update",
+    "after_lateness_seconds": "How late Tk ran a scheduled after() callback",
+    "frame_latency_seconds": "Time from a display update to the frame showing it",
+    "save_history_seconds": "Time for the command line to append one workout to the history",
+    "persist_write_seconds": "Time the persistence worker took for one write, fsync included, by file",
+    "cue_latency_seconds": "Time from requesting an audio cue to playing it",
+    "cues_dropped_total": "Audio cues dropped for being late or failing to play",
+}
+
+_registry = None
+_exporters = []
+
+
+def label_text(labels):
+    # {"what": "history"} -> 'what="history"', the Prometheus spelling
+    return ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+
+
+class Histogram:
+    def __init__(self, name, buckets=BUCKETS, labels=""):
+        self.name = name
+        self.labels = labels
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+        
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+                
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th sample; good to a bucket
+        if not self.count:
+            return 0.0
+        rank = math.ceil(q * self.count)
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+        
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "max": round(self.max, 6),
+            "p50": round(self.quantile(0.5), 6),
+            "p95": round(self.quantile(0.95), 6),
+            "p99": round(self.quantile(0.99), 6),
+        }
+        
+    def prometheus(self):
+        name = PREFIX + self.name
+        labels = self.labels + "," if self.labels else ""
+        totals = f"{{{self.labels}}}" if self.labels else ""
+        lines = []
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            lines.append(f'{name}_bucket{{{labels}le="{bound:g}"}} {seen}')
+        lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{totals} {self.sum!r}")
+        lines.append(f"{name}_count{totals} {self.count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, labels=""):
+        self.name = name
+        self.labels = labels
+        self.value = 0
+        self._lock = threading.Lock()
+        
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+            
+    def snapshot(self):
+        return self.value
+        
+    def prometheus(self):
+        labels = f"{{{self.labels}}}" if self.labels else ""
+        return [f"{PREFIX}{self.name}{labels} {self.value}"]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+        
+    def get(self, name, kind, labels=""):
+        # Keyed by name and label text; one metric per combination
+        key = (name, labels)
+        metric = self.metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self.metrics.get(key)
+                if metric is None:
+                    metric = self.metrics[key] = kind(name, labels=labels)
+        return metric
+        
+    def snapshot(self):
+        return {
+            f"{name}{{{labels}}}" if labels else name: metric.snapshot()
+            for (name, labels), metric in sorted(self.metrics.items())
+        }
+        
+    def prometheus(self):
+        lines = []
+        previous = None
+        for (name, labels), metric in sorted(self.metrics.items()):
+            # One HELP and TYPE for all the label combinations of a name
+            if name != previous:
+                if name in DESCRIPTIONS:
+                    lines.append(f"# HELP {PREFIX}{name} {DESCRIPTIONS[name]}")
+                lines.append(f"# TYPE {PREFIX}{name} {'histogram' if isinstance(metric, Histogram) else 'counter'}")
+                previous = name
+            lines.extend(metric.prometheus())
+        return "\n".join(lines) + "\n"
+        
+    def json(self):
+        return json.dumps({"time": time.time(), "metrics": self.snapshot()}, indent=2) + "\n"
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+    
+    def __init__(self, name):
+        self.name = name
+        
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+        
+    def __exit__(self, *exc):
+        registry = _registry
+        if registry is not None:
+            registry.get(self.name, Histogram).observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+def enabled():
+    return _registry is not None
+
+
+def observe(name, seconds, **labels):
+    registry = _registry
+    if registry is not None:
+        registry.get(name, Histogram, label_text(labels) if labels else "").observe(seconds)
+
+
+def inc(name, amount=1):
+    registry = _registry
+    if registry is not None:
+        registry.get(name, Counter).inc(amount)
+
+
+def timer(name):
+    """Context manager recording the time spent in its block."""
+    if _registry is None:
+        return NULL_TIMER
+    return _Timer(name)
+
+
+def snapshot():
+    return _registry.snapshot() if _registry is not None else {}
+
+
+class FileExporter:
+    """Rewrites a metrics file atomically every `interval` seconds."""
+    
+    def __init__(self, registry, path, interval=10.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self.json = path.lower().endswith(".json")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        
+    def write(self):
+        text = self.registry.json() if self.json else self.registry.prometheus()
+        # No fsync: a metrics dump is not worth a disk flush every interval
+        atomic_write(self.path, text, fsync=False)
+        
+    def close(self):
+        self._stop.set()
+        self._thread.join(1.0)
+        self.write()
+        
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                print(f"metrics: could not write {self.path}: {e}", file=sys.stderr)
+
+
+class HttpExporter:
+    """Serves /metrics and /metrics.json from a daemon thread."""
+    
+    def __init__(self, registry, host="127.0.0.1", port=9108):
+        # Only loaded when an endpoint is asked for
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = registry.prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = registry.json(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                
+            def log_message(self, format, *args):
+                pass
+                
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def configure(spec, interval=10.0):
+    """Enable collection and start the exporters listed in `spec`.
+    
+    An empty spec or "0" disables metrics again.
+    """
+    global _registry
+    shutdown()
+    spec = (spec or "").strip()
+    if spec in ("", "0", "off"):
+        _registry = None
+        return None
+    registry = Registry()
+    for part in filter(None, (part.strip() for part in spec.split(","))):
+        kind, _, target = part.partition(":")
+        if kind == "file" and target:
+            _exporters.append(FileExporter(registry, target, interval))
+        elif kind == "http":
+            host, _, port = target.rpartition(":")
+            _exporters.append(HttpExporter(registry, host or "127.0.0.1", int(port or 9108)))
+        elif part not in ("1", "on", "memory"):
+            raise ValueError(f"Unknown metrics target: {part}")
+    _registry = registry
+    return registry
+
+
+def configure_from_env():
+    spec = os.environ.get("HIIT_METRICS")
+    if not spec:
+        return None
+    try:
+        return configure(spec, float(os.environ.get("HIIT_METRICS_INTERVAL", 10.0)))
+    except (OSError, ValueError) as e:
+        # Instrumentation must never stop the timer from starting
+        print(f"Metrics disabled: {e}", file=sys.stderr)
+        shutdown()
+        return None
+
+
+def shutdown():
+    """Write final dumps and stop the exporters; collection stays as is."""
+    while _exporters:
+        exporter = _exporters.pop()
+        try:
+            exporter.close()
+        except OSError:
+            pass
@@ -0,0 +1,148 @@
+"""Write-behind persistence: one worker thread owns the app's file writes.
+
+Settings, the workout library, the history and the session checkpoint
+used to be written on the Tk thread, and on an SD card a single fsync can
+take hundreds of milliseconds. The app now hands each write to a
+WriteBehind queue and carries on with its in-memory state already
+updated; the worker performs the writes in the order they were queued.
+
+- replace(path, data) rewrites a whole file atomically. A replace still
+  waiting in the queue is overwritten in place by a newer one for the
+  same path, so toggling a setting ten times while a slow fsync runs
+  costs one more write, not ten.
+- append(path, line) and submit(fn, ...) are never coalesced.
+
+flush() waits for the queue to drain and close() flushes and stops the
+worker; on_closing calls it last so nothing queued is lost on exit. A
+write that fails is reported to `on_error` from the worker thread. How
+long each write took, fsync included, is recorded as the
+persist_write_seconds metric, labelled with the job's description.
+
+The app's files live in HIIT_DATA_DIR when it is set, otherwise in the
+directory it was started from, resolved once at startup so a later
+chdir cannot send a queued write elsewhere.
+"""
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+import hiit_metrics
+from hiit_storage import append_line, atomic_write
+
+DATA_DIR = os.path.abspath(os.environ.get("HIIT_DATA_DIR") or os.getcwd())
+
+
+def data_path(name):
+    return os.path.join(DATA_DIR, name)
+
+
+class _Job:
+    __slots__ = ("fn", "args", "description")
+    
+    def __init__(self, fn, args, description):
+        self.fn = fn
+        self.args = args
+        self.description = description
+
+
+class WriteBehind:
+    def __init__(self, on_error=None, name="hiit-persist"):
+        self.on_error = on_error
+        self.name = name
+        self._jobs = deque()
+        self._replacing = {}  # path -> its replace job, until the worker takes it
+        self._busy = False
+        self._closed = False
+        self._thread = None
+        self._cond = threading.Condition()
+        
+    @property
+    def pending(self):
+        with self._cond:
+            return len(self._jobs) + self._busy
+            
+    def replace(self, path, data, fsync=True):
+        """Atomically replace `path` with `data` (str or bytes), coalesced per path."""
+        path = os.path.abspath(path)
+        with self._cond:
+            job = self._replacing.get(path)
+            if job is not None:
+                job.args = (path, data, fsync)
+                return
+            job = _Job(atomic_write, (path, data, fsync), os.path.basename(path))
+            queued = self._enqueue(job)
+            if queued:
+                self._replacing[path] = job
+        if not queued:
+            self._run(job)
+            
+    def append(self, path, line, fsync=True):
+        """Append one line to `path` after everything queued before it."""
+        self.submit(append_line, os.path.abspath(path), line, fsync, description=os.path.basename(path))
+        
+    def submit(self, fn, *args, description=None):
+        """Run fn(*args) on the worker, in queue order."""
+        job = _Job(fn, args, description or getattr(fn, "__name__", "write"))
+        with self._cond:
+            queued = self._enqueue(job)
+        if not queued:
+            self._run(job)
+            
+    def flush(self, timeout=None):
+        """Wait until every queued write is done; False if `timeout` ran out first."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._jobs and not self._busy, timeout)
+            
+    def close(self, timeout=None):
+        """Flush and stop the worker. Writes queued afterwards run synchronously."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        done = self.flush(timeout)
+        if not done:
+            print(f"Persistence: {self.pending} writes still pending at exit", file=sys.stderr)
+        return done
+        
+    def _enqueue(self, job):
+        # Called with the condition held; False once closed, when the
+        # caller runs the job itself
+        if self._closed:
+            return False
+        self._jobs.append(job)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, name=self.name, daemon=True)
+            self._thread.start()
+        self._cond.notify_all()
+        return True
+        
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._jobs or self._closed)
+                if not self._jobs:
+                    self._thread = None
+                    return
+                job = self._jobs.popleft()
+                if job.fn is atomic_write and self._replacing.get(job.args[0]) is job:
+                    # From here on a newer replace queues behind this one
+                    del self._replacing[job.args[0]]
+                self._busy = True
+            try:
+                self._run(job)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+                    
+    def _run(self, job):
+        start = time.perf_counter()
+        try:
+            job.fn(*job.args)
+            hiit_metrics.observe("persist_write_seconds", time.perf_counter() - start, what=job.description)
+        except Exception as e:
+            if self.on_error is not None:
+                self.on_error(job.description, e)
+            else:
+                print(f"Could not save {job.description}: {e}", file=sys.stderr)
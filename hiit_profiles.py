@@ -0,0 +1,184 @@
+"""Per-member profiles for a machine shared by many people.
+
+Each member's settings, history (session store and telemetry) and
+interrupted-session checkpoint live in a directory of their own,
+<data dir>/profiles/<id[:2]>/<id>/, so one member's files are never read
+on behalf of another. The saved workout library stays shared. The files
+directly in the data directory are the "Default" profile, so an install
+that never creates a profile works exactly as before.
+
+Two small files keep startup and switching constant-time however many
+members there are:
+
+- profiles/active names the active profile (id and name). Startup reads
+  it and then only that profile's files.
+- profiles/index.jsonl has one line per profile created or renamed. Only
+  the profile switcher needs it, so it is read the first time the
+  switcher opens; searches after that are bisects over sorted names.
+
+Switching writes the pointer and opens the other directory; it never
+reads the index or any other member's files.
+"""
+import json
+import os
+import threading
+import uuid
+from bisect import bisect_left
+from typing import NamedTuple
+
+from hiit_persist import DATA_DIR
+from hiit_storage import append_line, atomic_write, iter_jsonl
+
+DEFAULT_ID = ""
+DEFAULT_NAME = "Default"
+
+
+class Profile(NamedTuple):
+    id: str
+    name: str
+    path: str
+    
+    def file(self, name):
+        return os.path.join(self.path, name)
+
+
+class ProfileDirectory:
+    def __init__(self, root=DATA_DIR, writer=None):
+        self.root = root
+        self.dir = os.path.join(root, "profiles")
+        self.index_path = os.path.join(self.dir, "index.jsonl")
+        self.active_path = os.path.join(self.dir, "active")
+        self.writer = writer
+        self._names = None  # id -> name, once the index is read
+        self._keys = None  # sorted (casefolded name or word, id), for search
+        self._lock = threading.Lock()
+        
+    def default(self):
+        return Profile(DEFAULT_ID, DEFAULT_NAME, self.root)
+        
+    def profile(self, profile_id, name):
+        if profile_id == DEFAULT_ID:
+            return self.default()
+        return Profile(profile_id, name, os.path.join(self.dir, profile_id[:2], profile_id))
+        
+    def active(self):
+        """The active profile; reads the pointer file only."""
+        try:
+            with open(self.active_path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            profile = self.profile(record["id"], record["name"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return self.default()
+        if not os.path.isdir(profile.path):
+            # Its directory was removed by hand
+            return self.default()
+        return profile
+        
+    def activate(self, profile):
+        data = json.dumps({"id": profile.id, "name": profile.name})
+        if self.writer is None:
+            os.makedirs(self.dir, exist_ok=True)
+            atomic_write(self.active_path, data)
+        else:
+            # The profiles directory exists once anything but Default does
+            self.writer.replace(self.active_path, data)
+            
+    def create(self, name):
+        """Add a profile; raises ValueError if the name is empty or taken."""
+        name = name.strip()
+        if not name:
+            raise ValueError("A profile needs a name")
+        with self._lock:
+            names = self._load()
+            self._check_free(name)
+            profile = self.profile(uuid.uuid4().hex, name)
+            # Made now, so the new profile's files can be queued at once
+            os.makedirs(profile.path)
+            self._record({"id": profile.id, "name": name})
+            names[profile.id] = name
+            self._keys = None
+        return profile
+        
+    def rename(self, profile, name):
+        """Rename a profile; raises ValueError like create()."""
+        name = name.strip()
+        if profile.id == DEFAULT_ID:
+            raise ValueError("The Default profile can't be renamed")
+        if not name:
+            raise ValueError("A profile needs a name")
+        with self._lock:
+            self._check_free(name, profile.id)
+            self._load()[profile.id] = name
+            self._record({"id": profile.id, "name": name})
+            self._keys = None
+        return profile._replace(name=name)
+        
+    def find(self, name):
+        """The profile called `name`, ignoring case, or None."""
+        folded = name.strip().casefold()
+        if folded == DEFAULT_NAME.casefold():
+            return self.default()
+        with self._lock:
+            for profile_id, other in self._load().items():
+                if other.casefold() == folded:
+                    return self.profile(profile_id, other)
+        return None
+        
+    def __len__(self):
+        # Profiles other than Default
+        with self._lock:
+            return len(self._load())
+            
+    def profiles(self):
+        """Every profile, Default first and the rest by name."""
+        with self._lock:
+            names = self._load()
+            others = sorted(names.items(), key=lambda item: (item[1].casefold(), item[0]))
+        return [self.default()] + [self.profile(profile_id, name) for profile_id, name in others]
+        
+    def search(self, text, limit=30):
+        """Profiles whose name, or a word in it, starts with `text`, by name."""
+        text = text.strip().casefold()
+        if not text:
+            return self.profiles()[:limit]
+        with self._lock:
+            names = self._load()
+            if self._keys is None:
+                keys = []
+                for profile_id, name in names.items():
+                    folded = name.casefold()
+                    keys.append((folded, profile_id))
+                    keys.extend((word, profile_id) for word in folded.split()[1:])
+                keys.append((DEFAULT_NAME.casefold(), DEFAULT_ID))
+                keys.sort()
+                self._keys = keys
+            found = {}
+            for key, profile_id in self._keys[bisect_left(self._keys, (text, "")):]:
+                if not key.startswith(text):
+                    break
+                found.setdefault(profile_id, None)
+            ids = sorted(found, key=lambda profile_id: (names.get(profile_id, DEFAULT_NAME).casefold(), profile_id))
+        return [self.profile(profile_id, names.get(profile_id, DEFAULT_NAME)) for profile_id in ids[:limit]]
+        
+    def _check_free(self, name, own_id=None):
+        # Names are unique ignoring case; a profile may keep its own
+        others = [other for profile_id, other in self._load().items() if profile_id != own_id]
+        if name.casefold() in (other.casefold() for other in [DEFAULT_NAME, *others]):
+            raise ValueError(f"There is already a profile called '{name}'")
+            
+    def _load(self):
+        # The index, read on first use; later lines (renames) win
+        if self._names is None:
+            names = {}
+            for record in iter_jsonl(self.index_path):
+                if isinstance(record.get("id"), str) and record["id"] and isinstance(record.get("name"), str):
+                    names[record["id"]] = record["name"]
+            self._names = names
+        return self._names
+        
+    def _record(self, record):
+        line = json.dumps(record, separators=(",", ":"))
+        if self.writer is None:
+            append_line(self.index_path, line)
+        else:
+            self.writer.append(self.index_path, line)
@@ -0,0 +1,175 @@
+"""Rate-limited, dirty-tracked display updates.
+
+Display state is submitted as a dict of values from any thread. Submissions
+made before the next frame are merged into one, frames are capped at
+max_fps, and a widget is only reconfigured when its value actually changed.
+The renderer also measures how late Tk runs its after() callbacks, which is
+the first thing to suffer when the UI can't keep up. That figure is kept on
+the renderer whether or not hiit_metrics is enabled.
+"""
+import math
+import threading
+import time
+from collections import deque
+
+import hiit_metrics
+
+# Tick and frame rates the timer supports, in Hz
+MIN_RATE_HZ = 10
+MAX_RATE_HZ = 60
+
+
+def clamp_rate(value, default):
+    """A tick or frame rate from settings, kept within MIN_RATE_HZ..MAX_RATE_HZ.
+    
+    Anything that is not a positive, finite number gives `default`.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return default
+    if not math.isfinite(value) or value <= 0:
+        return default
+    return min(max(value, MIN_RATE_HZ), MAX_RATE_HZ)
+
+
+class LatencyWindow:
+    """Rolling window of latency samples in seconds."""
+    
+    def __init__(self, size=512):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        
+    def stats(self):
+        samples = sorted(self.samples)
+        if not samples:
+            return {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        return {
+            "count": self.count,
+            "p50_ms": round(1000 * samples[len(samples) // 2], 3),
+            "p95_ms": round(1000 * samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+            "max_ms": round(1000 * samples[-1], 3),
+        }
+
+
+class RollingLatency:
+    """Last, largest and moving average of latency samples in seconds.
+    
+    Constant time and memory per sample, cheap enough to keep always on.
+    """
+    
+    def __init__(self, alpha=0.1):
+        self.alpha = alpha
+        self.count = 0
+        self.last = 0.0
+        self.max = 0.0
+        self.ewma = 0.0
+        
+    def add(self, seconds):
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+        if self.count:
+            self.ewma += self.alpha * (seconds - self.ewma)
+        else:
+            self.ewma = seconds
+        self.count += 1
+        
+    def stats(self):
+        return {
+            "count": self.count,
+            "last_ms": round(1000 * self.last, 3),
+            "max_ms": round(1000 * self.max, 3),
+            "ewma_ms": round(1000 * self.ewma, 3),
+        }
+
+
+class DisplayRenderer:
+    def __init__(self, root, max_fps=30, clock=time.perf_counter):
+        self.root = root
+        self.clock = clock
+        self.set_max_fps(max_fps)
+        self._appliers = {}
+        self._rendered = {}
+        self._pending = {}
+        self._pending_since = None
+        self._scheduled = False
+        self._last_frame = None
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.coalesced = 0
+        self.writes = 0
+        self.skipped_writes = 0
+        # Time from submit() to the frame that shows it, and how late Tk ran
+        # the frame callback compared to the delay it was scheduled with
+        self.frame_latency = LatencyWindow()
+        self.after_lateness = RollingLatency()
+        
+    def set_max_fps(self, max_fps):
+        # Takes effect from the next frame
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        
+    def register(self, key, apply):
+        # `apply(value)` updates the widget for `key`; it runs on the Tk thread
+        self._appliers[key] = apply
+        
+    def submit(self, state):
+        """Queue new display values; safe to call from any thread."""
+        with self._lock:
+            if self._pending:
+                self.coalesced += 1
+            else:
+                self._pending_since = self.clock()
+            self._pending.update(state)
+            if self._scheduled:
+                return
+            self._scheduled = True
+            now = self.clock()
+            delay = 0.0
+            if self._last_frame is not None:
+                delay = max(0.0, self.min_interval - (now - self._last_frame))
+        self.root.after(int(delay * 1000), self._frame, now + delay)
+        
+    def discard(self):
+        # Drop queued values and forget what is on screen, e.g. after the
+        # widgets were set directly on reset or completion
+        with self._lock:
+            self._pending = {}
+            self._rendered = {}
+            
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "coalesced": self.coalesced,
+            "writes": self.writes,
+            "skipped_writes": self.skipped_writes,
+            "frame_latency": self.frame_latency.stats(),
+            "after_lateness": self.after_lateness.stats(),
+        }
+        
+    def _frame(self, due):
+        now = self.clock()
+        self.after_lateness.add(max(0.0, now - due))
+        # The metrics histogram takes the renderer's own measurement
+        hiit_metrics.observe("after_lateness_seconds", self.after_lateness.last)
+        with self._lock:
+            state, self._pending = self._pending, {}
+            since = self._pending_since
+            self._scheduled = False
+            self._last_frame = now
+        if not state:
+            return
+        self.frames += 1
+        self.frame_latency.add(now - since)
+        hiit_metrics.observe("frame_latency_seconds", now - since)
+        for key, value in state.items():
+            if self._rendered.get(key) == value:
+                self.skipped_writes += 1
+                continue
+            apply = self._appliers.get(key)
+            if apply is not None:
+                apply(value)
+                self.writes += 1
+            self._rendered[key] = value
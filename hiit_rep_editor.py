@@ -0,0 +1,120 @@
+"""Rep editor widgets backed by a RepListModel.
+
+Row widgets are pooled: deleting or reloading reps re-labels existing rows
+instead of destroying them, and missing rows are built in small batches
+from the Tk idle loop so loading a long program never freezes the window.
+"""
+import customtkinter as ctk
+
+from hiit_reps import INSERT, UPDATE
+
+
+class RepRow:
+    def __init__(self, editor, master):
+        self.editor = editor
+        self.index = None
+        self.visible = False
+        
+        self.frame = ctk.CTkFrame(master)
+        self.label = ctk.CTkLabel(self.frame, text="", width=60)
+        self.label.pack(side="left", padx=5, pady=5)
+        
+        self.name_entry = ctk.CTkEntry(self.frame, placeholder_text="Exercise name", width=150)
+        self.name_entry.pack(side="left", padx=5, pady=5)
+        
+        self.duration_entry = ctk.CTkEntry(self.frame, placeholder_text="Seconds", width=80)
+        self.duration_entry.pack(side="left", padx=5, pady=5)
+        
+        delete_btn = ctk.CTkButton(self.frame, text="❌", width=30, command=self.on_delete)
+        delete_btn.pack(side="right", padx=5, pady=5)
+        
+        # Typing writes straight through to the model
+        for event in ("<KeyRelease>", "<FocusOut>"):
+            self.name_entry.bind(event, self.on_name_changed)
+            self.duration_entry.bind(event, self.on_duration_changed)
+            
+    def bind_to(self, index, name, duration):
+        if index != self.index:
+            self.index = index
+            self.label.configure(text=f"Rep {index + 1}:")
+        self._set_text(self.name_entry, name)
+        self._set_text(self.duration_entry, duration)
+        if not self.visible:
+            self.frame.pack(fill="x", padx=5, pady=2)
+            self.visible = True
+            
+    def hide(self):
+        if self.visible:
+            self.frame.pack_forget()
+            self.visible = False
+        self.index = None
+        
+    def on_name_changed(self, event=None):
+        if self.index is not None:
+            self.editor.model.set_name(self.index, self.name_entry.get())
+            
+    def on_duration_changed(self, event=None):
+        if self.index is not None:
+            self.editor.model.set_duration(self.index, self.duration_entry.get())
+            
+    def on_delete(self):
+        if self.index is not None:
+            self.editor.model.remove(self.index)
+            
+    @staticmethod
+    def _set_text(entry, text):
+        if entry.get() != text:
+            entry.delete(0, 'end')
+            entry.insert(0, text)
+
+
+class RepEditor:
+    def __init__(self, master, model, batch_size=40):
+        self.master = master
+        self.model = model
+        self.batch_size = batch_size
+        self.rows = []
+        self._building = False
+        model.subscribe(self.on_model_changed)
+        
+    def on_model_changed(self, kind, index):
+        if kind == UPDATE:
+            # The edit came from the row itself; nothing to redraw
+            return
+        if kind == INSERT and index == len(self.model) - 1 and index <= len(self.rows):
+            # Appending: bind (or build) just the new row
+            self._bind_row(index)
+            return
+        self.sync()
+        
+    def sync(self):
+        # Re-label the pooled rows, hide the surplus, build the rest lazily
+        count = len(self.model)
+        for index, row in enumerate(self.rows):
+            if index < count:
+                name, duration = self.model[index]
+                row.bind_to(index, name, duration)
+            else:
+                row.hide()
+        if len(self.rows) < count:
+            self._schedule_batch()
+            
+    def _bind_row(self, index):
+        if index == len(self.rows):
+            self.rows.append(RepRow(self, self.master))
+        name, duration = self.model[index]
+        self.rows[index].bind_to(index, name, duration)
+        
+    def _schedule_batch(self):
+        if not self._building:
+            self._building = True
+            self.master.after_idle(self._build_batch)
+            
+    def _build_batch(self):
+        count = len(self.model)
+        stop = min(count, len(self.rows) + self.batch_size)
+        while len(self.rows) < stop:
+            self._bind_row(len(self.rows))
+        self._building = False
+        if len(self.rows) < count:
+            self._schedule_batch()
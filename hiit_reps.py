@@ -0,0 +1,84 @@
+"""Plain data model behind the rep editor.
+
+The editor widgets only mirror this model; reading, bulk loading and
+validating reps never has to walk the widget tree or re-parse entries.
+"""
+
+# Change kinds passed to listeners as listener(kind, index)
+RESET = "reset"
+INSERT = "insert"
+REMOVE = "remove"
+UPDATE = "update"
+
+
+class RepListModel:
+    def __init__(self):
+        # Each row is [name, duration_text]; durations stay as typed until
+        # validated so half-typed values are not lost
+        self.rows = []
+        self._listeners = []
+        
+    def __len__(self):
+        return len(self.rows)
+        
+    def __getitem__(self, index):
+        return self.rows[index]
+        
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+        return listener
+        
+    def append(self, name, duration):
+        self.rows.append([name, str(duration)])
+        self._notify(INSERT, len(self.rows) - 1)
+        
+    def remove(self, index):
+        del self.rows[index]
+        self._notify(REMOVE, index)
+        
+    def set_name(self, index, name):
+        if self.rows[index][0] != name:
+            self.rows[index][0] = name
+            self._notify(UPDATE, index)
+            
+    def set_duration(self, index, duration):
+        duration = str(duration)
+        if self.rows[index][1] != duration:
+            self.rows[index][1] = duration
+            self._notify(UPDATE, index)
+            
+    def replace_all(self, reps):
+        # Bulk load: one notification however many reps there are
+        self.rows = [[rep["name"], str(rep["duration"])] for rep in reps]
+        self._notify(RESET, 0)
+        
+    def clear(self):
+        self.replace_all([])
+        
+    def validate(self):
+        """Return (reps, errors) where errors lists (index, message)."""
+        reps = []
+        errors = []
+        for i, (name, duration) in enumerate(self.rows):
+            name = name.strip()
+            if not name:
+                errors.append((i, "name is empty"))
+                continue
+            try:
+                seconds = int(duration)
+            except ValueError:
+                errors.append((i, f"duration '{duration}' is not a whole number"))
+                continue
+            if seconds <= 0:
+                errors.append((i, "duration must be greater than zero"))
+                continue
+            reps.append({"name": name, "duration": seconds})
+        return reps, errors
+        
+    def to_reps(self):
+        # Valid reps only, silently skipping the rest
+        return self.validate()[0]
+        
+    def _notify(self, kind, index):
+        for listener in list(self._listeners):
+            listener(kind, index)
@@ -0,0 +1,140 @@
+"""Monotonic deadline scheduling for the workout timer."""
+import threading
+import time
+
+# Deadlines closer than this count as reached. Sums like 0.1 * n never
+# land exactly on the clock, and a sleep that small may not move it at all.
+TIME_EPSILON = 1e-9
+
+
+class DeadlineScheduler:
+    """Workout clock driven by absolute time.monotonic() deadlines.
+    
+    Elapsed workout time is always read back from the clock instead of being
+    accumulated from sleeps, so scheduling jitter and UI dispatch latency can
+    never add up into drift. Paused time is measured from the pause/resume
+    timestamps themselves and excluded exactly.
+    
+    Active time is tracked separately from elapsed time: it is how long the
+    clock actually ran, so seeking changes elapsed() but not active().
+    """
+    
+    def __init__(self, clock=time.monotonic, sleep=None, poll_interval=0.05):
+        # `clock` and `sleep` can be swapped for a simulated clock; with the
+        # default sleep the scheduler blocks on an event so pause, resume and
+        # stop wake it up immediately instead of waiting for a poll.
+        self.clock = clock
+        self.poll_interval = poll_interval
+        self._sleep = sleep
+        self._wake = threading.Event()
+        self._origin = None
+        self._paused_at = None
+        self._paused_total = 0.0
+        self._stopped = False
+        self._seeks = 0
+        self._started_at = None
+        self._stopped_at = None
+        self._active_base = 0.0
+        
+    @property
+    def is_paused(self):
+        return self._paused_at is not None
+        
+    @property
+    def is_stopped(self):
+        return self._stopped
+        
+    def start(self, elapsed=0.0, active=None):
+        # `active` carries time already trained before a resume; it
+        # defaults to `elapsed`, as if that much had been trained in order
+        self._origin = self.clock() - elapsed
+        self._started_at = self._origin + elapsed
+        self._stopped_at = None
+        self._active_base = elapsed if active is None else active
+        self._paused_at = None
+        self._paused_total = 0.0
+        self._stopped = False
+        self._wake.clear()
+        
+    def elapsed(self):
+        if self._origin is None:
+            return 0.0
+        now = self._paused_at if self._paused_at is not None else self.clock()
+        return now - self._origin - self._paused_total
+        
+    def active(self):
+        """Seconds the clock ran since start(), excluding pauses.
+        
+        Unlike elapsed() this ignores seeks, and it stops counting at stop().
+        """
+        if self._started_at is None:
+            return 0.0
+        end = self._stopped_at if self._stopped_at is not None else self.clock()
+        paused = self._paused_total
+        if self._paused_at is not None:
+            paused += end - self._paused_at
+        return self._active_base + end - self._started_at - paused
+        
+    def paused_total(self):
+        if self._paused_at is None:
+            return self._paused_total
+        return self._paused_total + self.clock() - self._paused_at
+        
+    def deadline(self, elapsed):
+        # Monotonic time at which `elapsed` is reached if nothing is paused
+        return self._origin + self._paused_total + elapsed
+        
+    def pause(self):
+        if self._paused_at is None:
+            self._paused_at = self.clock()
+            self._wake.set()
+            
+    def resume(self):
+        if self._paused_at is not None:
+            self._paused_total += self.clock() - self._paused_at
+            self._paused_at = None
+            self._wake.set()
+            
+    def seek(self, elapsed):
+        # Move the origin so that elapsed() reads `elapsed` from now on
+        now = self._paused_at if self._paused_at is not None else self.clock()
+        self._origin = now - self._paused_total - elapsed
+        self._seeks += 1
+        self._wake.set()
+        
+    def stop(self, elapsed=None):
+        # A stop noticed late can be dated back to when the clock read
+        # `elapsed`, so active() does not count the overshoot
+        if not self._stopped:
+            now = self._paused_at if self._paused_at is not None else self.clock()
+            if elapsed is not None and self._origin is not None:
+                now -= max(0.0, self.elapsed() - elapsed)
+            self._stopped_at = now
+        self._stopped = True
+        self._wake.set()
+        
+    def sleep_until(self, elapsed):
+        """Block until the workout clock reaches `elapsed` seconds.
+        
+        Returns False if the scheduler was stopped while waiting. Returns
+        early after a seek so the caller can work out a new deadline.
+        """
+        seeks = self._seeks
+        while not self._stopped:
+            self._wake.clear()
+            if self._seeks != seeks:
+                return True
+            if self._paused_at is not None:
+                self._wait(None)
+                continue
+            remaining = elapsed - self.elapsed()
+            if remaining <= TIME_EPSILON:
+                return True
+            self._wait(remaining)
+        return False
+        
+    def _wait(self, timeout):
+        if self._sleep is not None:
+            self._sleep(self.poll_interval if timeout is None else timeout)
+        else:
+            self._wake.wait(timeout)
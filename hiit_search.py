@@ -0,0 +1,178 @@
+"""Incremental search index over saved workouts.
+
+Workout names and rep names are split into lowercase tokens with a posting
+set per distinct token; the distinct tokens are kept sorted, so a prefix
+lookup is a binary search. Workout names are also
+indexed by trigram, which catches typos and matches in the middle of a
+word when the prefix lookup comes up short.
+"""
+import heapq
+import re
+from bisect import bisect_left, insort
+from itertools import islice
+from collections import Counter
+
+from hiit_library import workout_rep_names
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def trigrams(text):
+    text = f"  {' '.join(tokenize(text))} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class WorkoutSearchIndex:
+    def __init__(self, min_similarity=0.4):
+        self.min_similarity = min_similarity
+        self.version = None
+        self._docs = {}
+        self._rank = {}
+        self._ranked = []
+        # Sorted distinct tokens, and the names containing each one. The
+        # vocabulary of a workout library is small even when the library is
+        # not, so prefix lookups walk a short list
+        self._vocab = []
+        self._postings = {}
+        # Names by their first token, to rank "starts with" matches first
+        self._lead = {}
+        self._grams = {}
+        
+    def __len__(self):
+        return len(self._docs)
+        
+    def build(self, workouts, version=None):
+        """Index a whole {name: workout} library in one pass."""
+        self._docs = {}
+        self._rank = {}
+        self._postings = {}
+        self._lead = {}
+        self._grams = {}
+        for name, workout in workouts.items():
+            self._index(name, workout)
+        self._vocab = sorted(self._postings)
+        self._ranked = sorted(self._rank.values())
+        self.version = version
+        
+    def add(self, name, workout):
+        self.remove(name)
+        insort(self._ranked, (len(name), name))
+        for token in self._index(name, workout)[0]:
+            pos = bisect_left(self._vocab, token)
+            if pos == len(self._vocab) or self._vocab[pos] != token:
+                self._vocab.insert(pos, token)
+                
+    def remove(self, name):
+        doc = self._docs.pop(name, None)
+        if doc is None:
+            return
+        rank = self._rank.pop(name)
+        pos = bisect_left(self._ranked, rank)
+        if pos < len(self._ranked) and self._ranked[pos] == rank:
+            del self._ranked[pos]
+        doc_tokens, doc_grams, lead = doc
+        for token in doc_tokens:
+            if self._discard(self._postings, token, name):
+                pos = bisect_left(self._vocab, token)
+                if pos < len(self._vocab) and self._vocab[pos] == token:
+                    del self._vocab[pos]
+        if lead is not None:
+            self._discard(self._lead, lead, name)
+        for gram in doc_grams:
+            self._discard(self._grams, gram, name)
+            
+    def prefix_matches(self, word, postings=None):
+        # Names with any token starting with `word`
+        postings = self._postings if postings is None else postings
+        vocab = self._vocab
+        found = []
+        for pos in range(bisect_left(vocab, word), len(vocab)):
+            token = vocab[pos]
+            if not token.startswith(word):
+                break
+            names = postings.get(token)
+            if names:
+                found.append(names)
+        return set().union(*found)
+        
+    def search(self, query, limit=50):
+        """Return up to `limit` names, best matches first."""
+        words = tokenize(query)
+        if not words:
+            return [name for _, name in self._ranked[:limit]]
+            
+        # Every query word must prefix-match a token of the workout
+        matches = None
+        for word in sorted(words, key=len, reverse=True):
+            found = self.prefix_matches(word)
+            matches = found if matches is None else matches & found
+            if not matches:
+                break
+                
+        # Names that start with the first word rank ahead of the rest
+        results = []
+        if matches:
+            leading = matches & self.prefix_matches(words[0], self._lead)
+            results = self._top(leading, limit)
+            if len(results) < limit:
+                results += self._top(matches, limit - len(results), exclude=leading)
+        matches = matches or set()
+        
+        # Fall back to trigram similarity on names for typos and infixes
+        query_grams = trigrams(query)
+        if len(results) < limit and len(query.strip()) >= 3:
+            counts = Counter()
+            for gram in query_grams:
+                counts.update(self._grams.get(gram, ()))
+            scored = []
+            for name, hits in counts.items():
+                if name in matches:
+                    continue
+                score = hits / len(query_grams)
+                if score >= self.min_similarity:
+                    scored.append((-score, self._rank[name]))
+            results.extend(name for _, (_, name) in heapq.nsmallest(limit - len(results), scored))
+        return results
+        
+    def _top(self, names, limit, exclude=frozenset()):
+        # Best-ranked `limit` of `names`. When most of the library matches,
+        # as it does for the first keystroke, walking the ranked list stops
+        # after a few hundred names instead of sorting tens of thousands
+        if len(names) * 16 < len(self._ranked):
+            return heapq.nsmallest(limit, (name for name in names if name not in exclude), key=self._rank.__getitem__)
+        ranked = (name for _, name in self._ranked if name in names and name not in exclude)
+        return list(islice(ranked, limit))
+        
+    def _index(self, name, workout):
+        doc_tokens = set(tokenize(name))
+        lead = tokenize(name)[:1]
+        lead = lead[0] if lead else None
+        for rep_name in workout_rep_names(workout):
+            doc_tokens.update(tokenize(rep_name))
+        doc_grams = trigrams(name)
+        doc = (doc_tokens, doc_grams, lead)
+        self._docs[name] = doc
+        self._rank[name] = (len(name), name)
+        for token in doc_tokens:
+            self._postings.setdefault(token, set()).add(name)
+        if lead is not None:
+            self._lead.setdefault(lead, set()).add(name)
+        for gram in doc_grams:
+            self._grams.setdefault(gram, set()).add(name)
+        return doc
+        
+    @staticmethod
+    def _discard(postings, key, name):
+        # Returns True once the last name for `key` is gone
+        names = postings.get(key)
+        if names is None:
+            return False
+        names.discard(name)
+        if not names:
+            del postings[key]
+            return True
+        return False
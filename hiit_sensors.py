@@ -0,0 +1,349 @@
+"""Streaming sensor samples, such as heart rate, tied to workout segments.
+
+Samples come from a small source interface (SampleSource). The simulated
+and file-replay sources need no hardware, so the whole path can be run
+and tested anywhere. A SensorReader thread takes batches off the source,
+never the Tk thread, and hands each batch to:
+
+- a SampleRing, a preallocated ring holding the latest samples;
+- a Downsampler, which averages samples into one value per display
+  interval; the app sends that to the renderer for the Timer tab;
+- SegmentStats, an engine listener that keeps min/avg/max for each
+  segment of the running workout; workout_complete saves them in the
+  history entry under "heart_rate".
+
+Memory does not grow with the sample rate or the session length. The
+ring is fixed, the downsampler holds one bin, and the segment stats keep
+four numbers per segment. Each batch is folded with min(), max() and
+sum() over slices, so a high sample rate costs C loops rather than
+Python ones.
+
+Set HIIT_SENSOR (or "sensor" in the settings) to "sim", "sim:<Hz>" or
+"file:<path>"; a file holds one "seconds,value" sample per line.
+"""
+import math
+import random
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+import hiit_engine
+
+# How many seconds of missed samples a source catches up on after a stall
+MAX_CATCH_UP = 5.0
+
+
+class SampleSource:
+    """Base for sample sources.
+    
+    read() waits for the next batch and returns it as (times, values):
+    monotonic seconds and readings, oldest first. It returns None once
+    the source has ended or been closed. close() may be called from any
+    thread and makes a waiting read() return promptly.
+    """
+    
+    name = "source"
+    
+    def __init__(self):
+        self._closed = threading.Event()
+        
+    def read(self):
+        raise NotImplementedError
+        
+    def close(self):
+        self._closed.set()
+
+
+class SimulatedSource(SampleSource):
+    """Synthetic heart rate that rises and falls over `period` seconds."""
+    
+    name = "sim"
+    
+    def __init__(self, rate=50.0, resting=70.0, peak=165.0, period=60.0, batch=0.1, seed=None, clock=time.monotonic):
+        super().__init__()
+        self.rate = rate
+        self.resting = resting
+        self.peak = peak
+        self.period = period
+        self.batch = batch
+        self.clock = clock
+        self._rng = random.Random(seed)
+        self._start = None
+        self._next = None
+        
+    def read(self):
+        if self._start is None:
+            self._start = self._next = self.clock()
+        if self._closed.wait(self.batch):
+            return None
+        now = self.clock()
+        step = 1.0 / self.rate
+        # Samples lost while the reader was stalled are not made up
+        self._next = max(self._next, now - MAX_CATCH_UP)
+        count = max(0, int((now - self._next) / step) + 1)
+        times = [self._next + i * step for i in range(count)]
+        self._next += count * step
+        swing = (self.peak - self.resting) / 2
+        values = [
+            self.resting + swing * (1 - math.cos(2 * math.pi * (t - self._start) / self.period)) + self._rng.gauss(0, 1.5)
+            for t in times
+        ]
+        return times, values
+
+
+class FileReplaySource(SampleSource):
+    """Replays "seconds,value" lines from a file, at the recorded pace.
+    
+    With speed=0 the file is read as fast as it can be, `chunk` samples
+    per batch. The file is read line by line, so its size doesn't matter.
+    """
+    
+    name = "file"
+    
+    def __init__(self, path, speed=1.0, batch=0.1, chunk=1024, clock=time.monotonic):
+        super().__init__()
+        self.path = path
+        self.speed = speed
+        self.batch = batch
+        self.chunk = chunk
+        self.clock = clock
+        self._file = open(path, "r", encoding="utf-8")
+        self._origin = None
+        self._ahead = None  # the next sample, read but not yet due
+        
+    def read(self):
+        if self.speed and self._origin is not None:
+            self._closed.wait(self.batch)
+        if self._closed.is_set():
+            # Closed here, on the reader thread, never under its feet
+            self._file.close()
+            return None
+        now = self.clock()
+        times, values = [], []
+        while len(values) < self.chunk:
+            sample = self._ahead or self._next_sample()
+            self._ahead = None
+            if sample is None:
+                break
+            t, value = sample
+            if self._origin is None:
+                self._origin = now - (t / self.speed if self.speed else t)
+            at = self._origin + (t / self.speed if self.speed else t)
+            if self.speed and at > now:
+                self._ahead = sample
+                break
+            times.append(at)
+            values.append(value)
+        if not values and self._ahead is None:
+            # End of the file
+            self.close()
+            self._file.close()
+            return None
+        return times, values
+        
+    def _next_sample(self):
+        for line in self._file:
+            fields = line.replace(",", " ").split()
+            if len(fields) < 2 or line.lstrip().startswith("#"):
+                continue
+            try:
+                return float(fields[0]), float(fields[1])
+            except ValueError:
+                # A header line
+                continue
+        return None
+
+
+def source_from_spec(spec):
+    if spec == "sim":
+        return SimulatedSource()
+    if spec.startswith("sim:"):
+        return SimulatedSource(rate=float(spec[4:]))
+    if spec.startswith("file:"):
+        return FileReplaySource(spec[5:])
+    raise ValueError(f"Unknown sensor source: {spec}")
+
+
+class SampleRing:
+    """The last `capacity` samples, in preallocated arrays."""
+    
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.values = array("d", bytes(8 * capacity))
+        self.count = 0  # samples ever added
+        self._lock = threading.Lock()
+        
+    def __len__(self):
+        return min(self.count, self.capacity)
+        
+    def extend(self, times, values):
+        capacity = self.capacity
+        added = len(values)
+        if added > capacity:
+            times, values = times[-capacity:], values[-capacity:]
+        with self._lock:
+            pos = (self.count + added - len(values)) % capacity
+            for column, data in ((self.times, times), (self.values, values)):
+                first = min(len(data), capacity - pos)
+                column[pos:pos + first] = array("d", data[:first])
+                if first < len(data):
+                    column[:len(data) - first] = array("d", data[first:])
+            self.count += added
+            
+    def latest(self, count=None):
+        """(times, values) of the newest `count` samples, oldest first."""
+        with self._lock:
+            size = len(self)
+            count = size if count is None else min(count, size)
+            end = self.count % self.capacity
+            start = (end - count) % self.capacity
+            if start < end or not count:
+                return self.times[start:end].tolist(), self.values[start:end].tolist()
+            return (self.times[start:] + self.times[:end]).tolist(), (self.values[start:] + self.values[:end]).tolist()
+
+
+class Downsampler:
+    """Averages samples into bins of `interval` seconds for display.
+    
+    on_value(bin start, mean) is called, on the reader thread, as each bin
+    closes; bins without samples are skipped.
+    """
+    
+    def __init__(self, interval=1.0, on_value=None):
+        self.interval = interval
+        self.on_value = on_value
+        self._start = None
+        self._end = None
+        self._sum = 0.0
+        self._count = 0
+        
+    def add(self, times, values):
+        lo = 0
+        while lo < len(values):
+            if self._end is None or times[lo] >= self._end:
+                self._close()
+                self._start = math.floor(times[lo] / self.interval) * self.interval
+                self._end = self._start + self.interval
+            hi = bisect_left(times, self._end, lo)
+            self._sum += sum(values[lo:hi])
+            self._count += hi - lo
+            lo = hi
+            
+    def _close(self):
+        if self._count and self.on_value is not None:
+            self.on_value(self._start, self._sum / self._count)
+        self._sum = 0.0
+        self._count = 0
+
+
+class SegmentStats:
+    """Min/avg/max of the samples taken during each segment of a workout.
+    
+    Subscribe it to the engine for segment changes and to the reader for
+    samples. Samples taken while paused are left out.
+    """
+    
+    def __init__(self):
+        self.segments = {}  # segment index -> [min, sum, count, max]
+        self._current = None
+        self._index = -1
+        self._paused = False
+        self._lock = threading.Lock()
+        
+    def __call__(self, event):
+        kind = event.kind
+        with self._lock:
+            if kind == hiit_engine.SEGMENT_START:
+                self._index = event.segment_index
+            elif kind == hiit_engine.PAUSE:
+                self._paused = True
+            elif kind == hiit_engine.RESUME:
+                self._paused = False
+            elif kind in (hiit_engine.COMPLETE_EVENT, hiit_engine.STOP):
+                self._index = -1
+            else:
+                return
+            if self._index < 0 or self._paused:
+                self._current = None
+            else:
+                self._current = self.segments.setdefault(self._index, [math.inf, 0.0, 0, -math.inf])
+                
+    def add(self, times, values):
+        with self._lock:
+            stats = self._current
+            if stats is None:
+                return
+            stats[0] = min(stats[0], min(values))
+            stats[1] += sum(values)
+            stats[2] += len(values)
+            stats[3] = max(stats[3], max(values))
+            
+    def summary(self):
+        """{"segments": [[index, min, avg, max], ...], "min", "avg", "max"}, or None without samples."""
+        with self._lock:
+            rows = sorted((index, stats) for index, stats in self.segments.items() if stats[2])
+        if not rows:
+            return None
+        count = sum(stats[2] for _, stats in rows)
+        return {
+            "segments": [[index, round(low, 1), round(total / n, 1), round(high, 1)] for index, (low, total, n, high) in rows],
+            "min": round(min(stats[0] for _, stats in rows), 1),
+            "avg": round(sum(stats[1] for _, stats in rows) / count, 1),
+            "max": round(max(stats[3] for _, stats in rows), 1),
+        }
+
+
+class SensorReader:
+    """Thread that drains a SampleSource into a ring and its subscribers.
+    
+    A subscriber is anything with add(times, values); it is called on the
+    reader thread with each batch.
+    """
+    
+    def __init__(self, source, capacity=4096):
+        self.source = source
+        self.ring = SampleRing(capacity)
+        self.samples = 0
+        self.error = None
+        self._sinks = []
+        self._thread = None
+        
+    def subscribe(self, sink):
+        self._sinks.append(sink)
+        return sink
+        
+    def unsubscribe(self, sink):
+        if sink in self._sinks:
+            self._sinks.remove(sink)
+            
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="hiit-sensor")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+        
+    def stop(self, timeout=1.0):
+        self.source.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            
+    def _run(self):
+        try:
+            while True:
+                batch = self.source.read()
+                if batch is None:
+                    return
+                times, values = batch
+                if not values:
+                    continue
+                self.ring.extend(times, values)
+                self.samples += len(values)
+                for sink in list(self._sinks):
+                    sink.add(times, values)
+        except (OSError, ValueError) as e:
+            # The workout goes on without the sensor
+            self.error = e
+            print(f"Sensor stopped: {e}", file=sys.stderr)
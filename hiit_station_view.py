@@ -0,0 +1,83 @@
+"""Compact grid of station timers for multi-station mode.
+
+Each station is one small cell. Engine events arrive on the station
+scheduler thread and are only turned into renderer submissions here, so
+however many stations tick, the Tk thread redraws at most max_fps times a
+second and only touches cells whose text actually changed.
+"""
+import math
+
+import customtkinter as ctk
+
+from hiit_engine import COMPLETE_EVENT, PAUSE, RESUME, SEGMENT_START, STOP, TICK
+
+WORK_COLOR = "#FF5722"
+REST_COLOR = "#4FC3F7"
+DONE_COLOR = "#4CAF50"
+IDLE_COLOR = "gray"
+
+
+def format_mm_ss(seconds):
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+class StationCell:
+    def __init__(self, master, station, on_click=None):
+        self.station = station
+        self.frame = ctk.CTkFrame(master, corner_radius=6)
+        self.name_label = ctk.CTkLabel(self.frame, text=station.name, font=ctk.CTkFont(size=12, weight="bold"))
+        self.name_label.pack(padx=4, pady=(4, 0))
+        self.rep_label = ctk.CTkLabel(self.frame, text="Waiting", text_color=IDLE_COLOR, font=ctk.CTkFont(size=12))
+        self.rep_label.pack(padx=4)
+        self.time_label = ctk.CTkLabel(self.frame, text="--:--", font=ctk.CTkFont(size=22, weight="bold"))
+        self.time_label.pack(padx=4, pady=(0, 4))
+        if on_click is not None:
+            for widget in (self.frame, self.name_label, self.rep_label, self.time_label):
+                widget.bind("<Button-1>", lambda event: on_click(station))
+                
+    def apply(self, value):
+        rep, time_text, color = value
+        self.rep_label.configure(text=rep, text_color=color)
+        self.time_label.configure(text=time_text)
+
+
+class StationGrid(ctk.CTkScrollableFrame):
+    def __init__(self, master, renderer, columns=None, on_click=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.renderer = renderer
+        self.columns = columns
+        self.on_click = on_click
+        self.cells = []
+        
+    def set_stations(self, stations):
+        for cell in self.cells:
+            cell.frame.destroy()
+        stations = list(stations)
+        columns = self.columns or max(1, math.ceil(math.sqrt(len(stations))))
+        for column in range(columns):
+            self.grid_columnconfigure(column, weight=1, uniform="station")
+        self.cells = []
+        for station in stations:
+            cell = StationCell(self, station, self.on_click)
+            cell.frame.grid(row=station.index // columns, column=station.index % columns, padx=3, pady=3, sticky="nsew")
+            self.renderer.register(self.key(station), cell.apply)
+            self.cells.append(cell)
+            
+    @staticmethod
+    def key(station):
+        return f"station:{station.index}"
+        
+    def on_event(self, station, event):
+        # Runs on the scheduler thread; the renderer hands it to Tk
+        if event.kind in (TICK, SEGMENT_START, RESUME):
+            color = REST_COLOR if "rest" in event.name.lower() else WORK_COLOR
+            value = (event.name, format_mm_ss(event.remaining_seconds), color)
+        elif event.kind == PAUSE:
+            value = ("Paused", format_mm_ss(event.remaining_seconds), IDLE_COLOR)
+        elif event.kind == COMPLETE_EVENT:
+            value = ("Complete", "DONE", DONE_COLOR)
+        elif event.kind == STOP:
+            value = ("Stopped", "--:--", IDLE_COLOR)
+        else:
+            return
+        self.renderer.submit({self.key(station): value})
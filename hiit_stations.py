@@ -0,0 +1,238 @@
+"""Many workout engines driven by one scheduler thread.
+
+A circuit class runs 20-100 stations side by side, each with its own
+program and start offset. Instead of a thread per station, every station's
+engine is polled from one thread that sleeps until the earliest deadline in
+a heap of (monotonic time, station) entries. The cost grows with the number
+of events that are actually due, not with the number of stations, and
+stations running the same program share one compiled timeline.
+"""
+import heapq
+import itertools
+import json
+import threading
+import time
+
+from hiit_dsl import ProgramTimeline
+from hiit_engine import IDLE, RUNNING, WorkoutEngine
+from hiit_timeline import WorkoutTimeline
+
+
+class Station:
+    def __init__(self, index, name, engine, offset=0.0, elapsed=0.0):
+        self.index = index
+        self.name = name
+        self.engine = engine
+        # Seconds after the group starts before this station starts, and
+        # the workout time it starts from
+        self.offset = offset
+        self.elapsed = elapsed
+        self.start_at = None
+        self.held_at = None
+        # Bumped on every reschedule; heap entries from older generations
+        # are skipped instead of being searched for and removed
+        self.generation = 0
+        
+    @property
+    def waiting(self):
+        # Started as part of the group but its offset hasn't come up yet
+        return self.engine.state == IDLE and self.start_at is not None
+
+
+class StationGroup:
+    def __init__(self, clock=time.monotonic, sleep=None, tick_interval=1.0, poll_interval=0.05):
+        self.clock = clock
+        self.tick_interval = tick_interval
+        self.poll_interval = poll_interval
+        self.stations = []
+        self.started = False
+        self.polls = 0
+        self._sleep = sleep
+        self._heap = []
+        self._seq = itertools.count()
+        self._timelines = {}
+        self._listeners = []
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+        
+    def __len__(self):
+        return len(self.stations)
+        
+    def __iter__(self):
+        return iter(self.stations)
+        
+    def add(self, name, reps, sets, offset=0.0, elapsed=0.0, program=None):
+        """Add a station; it starts `offset` seconds after the group does.
+        
+        A structured `program` (see hiit_dsl) replaces `reps` when given.
+        """
+        with self._lock:
+            reps = list(reps)
+            if program is not None:
+                key = (json.dumps(program, sort_keys=True), sets)
+            else:
+                key = (tuple((rep["name"], rep["duration"]) for rep in reps), sets)
+            timeline = self._timelines.get(key)
+            if timeline is None:
+                if program is not None:
+                    timeline = ProgramTimeline(program, sets)
+                else:
+                    timeline = WorkoutTimeline(reps, sets)
+                self._timelines[key] = timeline
+            engine = WorkoutEngine(reps, sets, clock=self.clock, tick_interval=self.tick_interval, timeline=timeline)
+            station = Station(len(self.stations), name, engine, offset, elapsed)
+            engine.subscribe(lambda event: self._emit(station, event))
+            self.stations.append(station)
+            if self.started:
+                self._start_station(station, self.clock())
+            return station
+            
+    def subscribe(self, listener):
+        # `listener(station, event)` runs on the scheduler thread
+        self._listeners.append(listener)
+        return listener
+        
+    @property
+    def active(self):
+        """Stations that are running, paused or waiting for their offset."""
+        return sum(1 for station in self.stations if station.engine.is_running or station.waiting)
+        
+    def start(self):
+        with self._lock:
+            if self.started:
+                return
+            self.started = True
+            now = self.clock()
+            for station in self.stations:
+                self._start_station(station, now)
+        self._wake.set()
+        
+    def step(self):
+        """Poll every station whose deadline has passed; return how many."""
+        polled = 0
+        with self._lock:
+            now = self.clock()
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                _, _, generation, station = heapq.heappop(heap)
+                if generation != station.generation:
+                    continue
+                if station.engine.state == IDLE:
+                    # A late wake-up still starts on the group's schedule
+                    station.engine.start(station.elapsed + max(0.0, now - station.start_at))
+                else:
+                    station.engine.poll()
+                self._schedule(station)
+                polled += 1
+        self.polls += polled
+        return polled
+        
+    def next_wakeup(self):
+        # Monotonic time of the earliest live heap entry, or None
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][2] != heap[0][3].generation:
+                heapq.heappop(heap)
+            return heap[0][0] if heap else None
+            
+    def run(self):
+        """Drive all stations on the calling thread until they finish."""
+        self.start()
+        while not self._stopped:
+            self._wake.clear()
+            self.step()
+            wakeup = self.next_wakeup()
+            if wakeup is None and not self.active:
+                break
+            timeout = None if wakeup is None else max(0.0, wakeup - self.clock())
+            if self._sleep is not None:
+                self._sleep(self.poll_interval if timeout is None else timeout)
+            else:
+                # Woken early by pause/resume/skip/add from another thread
+                self._wake.wait(timeout)
+                
+    def run_in_thread(self):
+        self._thread = threading.Thread(target=self.run)
+        self._thread.daemon = True
+        self._thread.start()
+        return self._thread
+        
+    def pause(self, station):
+        with self._lock:
+            if station.waiting and station.held_at is None:
+                station.held_at = self.clock()
+                station.generation += 1
+            else:
+                station.engine.pause()
+                self._schedule(station)
+        self._wake.set()
+        
+    def resume(self, station):
+        with self._lock:
+            if station.held_at is not None:
+                # Keep the same distance to the start as when it was held
+                station.start_at += self.clock() - station.held_at
+                station.held_at = None
+            else:
+                station.engine.resume()
+            self._schedule(station)
+        self._wake.set()
+        
+    def skip(self, station):
+        self._control(station, station.engine.skip)
+        
+    def back(self, station):
+        self._control(station, station.engine.back)
+        
+    def stop_station(self, station):
+        with self._lock:
+            station.start_at = None
+            station.held_at = None
+        self._control(station, station.engine.stop)
+        
+    def pause_all(self):
+        for station in self.stations:
+            self.pause(station)
+            
+    def resume_all(self):
+        for station in self.stations:
+            self.resume(station)
+            
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            for station in self.stations:
+                station.start_at = None
+                station.held_at = None
+                station.generation += 1
+                station.engine.stop()
+            self._heap = []
+        self._wake.set()
+        
+    def _control(self, station, action):
+        with self._lock:
+            action()
+            self._schedule(station)
+        self._wake.set()
+        
+    def _start_station(self, station, now):
+        station.start_at = now + station.offset
+        self._schedule(station)
+        
+    def _schedule(self, station):
+        station.generation += 1
+        engine = station.engine
+        if engine.state == RUNNING:
+            when = engine.scheduler.deadline(engine.next_deadline())
+        elif station.waiting and station.held_at is None:
+            when = station.start_at
+        else:
+            # Paused, finished or stopped: nothing to wake up for
+            return
+        heapq.heappush(self._heap, (when, next(self._seq), station.generation, station))
+        
+    def _emit(self, station, event):
+        for listener in list(self._listeners):
+            listener(station, event)
@@ -0,0 +1,105 @@
+"""Crash-safe file helpers shared by the persistence code."""
+import json
+import os
+import tempfile
+
+
+def fsync_dir(path):
+    # Make a rename durable; not supported on Windows, where it isn't needed
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, data, fsync=True):
+    """Replace `path` with `data` (str or bytes) via a temp file and rename.
+    
+    Readers see either the old or the new contents, never a partial write.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    if fsync:
+        fsync_dir(path)
+
+
+def atomic_write_json(path, obj, fsync=True, indent=2):
+    atomic_write(path, json.dumps(obj, indent=indent), fsync=fsync)
+
+
+def append_line(path, line, fsync=True):
+    """Append one line to `path`, flushed (and fsync'd) before returning."""
+    data = line.encode("utf-8") + b"\n"
+    with open(path, "a+b") as f:
+        # Never glue a record onto a line torn by an earlier crash
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                data = b"\n" + data
+        f.write(data)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+
+
+def iter_jsonl(path):
+    """Yield records from a JSON Lines file one at a time, skipping bad lines."""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        for raw in f:
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                yield json.loads(raw)
+            except ValueError:
+                continue
+
+
+def read_jsonl(path):
+    """Return (records, bad_lines) from a JSON Lines file.
+    
+    Lines that do not parse, such as a write torn by a crash, are counted
+    and skipped instead of failing the whole load.
+    """
+    records = []
+    bad_lines = 0
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return records, bad_lines
+    with f:
+        for raw in f:
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                records.append(json.loads(raw))
+            except ValueError:
+                bad_lines += 1
+    return records, bad_lines
@@ -0,0 +1,281 @@
+"""Per-session telemetry: what actually happened while a workout ran.
+
+A history entry says which workout was done and its total time. The
+TelemetryRecorder listens to the engine and logs every segment start,
+pause, resume, seek (skip or back), completion and stop with a monotonic
+timestamp, so each interval's real duration and every pause can be
+recovered afterwards. A segment ends where the next event after its start
+leaves it.
+
+Events are stored as delta-encoded integers. After a version byte, each
+event is three varints:
+
+    zigzag(ms since the previous event) << 3 | kind
+    zigzag(change in segment index)
+    zigzag(change in workout time, in ms)
+
+Times are rounded once against the session start, not per delta, so
+rounding never accumulates. A normal segment change costs 3-4 bytes,
+against the hundred or so a JSON event would take.
+
+The encoded session is appended to <history>.telemetry next to the
+history store, and the history entry keeps its [offset, length] under
+"telemetry" (an extra key, so it goes to the store's extra file).
+replay() decodes a session back to its events and rebuild() folds them
+into per-segment runs and pauses. Both are pure functions of the bytes,
+so the same session always replays the same way.
+"""
+import os
+import threading
+import time
+from typing import List, NamedTuple
+
+import hiit_engine
+
+VERSION = 1
+
+# Event kind <-> the 3-bit code stored for it
+KINDS = (
+    hiit_engine.SEGMENT_START,
+    hiit_engine.PAUSE,
+    hiit_engine.RESUME,
+    hiit_engine.SEEK,
+    hiit_engine.COMPLETE_EVENT,
+    hiit_engine.STOP,
+)
+CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+
+def zigzag(n):
+    # Small negative numbers become small non-negative ones
+    return n << 1 if n >= 0 else (-n << 1) - 1
+
+
+def unzigzag(z):
+    return (z >> 1) ^ -(z & 1)
+
+
+def write_varint(buffer, value):
+    while value > 0x7F:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, pos):
+    """(value, next position) of the varint at data[pos]."""
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("truncated telemetry")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def telemetry_path(history_path):
+    return os.path.splitext(history_path)[0] + ".telemetry"
+
+
+class TelemetryEvent(NamedTuple):
+    kind: str
+    time: float  # seconds since the session started, by the monotonic clock
+    segment_index: int
+    elapsed: float  # workout time
+
+
+class SegmentRun(NamedTuple):
+    index: int
+    start: float
+    end: float
+    elapsed_start: float
+    elapsed_end: float
+    paused: float
+    skipped: bool  # left by a skip or back rather than by running out
+    
+    @property
+    def active(self):
+        return self.end - self.start - self.paused
+
+
+class Pause(NamedTuple):
+    start: float
+    duration: float
+    segment_index: int
+
+
+class SessionTrace(NamedTuple):
+    segments: List[SegmentRun]
+    pauses: List[Pause]
+    duration: float
+    paused: float
+    completed: bool
+
+
+class TelemetryRecorder:
+    """Engine listener that encodes the session's events as they happen.
+    
+    Give it the engine's clock when that isn't time.monotonic, e.g. a
+    ManualClock in a simulation.
+    """
+    
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.events = 0
+        self._data = bytearray([VERSION])
+        self._origin = None
+        self._time = 0
+        self._segment = 0
+        self._elapsed = 0
+        self._lock = threading.Lock()
+        
+    def __call__(self, event):
+        code = CODES.get(event.kind)
+        if code is None:
+            # Ticks carry nothing a replay needs
+            return
+        now = self.clock()
+        with self._lock:
+            if self._origin is None:
+                self._origin = now
+            t = round((now - self._origin) * 1000)
+            elapsed = round(event.elapsed * 1000)
+            data = self._data
+            write_varint(data, zigzag(t - self._time) << 3 | code)
+            write_varint(data, zigzag(event.segment_index - self._segment))
+            write_varint(data, zigzag(elapsed - self._elapsed))
+            self._time, self._segment, self._elapsed = t, event.segment_index, elapsed
+            self.events += 1
+            
+    def encode(self):
+        with self._lock:
+            return bytes(self._data)
+
+
+def replay(data):
+    """Decode a recorded session into its TelemetryEvents, in order."""
+    if not data or data[0] != VERSION:
+        raise ValueError("unknown telemetry version")
+    events = []
+    pos = 1
+    t = segment = elapsed = 0
+    while pos < len(data):
+        head, pos = read_varint(data, pos)
+        delta, pos = read_varint(data, pos)
+        elapsed_delta, pos = read_varint(data, pos)
+        code = head & 7
+        if code >= len(KINDS):
+            raise ValueError(f"bad telemetry event code {code}")
+        t += unzigzag(head >> 3)
+        segment += unzigzag(delta)
+        elapsed += unzigzag(elapsed_delta)
+        events.append(TelemetryEvent(KINDS[code], t / 1000, segment, elapsed / 1000))
+    return events
+
+
+def rebuild(data):
+    """Fold a recorded session into a SessionTrace of segment runs and pauses."""
+    segments = []
+    pauses = []
+    current = None  # [index, start, elapsed start, paused]
+    paused_at = None
+    pause_start = pause_segment = None
+    completed = False
+    end = 0.0
+    
+    def close(event, skipped):
+        nonlocal paused_at
+        if current is None:
+            return
+        paused = current[3]
+        if paused_at is not None:
+            # A pause still running when the segment is left counts there,
+            # and carries on into whatever comes next
+            paused += event.time - paused_at
+            paused_at = event.time
+        segments.append(SegmentRun(current[0], current[1], event.time, current[2], event.elapsed, paused, skipped))
+        
+    for event in replay(data):
+        end = event.time
+        kind = event.kind
+        if kind == hiit_engine.SEGMENT_START:
+            close(event, False)
+            current = [event.segment_index, event.time, event.elapsed, 0.0]
+        elif kind == hiit_engine.PAUSE:
+            paused_at = pause_start = event.time
+            pause_segment = event.segment_index
+        elif kind == hiit_engine.RESUME and paused_at is not None:
+            if current is not None:
+                current[3] += event.time - paused_at
+            pauses.append(Pause(pause_start, event.time - pause_start, pause_segment))
+            paused_at = pause_start = None
+        elif kind == hiit_engine.SEEK:
+            close(event, True)
+            current = None
+        elif kind in (hiit_engine.COMPLETE_EVENT, hiit_engine.STOP):
+            close(event, False)
+            current = None
+            if pause_start is not None:
+                pauses.append(Pause(pause_start, event.time - pause_start, pause_segment))
+                paused_at = pause_start = None
+            completed = kind == hiit_engine.COMPLETE_EVENT
+    return SessionTrace(segments, pauses, end, sum(pause.duration for pause in pauses), completed)
+
+
+class TelemetryLog:
+    """Encoded sessions appended to one file, addressed by [offset, length].
+    
+    Offsets are handed out on the calling thread; with a `writer` (a
+    hiit_persist.WriteBehind) the bytes are written there, each at its own
+    offset, so a write that failed leaves a hole rather than shifting the
+    sessions after it.
+    """
+    
+    def __init__(self, path, writer=None, fsync=True):
+        self.path = path
+        self.writer = writer
+        self.fsync = fsync
+        self._size = None
+        self._lock = threading.Lock()
+        
+    def append(self, data):
+        """Store one encoded session; returns its [offset, length]."""
+        with self._lock:
+            if self._size is None:
+                try:
+                    self._size = os.path.getsize(self.path)
+                except FileNotFoundError:
+                    self._size = 0
+            offset = self._size
+            self._size += len(data)
+        if self.writer is None:
+            self._write(offset, data)
+        else:
+            self.writer.submit(self._write, offset, data, description="telemetry")
+        return [offset, len(data)]
+        
+    def read(self, ref):
+        """The encoded session at `ref`, or None if it isn't there."""
+        offset, length = ref
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                data = f.read(length)
+        except OSError:
+            return None
+        return data if len(data) == length else None
+        
+    def _write(self, offset, data):
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            os.lseek(fd, offset, os.SEEK_SET)
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            if self.fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
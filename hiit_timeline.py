@@ -0,0 +1,85 @@
+"""Compiled workout timelines.
+
+A workout is flattened once into consecutive segments with prefix-summed
+start offsets, so totals, remaining time and progress are O(1) and finding
+the segment at a given time is a binary search.
+"""
+from array import array
+from bisect import bisect_right
+from typing import NamedTuple
+
+
+def format_time(seconds):
+    """MM:SS, or HH:MM:SS from an hour up; fractions of a second are dropped."""
+    seconds = max(int(seconds), 0)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours > 0:
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+
+class Segment(NamedTuple):
+    index: int
+    set_index: int
+    rep_index: int
+    name: str
+    duration: float
+    start: float
+
+    @property
+    def end(self):
+        return self.start + self.duration
+
+
+class WorkoutTimeline:
+    def __init__(self, reps, sets):
+        # `reps` is a list of {'name': str, 'duration': int} repeated `sets` times
+        self.reps = list(reps)
+        self.sets = max(sets, 0) if self.reps else 0
+        self._offsets = array("d", [0.0])
+        total = 0.0
+        for _ in range(self.sets):
+            for rep in self.reps:
+                total += rep["duration"]
+                self._offsets.append(total)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    @property
+    def total(self):
+        return self._offsets[-1]
+
+    def offset(self, index):
+        # Start time of segment `index`; len(self) gives the end of the workout
+        return self._offsets[max(0, min(index, len(self)))]
+
+    def segment(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        set_index, rep_index = divmod(index, len(self.reps))
+        rep = self.reps[rep_index]
+        return Segment(index, set_index, rep_index, rep["name"], rep["duration"], self._offsets[index])
+
+    def index_at(self, t):
+        # Segment running at time t; segments own [start, end)
+        if t >= self.total:
+            return len(self)
+        return max(0, bisect_right(self._offsets, t) - 1)
+
+    def segment_at(self, t):
+        index = self.index_at(t)
+        return self.segment(index) if index < len(self) else None
+
+    def remaining(self, t):
+        return max(0.0, self.total - max(t, 0.0))
+
+    def progress(self, t):
+        if not self.total:
+            return 1.0
+        return min(max(t / self.total, 0.0), 1.0)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.segment(index)
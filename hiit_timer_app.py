@@ -3,12 +3,36 @@ import tkinter as tk
 from tkinter import messagebox, filedialog
 import json
 import os
+import sys
 import threading
 import time
 import math
 from datetime import datetime, timedelta
-import winsound
 from typing import Dict, List, Optional
+import hiit_engine
+from hiit_engine import WorkoutEngine
+from hiit_history_store import HistoryStore
+from hiit_analytics import HistoryStats
+from hiit_history_view import VirtualHistoryList
+import hiit_export
+from hiit_export import HistoryExporter
+from hiit_audio import AudioEngine
+from hiit_reps import RepListModel
+from hiit_rep_editor import RepEditor
+from hiit_render import DisplayRenderer, clamp_rate
+from hiit_library import WorkoutStore, workout_summary, workout_total_duration
+from hiit_dsl import ProgramError, ProgramTimeline
+from hiit_timeline import format_time
+from hiit_search import WorkoutSearchIndex
+from hiit_stations import StationGroup
+from hiit_station_view import StationGrid
+from hiit_broadcast import BroadcastServer, EngineBroadcaster, parse_address
+from hiit_checkpoint import SessionCheckpoint, session_workout
+from hiit_persist import WriteBehind, data_path
+from hiit_telemetry import TelemetryLog, TelemetryRecorder, telemetry_path
+from hiit_sensors import Downsampler, SegmentStats, SensorReader, source_from_spec
+from hiit_profiles import ProfileDirectory
+import hiit_metrics
 
 # Set appearance mode and color theme
 ctk.set_appearance_mode("dark")
@@ -16,6 +40,11 @@ ctk.set_default_color_theme("blue")
 
 class HIITTimer:
     def __init__(self):
+        self.launch_time = time.perf_counter()
+        # Seconds from launch to each startup milestone
+        self.startup_metrics = {}
+        # Hot-path timings; a no-op unless HIIT_METRICS is set
+        hiit_metrics.configure_from_env()
         self.root = ctk.CTk()
         self.root.title("HIIT Me Up")
         self.root.geometry("800x600")
@@ -30,39 +59,122 @@ class HIITTimer:
         self.total_elapsed = 0
         self.timer_thread = None
         self.start_time = None
+        self.engine = None
+        self.station_group = None
+        self.reset_settings()
+        self.broadcast = None
+        self.sensor = None
+        self.segment_stats = None
+        self.workout_elapsed = 0.0
         
         # Workout data
         self.sets = 1
         self.reps = []  # List of {'name': str, 'duration': int}
-        self.workout_history = []
-        
-        # Settings
-        self.settings_file = "hiit_settings.json"
-        self.workouts_file = "hiit_workouts.json"
-        self.history_file = "hiit_history.json"
-        self.dark_mode = True
+        self.rep_model = RepListModel()
+        # A loaded structured program (see hiit_dsl) runs instead of the rep
+        # list until the reps are edited
+        self.program = None
+        self.workout_program = None
+        self.history_range = (None, None)
+        self.exporter = None
+        
+        # Every file write goes through one worker thread, off the Tk thread
+        self.persist = WriteBehind(on_error=lambda what, e: self.root.after(0, self.save_failed, what, e))
+        
+        # The workout library is shared; settings and history belong to
+        # the active member's profile, and only that profile is loaded
+        self.workouts_file = data_path("hiit_workouts.json")
+        self.workout_store = WorkoutStore(self.workouts_file, writer=self.persist)
+        # Built on the loader thread; later rebuilds also run off the Tk
+        # thread, and the lock guards swapping in a finished index
+        self.search_index = WorkoutSearchIndex()
+        self.search_index_lock = threading.Lock()
+        self.search_index_idle = threading.Event()
+        self.search_page_size = 30
+        self.profiles = ProfileDirectory(writer=self.persist)
+        self.profile = self.profiles.active()
+        self.telemetry = None
+        self.open_profile()
+        
+        # Cues are pre-rendered and played off the Tk thread
+        self.audio = AudioEngine()
         
         self.load_settings()
+        self.tick_interval = 1.0 / self.tick_hz
+        self.start_broadcast()
+        # Ticks are coalesced into at most max_fps redraws of changed widgets
+        self.renderer = DisplayRenderer(self.root, max_fps=self.max_fps)
+        self.start_sensor()
         self.setup_ui()
-        self.load_saved_workouts()
+        self.record_startup("ui_built")
+        self.root.after_idle(self.first_frame)
+        
+        # History and the workout library are read off the Tk thread
+        self.loader_thread = threading.Thread(target=self.load_data)
+        self.loader_thread.daemon = True
+        self.loader_thread.start()
+        
+    def open_profile(self):
+        # Points settings, history and checkpoints at the active profile
+        profile = self.profile
+        self.settings_file = profile.file("hiit_settings.json")
+        self.history_file = profile.file("hiit_history.jsonl")
+        self.legacy_history_file = profile.file("hiit_history.json")
+        # Sessions are memory-mapped records; entries are decoded on demand
+        self.history_store = HistoryStore(self.history_file, self.legacy_history_file, writer=self.persist)
+        # What actually happened in each session, kept next to the history
+        self.telemetry_log = TelemetryLog(telemetry_path(self.history_file), writer=self.persist)
+        # The running workout, so it can be resumed after a crash or reboot
+        self.checkpoint = SessionCheckpoint(profile.file("hiit_session.ckpt"), writer=self.persist)
+        self.history_stats = HistoryStats()
+        self.history_loaded = False
+        self.pending_history = []
         
     def setup_ui(self):
         # Main container
         self.main_frame = ctk.CTkFrame(self.root)
         self.main_frame.pack(fill="both", expand=True, padx=10, pady=10)
         
+        # Whose workouts these are; opens the profile switcher
+        self.profile_btn = ctk.CTkButton(
+            self.main_frame,
+            text=f"👤 {self.profile.name}",
+            command=self.open_profile_switcher,
+            width=160,
+            fg_color="gray"
+        )
+        self.profile_btn.pack(anchor="e", padx=10, pady=(10, 0))
+        
         # Create notebook for tabs
-        self.notebook = ctk.CTkTabview(self.main_frame)
+        self.notebook = ctk.CTkTabview(self.main_frame, command=self.on_tab_changed)
         self.notebook.pack(fill="both", expand=True, padx=10, pady=10)
         
-        # Setup tabs
+        # Setup tabs; Timer and History are only filled in when first shown
         self.setup_tab = self.notebook.add("Setup")
         self.timer_tab = self.notebook.add("Timer")
         self.history_tab = self.notebook.add("History")
+        self.stations_tab = self.notebook.add("Stations")
+        self.stats_tab = self.notebook.add("Stats")
+        self.tab_builders = {
+            "Timer": self.setup_timer_tab,
+            "History": self.setup_history_tab,
+            "Stats": self.setup_stats_tab,
+            "Stations": self.setup_stations_tab
+        }
+        self.tabs_built = set()
         
         self.setup_setup_tab()
-        self.setup_timer_tab()
-        self.setup_history_tab()
+        
+    def on_tab_changed(self):
+        self.ensure_tab(self.notebook.get())
+        
+    def ensure_tab(self, name):
+        if name in self.tabs_built or name not in self.tab_builders:
+            return
+        self.tabs_built.add(name)
+        start = time.perf_counter()
+        self.tab_builders[name]()
+        self.startup_metrics[f"{name.lower()}_tab_build_time"] = round(time.perf_counter() - start, 4)
         
     def setup_setup_tab(self):
         # Top controls frame
@@ -103,10 +215,14 @@ class HIITTimer:
         reps_frame.pack(fill="both", expand=True, padx=10, pady=5)
         
         ctk.CTkLabel(reps_frame, text="Reps Configuration:", font=ctk.CTkFont(size=16, weight="bold")).pack(anchor="w", padx=10, pady=(10, 5))
+        self.program_label = ctk.CTkLabel(reps_frame, text="", text_color="#4FC3F7", anchor="w", justify="left")
+        self.program_label.pack(anchor="w", padx=10)
+        self.rep_model.subscribe(self.on_reps_edited)
         
         # Reps list with scrollbar
         self.reps_frame = ctk.CTkScrollableFrame(reps_frame, height=200)
         self.reps_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        self.rep_editor = RepEditor(self.reps_frame, self.rep_model)
         
         # Add rep button
         add_rep_btn = ctk.CTkButton(reps_frame, text="+ Add Rep", command=self.add_rep)
@@ -167,6 +283,10 @@ class HIITTimer:
         self.set_rep_label = ctk.CTkLabel(timer_frame, text="", font=ctk.CTkFont(size=16))
         self.set_rep_label.pack(pady=5)
         
+        # Live heart rate, once a second; stays empty without a sensor
+        self.sensor_label = ctk.CTkLabel(timer_frame, text="", font=ctk.CTkFont(size=16), text_color="#E53935")
+        self.sensor_label.pack(pady=5)
+        
         # Time info frame
         time_info_frame = ctk.CTkFrame(timer_frame)
         time_info_frame.pack(pady=10)
@@ -181,6 +301,15 @@ class HIITTimer:
         controls_frame = ctk.CTkFrame(timer_frame)
         controls_frame.pack(pady=20)
         
+        self.back_btn = ctk.CTkButton(
+            controls_frame, 
+            text="⏮️ Back", 
+            command=self.back_segment,
+            width=90,
+            state="disabled"
+        )
+        self.back_btn.pack(side="left", padx=10)
+        
         self.pause_btn = ctk.CTkButton(
             controls_frame, 
             text="⏸️ Pause", 
@@ -189,6 +318,15 @@ class HIITTimer:
         )
         self.pause_btn.pack(side="left", padx=10)
         
+        self.skip_btn = ctk.CTkButton(
+            controls_frame, 
+            text="⏭️ Skip", 
+            command=self.skip_segment,
+            width=90,
+            state="disabled"
+        )
+        self.skip_btn.pack(side="left", padx=10)
+        
         self.reset_btn = ctk.CTkButton(
             controls_frame, 
             text="🔄 Reset", 
@@ -198,103 +336,255 @@ class HIITTimer:
         )
         self.reset_btn.pack(side="left", padx=10)
         
+        self.renderer.register("time", lambda text: self.time_display.configure(text=text))
+        self.renderer.register("progress", self.progress_bar.set)
+        self.renderer.register("sensor", lambda text: self.sensor_label.configure(text=text))
+        self.renderer.register("elapsed", lambda text: self.elapsed_label.configure(text=text))
+        self.renderer.register("remaining", lambda text: self.remaining_label.configure(text=text))
+        
     def setup_history_tab(self):
         history_frame = ctk.CTkFrame(self.history_tab)
         history_frame.pack(fill="both", expand=True, padx=10, pady=10)
         
         ctk.CTkLabel(history_frame, text="Workout History", font=ctk.CTkFont(size=20, weight="bold")).pack(pady=10)
         
-        # History list
-        self.history_frame = ctk.CTkScrollableFrame(history_frame)
+        # Date range filter
+        filter_frame = ctk.CTkFrame(history_frame)
+        filter_frame.pack(fill="x", padx=10, pady=(0, 5))
+        
+        ctk.CTkLabel(filter_frame, text="From:").pack(side="left", padx=(10, 5), pady=5)
+        self.history_from_entry = ctk.CTkEntry(filter_frame, placeholder_text="YYYY-MM-DD", width=110)
+        self.history_from_entry.pack(side="left", padx=5, pady=5)
+        
+        ctk.CTkLabel(filter_frame, text="To:").pack(side="left", padx=5, pady=5)
+        self.history_to_entry = ctk.CTkEntry(filter_frame, placeholder_text="YYYY-MM-DD", width=110)
+        self.history_to_entry.pack(side="left", padx=5, pady=5)
+        
+        ctk.CTkButton(filter_frame, text="Filter", width=70, command=self.filter_history).pack(side="left", padx=5, pady=5)
+        ctk.CTkButton(filter_frame, text="Clear", width=70, command=self.clear_history_filter).pack(side="left", padx=5, pady=5)
+        
+        self.history_count_label = ctk.CTkLabel(filter_frame, text="")
+        self.history_count_label.pack(side="right", padx=10, pady=5)
+        
+        # History list; only the visible rows are ever built
+        self.history_frame = VirtualHistoryList(history_frame)
         self.history_frame.pack(fill="both", expand=True, padx=10, pady=10)
         
-        # Export button
-        export_btn = ctk.CTkButton(history_frame, text="Export History", command=self.export_history)
-        export_btn.pack(pady=10)
+        # Export button and progress
+        export_frame = ctk.CTkFrame(history_frame, fg_color="transparent")
+        export_frame.pack(pady=10)
         
-        self.load_history()
+        self.export_btn = ctk.CTkButton(export_frame, text="Export History", command=self.export_history)
+        self.export_btn.pack(side="left", padx=5)
         
-    def add_rep(self):
-        rep_frame = ctk.CTkFrame(self.reps_frame)
-        rep_frame.pack(fill="x", padx=5, pady=2)
-        
-        # Rep number
-        rep_num = len(self.reps_frame.winfo_children())
-        ctk.CTkLabel(rep_frame, text=f"Rep {rep_num}:", width=60).pack(side="left", padx=5, pady=5)
-        
-        # Name entry
-        name_entry = ctk.CTkEntry(rep_frame, placeholder_text="Exercise name", width=150)
-        name_entry.pack(side="left", padx=5, pady=5)
-        name_entry.insert(0, "Work" if rep_num % 2 == 1 else "Rest")
-        
-        # Duration entry
-        duration_entry = ctk.CTkEntry(rep_frame, placeholder_text="Seconds", width=80)
-        duration_entry.pack(side="left", padx=5, pady=5)
-        duration_entry.insert(0, "30" if rep_num % 2 == 1 else "10")
-        
-        # Delete button
-        delete_btn = ctk.CTkButton(
-            rep_frame, 
-            text="❌", 
-            width=30, 
-            command=lambda: self.delete_rep(rep_frame)
-        )
-        delete_btn.pack(side="right", padx=5, pady=5)
+        self.export_status_label = ctk.CTkLabel(export_frame, text="")
+        self.export_status_label.pack(side="left", padx=5)
         
-    def delete_rep(self, rep_frame):
-        rep_frame.destroy()
-        self.update_rep_numbers()
+        if self.history_loaded:
+            self.render_history()
+        else:
+            self.history_count_label.configure(text="Loading history...")
+            
+    def setup_stats_tab(self):
+        stats_frame = ctk.CTkFrame(self.stats_tab)
+        stats_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        
+        ctk.CTkLabel(stats_frame, text="Workout Stats", font=ctk.CTkFont(size=20, weight="bold")).pack(pady=10)
+        
+        # Headline figures, two columns of name/value pairs
+        summary_frame = ctk.CTkFrame(stats_frame)
+        summary_frame.pack(fill="x", padx=10, pady=5)
+        self.stats_labels = {}
+        names = ["Sessions", "Total time", "Current streak", "Longest streak", "This week", "This month", "Work time", "Work : rest"]
+        for i, name in enumerate(names):
+            row, column = divmod(i, 2)
+            ctk.CTkLabel(summary_frame, text=f"{name}:", font=ctk.CTkFont(weight="bold")).grid(row=row, column=2 * column, sticky="w", padx=(15, 5), pady=4)
+            self.stats_labels[name] = ctk.CTkLabel(summary_frame, text="")
+            self.stats_labels[name].grid(row=row, column=2 * column + 1, sticky="w", padx=(0, 15), pady=4)
+            
+        ctk.CTkLabel(stats_frame, text="Last 8 Weeks", font=ctk.CTkFont(size=16, weight="bold")).pack(pady=(15, 5))
+        self.stats_weeks_label = ctk.CTkLabel(stats_frame, text="", font=ctk.CTkFont(family="Courier", size=13), justify="left")
+        self.stats_weeks_label.pack(padx=10, pady=5)
+        
+        ctk.CTkLabel(stats_frame, text="Top Exercises", font=ctk.CTkFont(size=16, weight="bold")).pack(pady=(15, 5))
+        self.stats_exercises_label = ctk.CTkLabel(stats_frame, text="", font=ctk.CTkFont(family="Courier", size=13), justify="left")
+        self.stats_exercises_label.pack(padx=10, pady=5)
+        
+        self.render_stats()
+        
+    def setup_stations_tab(self):
+        # Circuit mode: many stations on one scheduler thread
+        controls_frame = ctk.CTkFrame(self.stations_tab)
+        controls_frame.pack(fill="x", padx=10, pady=(10, 5))
+        
+        ctk.CTkLabel(controls_frame, text="Stations:").pack(side="left", padx=(10, 5), pady=10)
+        self.station_count_var = ctk.IntVar(value=20)
+        ctk.CTkEntry(controls_frame, textvariable=self.station_count_var, width=50).pack(side="left", padx=5, pady=10)
+        
+        ctk.CTkLabel(controls_frame, text="Stagger (s):").pack(side="left", padx=(10, 5), pady=10)
+        self.station_stagger_var = ctk.IntVar(value=0)
+        ctk.CTkEntry(controls_frame, textvariable=self.station_stagger_var, width=50).pack(side="left", padx=5, pady=10)
+        
+        self.station_rotate_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(controls_frame, text="Rotate saved workouts", variable=self.station_rotate_var).pack(side="left", padx=10, pady=10)
+        
+        self.stations_stop_btn = ctk.CTkButton(controls_frame, text="⏹️ Stop", width=80, command=self.stop_stations, state="disabled")
+        self.stations_stop_btn.pack(side="right", padx=5, pady=10)
+        self.stations_pause_btn = ctk.CTkButton(controls_frame, text="⏸️ Pause All", width=100, command=self.pause_resume_stations, state="disabled")
+        self.stations_pause_btn.pack(side="right", padx=5, pady=10)
+        ctk.CTkButton(
+            controls_frame,
+            text="🏃 Start",
+            width=80,
+            command=self.start_stations,
+            fg_color="#4CAF50",
+            hover_color="#45A049"
+        ).pack(side="right", padx=5, pady=10)
+        
+        # Cells get their own renderer so resetting the main timer never
+        # drops station updates
+        self.station_renderer = DisplayRenderer(self.root, max_fps=self.max_fps)
+        self.station_grid = StationGrid(self.stations_tab, self.station_renderer, on_click=self.toggle_station)
+        self.station_grid.pack(fill="both", expand=True, padx=10, pady=10)
+        
+    def station_programs(self, count):
+        # One (name, reps, sets) per station
+        if self.station_rotate_var.get():
+            workouts = self.load_saved_workouts_data()
+            if not workouts:
+                messagebox.showinfo("No Workouts", "No saved workouts found.")
+                return None
+            names = sorted(workouts)
+            programs = []
+            for i in range(count):
+                name = names[i % len(names)]
+                workout = workouts[name]
+                programs.append((name, workout.get("reps", []), workout.get("sets", 1), workout.get("program")))
+            return programs
+        if self.program is not None:
+            return [(None, [], self.sets_var.get(), self.program["program"]) for _ in range(count)]
+        reps = self.validate_reps()
+        if reps is None:
+            return None
+        if not reps:
+            messagebox.showwarning("No Reps", "Please add at least one rep.")
+            return None
+        return [(None, reps, self.sets_var.get(), None) for _ in range(count)]
         
-    def update_rep_numbers(self):
-        for i, child in enumerate(self.reps_frame.winfo_children()):
-            label = child.winfo_children()[0]
-            label.configure(text=f"Rep {i+1}:")
+    def start_stations(self):
+        try:
+            count = self.station_count_var.get()
+            stagger = self.station_stagger_var.get()
+        except (ValueError, tk.TclError):
+            count = stagger = -1
+        if count < 1 or stagger < 0:
+            messagebox.showwarning("Invalid Stations", "Please enter a station count of at least 1 and a stagger of 0 or more seconds.")
+            return
+        programs = self.station_programs(count)
+        if programs is None:
+            return
+            
+        self.stop_stations()
+        group = StationGroup(tick_interval=1.0)
+        try:
+            for i, (workout, reps, sets, program) in enumerate(programs):
+                name = f"Station {i + 1}" if workout is None else f"{i + 1}. {workout}"
+                group.add(name, reps, sets, offset=i * stagger, program=program)
+        except ProgramError as e:
+            messagebox.showerror("Invalid Program", str(e))
+            return
+        self.station_renderer.discard()
+        self.station_grid.set_stations(group)
+        group.subscribe(self.station_grid.on_event)
+        self.station_group = group
+        group.run_in_thread()
+        self.stations_pause_btn.configure(text="⏸️ Pause All", state="normal")
+        self.stations_stop_btn.configure(state="normal")
+        
+    def pause_resume_stations(self):
+        group = self.station_group
+        if group is None:
+            return
+        if self.stations_pause_btn.cget("text") == "⏸️ Pause All":
+            group.pause_all()
+            self.stations_pause_btn.configure(text="▶️ Resume All")
+        else:
+            group.resume_all()
+            self.stations_pause_btn.configure(text="⏸️ Pause All")
+            
+    def toggle_station(self, station):
+        group = self.station_group
+        if group is None or station not in group.stations:
+            return
+        if station.engine.is_paused or station.held_at is not None:
+            group.resume(station)
+        else:
+            group.pause(station)
+            
+    def stop_stations(self):
+        if self.station_group:
+            self.station_group.stop()
+            self.station_group = None
+        if "Stations" in self.tabs_built:
+            self.stations_pause_btn.configure(text="⏸️ Pause All", state="disabled")
+            self.stations_stop_btn.configure(state="disabled")
+            
+    def on_reps_edited(self, kind, index):
+        # Touching the rep list means the user wants reps, not the program
+        if self.program is not None:
+            self.set_program(None)
+            
+    def set_program(self, workout):
+        self.program = workout
+        if workout is None:
+            self.program_label.configure(text="")
+            return
+        self.program_label.configure(
+            text=f"Loaded '{workout['name']}': {workout_summary(workout)}, "
+                 f"{format_time(int(workout_total_duration(workout)))} per run. Add a rep to go back to a rep list.")
+                 
+    def add_rep(self):
+        # Alternate Work/Rest defaults like the first rows of a new workout
+        rep_num = len(self.rep_model) + 1
+        if rep_num % 2 == 1:
+            self.rep_model.append("Work", 30)
+        else:
+            self.rep_model.append("Rest", 10)
             
     def get_reps_data(self):
-        reps = []
-        for child in self.reps_frame.winfo_children():
-            widgets = child.winfo_children()
-            if len(widgets) >= 3:
-                name = widgets[1].get().strip()
-                try:
-                    duration = int(widgets[2].get())
-                    if name and duration > 0:
-                        reps.append({"name": name, "duration": duration})
-                except ValueError:
-                    continue
+        return self.rep_model.to_reps()
+        
+    def validate_reps(self):
+        # Returns the reps, or None after telling the user what is wrong
+        reps, errors = self.rep_model.validate()
+        if errors:
+            lines = [f"Rep {index + 1}: {message}" for index, message in errors[:10]]
+            if len(errors) > 10:
+                lines.append(f"...and {len(errors) - 10} more")
+            messagebox.showwarning("Invalid Reps", "Please fix these reps:\n\n" + "\n".join(lines))
+            return None
         return reps
         
     def quick_tabata(self):
-        # Clear existing reps
-        for child in self.reps_frame.winfo_children():
-            child.destroy()
-            
-        # Set 8 rounds
+        # Set 8 rounds of 20s work / 10s rest
         self.sets_var.set(8)
-        
-        # Add work and rest reps
-        for i in range(2):
-            self.add_rep()
-            
-        # Set tabata values
-        children = self.reps_frame.winfo_children()
-        children[0].winfo_children()[1].delete(0, 'end')
-        children[0].winfo_children()[1].insert(0, "Work")
-        children[0].winfo_children()[2].delete(0, 'end')
-        children[0].winfo_children()[2].insert(0, "20")
-        
-        children[1].winfo_children()[1].delete(0, 'end')
-        children[1].winfo_children()[1].insert(0, "Rest")
-        children[1].winfo_children()[2].delete(0, 'end')
-        children[1].winfo_children()[2].insert(0, "10")
+        self.rep_model.replace_all([
+            {"name": "Work", "duration": 20},
+            {"name": "Rest", "duration": 10}
+        ])
         
         # Start workout immediately
         self.start_workout()
         
     def preview_workout(self):
-        reps = self.get_reps_data()
+        if self.program is not None:
+            self.preview_program()
+            return
+        reps = self.validate_reps()
         sets = self.sets_var.get()
         
+        if reps is None:
+            return
         if not reps:
             messagebox.showwarning("No Reps", "Please add at least one rep.")
             return
@@ -303,7 +593,7 @@ class HIITTimer:
         
         preview_text = f"Workout Preview:\n\n"
         preview_text += f"Sets: {sets}\n"
-        preview_text += f"Total Time: {self.format_time(total_time)}\n\n"
+        preview_text += f"Total Time: {format_time(total_time)}\n\n"
         preview_text += "Reps per set:\n"
         
         for i, rep in enumerate(reps, 1):
@@ -311,113 +601,216 @@ class HIITTimer:
             
         messagebox.showinfo("Workout Preview", preview_text)
         
-    def start_workout(self):
-        reps = self.get_reps_data()
-        sets = self.sets_var.get()
-        
-        if not reps:
-            messagebox.showwarning("No Reps", "Please add at least one rep.")
+    def preview_program(self, limit=20):
+        # Totals are closed form; only the first intervals are generated
+        try:
+            timeline = ProgramTimeline(self.program["program"], self.sets_var.get())
+        except ProgramError as e:
+            messagebox.showerror("Invalid Program", str(e))
             return
-            
+        lines = [
+            f"Program: {self.program['name']}",
+            f"Intervals: {len(timeline)}",
+            f"Total Time: {format_time(int(timeline.total))}",
+            "",
+        ]
+        for segment in timeline:
+            if segment.index >= limit:
+                lines.append(f"...and {len(timeline) - limit} more")
+                break
+            lines.append(f"{segment.index + 1}. {segment.name} - {segment.duration:g}s")
+        messagebox.showinfo("Workout Preview", "\n".join(lines))
+        
+    def start_workout(self, resume=None):
+        sets = self.sets_var.get()
+        timeline = None
+        if self.program is not None:
+            reps = []
+            try:
+                timeline = ProgramTimeline(self.program["program"], sets)
+            except ProgramError as e:
+                messagebox.showerror("Invalid Program", str(e))
+                return
+        else:
+            reps = self.validate_reps()
+            if reps is None:
+                return
+            if not reps:
+                messagebox.showwarning("No Reps", "Please add at least one rep.")
+                return
+                
+        self.workout_program = self.program["program"] if timeline is not None else None
         self.reps = reps
         self.sets = sets
         self.current_set = 0
         self.current_rep = 0
         self.total_elapsed = 0
+        self.workout_elapsed = 0.0
         self.start_time = time.time()
         
         # Switch to timer tab
+        self.ensure_tab("Timer")
         self.notebook.set("Timer")
         
         # Start the timer
         self.is_running = True
         self.is_paused = False
         self.pause_btn.configure(state="normal")
-        
-        self.start_current_rep()
-        
-    def start_current_rep(self):
-        if self.current_set >= self.sets:
-            self.workout_complete()
+        self.back_btn.configure(state="normal")
+        self.skip_btn.configure(state="normal")
+        
+        if self.engine:
+            self.engine.stop()
+        engine = WorkoutEngine(reps, sets, tick_interval=self.tick_interval, timeline=timeline)
+        engine.subscribe(lambda event: self.on_engine_event(engine, event))
+        self.telemetry = engine.subscribe(TelemetryRecorder())
+        self.track_segment_stats(engine)
+        if self.broadcast:
+            # Published from the engine thread; never waits on clients
+            engine.subscribe(EngineBroadcaster(self.broadcast, engine))
+        name = self.program.get("name") if timeline is not None else None
+        try:
+            engine.subscribe(self.checkpoint.begin(session_workout(reps, sets, self.workout_program, name)))
+        except OSError as e:
+            # Timing matters more than being able to resume
+            print(f"Checkpoints disabled: {e}", file=sys.stderr)
+        self.engine = engine
+        
+        elapsed = 0.0
+        if resume is not None:
+            elapsed = resume.elapsed
+            if resume.paused:
+                # Started here so it can be paused before the thread runs it
+                engine.start(elapsed)
+                engine.pause()
+        self.timer_thread = engine.run_in_thread(elapsed)
+        
+    def offer_resume(self):
+        saved = self.checkpoint.load()
+        if saved is None:
+            return
+        workout = saved.workout
+        minutes = max(0, int((time.time() - saved.saved_at) / 60))
+        title = f"'{workout['name']}'" if workout.get("name") else "a workout"
+        if not messagebox.askyesno(
+            "Resume Workout",
+            f"The app closed {minutes} min ago in the middle of {title}, "
+            f"{format_time(int(saved.elapsed))} in. Resume where you left off?"
+        ):
+            self.checkpoint.clear()
             return
             
-        if self.current_rep >= len(self.reps):
-            self.current_set += 1
-            self.current_rep = 0
-            if self.current_set >= self.sets:
-                self.workout_complete()
+        self.sets_var.set(workout.get("sets", 1))
+        if "program" in workout:
+            try:
+                ProgramTimeline(workout["program"], workout.get("sets", 1))
+            except ProgramError as e:
+                messagebox.showerror("Invalid Program", f"The interrupted workout can't be resumed: {e}")
+                self.checkpoint.clear()
                 return
-                
-        current = self.reps[self.current_rep]
-        self.time_remaining = current["duration"]
+            self.rep_model.clear()
+            self.set_program(dict(workout, name=workout.get("name", "Resumed program")))
+        else:
+            self.rep_model.replace_all(workout["reps"])
+        self.start_workout(resume=saved)
+        
+    def on_engine_event(self, engine, event):
+        # Called on the engine thread. Ticks go straight to the renderer,
+        # which coalesces them; everything else is handed over to Tk.
+        if event.kind == hiit_engine.TICK:
+            if engine is self.engine:
+                self.time_remaining = event.remaining_seconds
+                self.update_display(engine, event)
+            return
+        self.root.after(0, self.handle_engine_event, engine, event)
+        
+    def handle_engine_event(self, engine, event):
+        # Ignore stragglers from a workout that has since been reset
+        if engine is not self.engine:
+            return
+            
+        self.current_set = event.set_index
+        self.current_rep = event.rep_index
+        self.total_elapsed = int(event.elapsed)
+        self.workout_elapsed = event.elapsed
+        
+        if event.kind == hiit_engine.SEGMENT_START:
+            self.start_current_rep(event)
+        elif event.kind in (hiit_engine.PAUSE, hiit_engine.RESUME):
+            self.is_paused = event.kind == hiit_engine.PAUSE
+            self.pause_btn.configure(text="▶️ Resume" if self.is_paused else "⏸️ Pause")
+        elif event.kind == hiit_engine.COMPLETE_EVENT:
+            # History records the time actually trained, not the plan
+            self.total_elapsed = round(engine.active_time())
+            self.workout_complete()
+            
+    def start_current_rep(self, event):
+        self.time_remaining = event.remaining_seconds
         
         # Update display
-        self.current_rep_label.configure(text=current["name"])
-        self.set_rep_label.configure(text=f"Set {self.current_set + 1} of {self.sets} — {current['name']}")
+        self.current_rep_label.configure(text=event.name)
+        self.set_rep_label.configure(text=f"Set {event.set_index + 1} of {self.sets} — {event.name}")
         
         # Change color based on exercise type
-        if "rest" in current["name"].lower():
+        if "rest" in event.name.lower():
             self.current_rep_label.configure(text_color="#4FC3F7")
         else:
             self.current_rep_label.configure(text_color="#FF5722")
             
         # Play beep
         self.play_beep()
+        self.update_display(self.engine, event)
         
-        # Start timer thread
-        if self.timer_thread and self.timer_thread.is_alive():
-            return
+    def update_display(self, engine, event):
+        with hiit_metrics.timer("update_display_seconds"):
+            self.submit_display(engine, event)
             
-        self.timer_thread = threading.Thread(target=self.run_timer)
-        self.timer_thread.daemon = True
-        self.timer_thread.start()
-        
-    def run_timer(self):
-        while self.is_running and self.time_remaining > 0:
-            if not self.is_paused:
-                self.root.after(0, self.update_display)
-                time.sleep(1)
-                self.time_remaining -= 1
-                self.total_elapsed += 1
-            else:
-                time.sleep(0.1)
-                
-        if self.is_running and self.time_remaining <= 0:
-            self.current_rep += 1
-            self.root.after(0, self.start_current_rep)
+    def submit_display(self, engine, event):
+        # Only builds the new display state; the renderer skips widgets whose
+        # value hasn't changed and caps the redraw rate
+        if event.duration:
+            progress = round(1 - event.remaining / event.duration, 3)
+        else:
+            progress = 1.0
             
-    def update_display(self):
-        # Update time display
-        self.time_display.configure(text=self.format_time_mm_ss(self.time_remaining))
-        
-        # Update progress bar
-        if self.reps and self.current_rep < len(self.reps):
-            current_duration = self.reps[self.current_rep]["duration"]
-            progress = 1 - (self.time_remaining / current_duration)
-            self.progress_bar.set(progress)
+        # The compiled timeline answers this in O(1)
+        remaining_workout_time = math.ceil(engine.timeline.remaining(event.elapsed))
+        
+        self.renderer.submit({
+            "time": self.format_time_mm_ss(event.remaining_seconds),
+            "progress": progress,
+            "elapsed": f"Elapsed: {format_time(int(event.elapsed))}",
+            "remaining": f"Remaining: {format_time(remaining_workout_time)}"
+        })
+        
+    def skip_segment(self):
+        if self.engine:
+            self.engine.skip()
+            
+    def back_segment(self):
+        if self.engine:
+            self.engine.back()
             
-        # Update elapsed and remaining time
-        self.elapsed_label.configure(text=f"Elapsed: {self.format_time(self.total_elapsed)}")
-        
-        total_workout_time = sum(rep["duration"] for rep in self.reps) * self.sets
-        remaining_workout_time = total_workout_time - self.total_elapsed
-        self.remaining_label.configure(text=f"Remaining: {self.format_time(remaining_workout_time)}")
-        
     def pause_resume_timer(self):
-        self.is_paused = not self.is_paused
-        if self.is_paused:
-            self.pause_btn.configure(text="▶️ Resume")
-        else:
-            self.pause_btn.configure(text="⏸️ Pause")
+        if self.engine:
+            self.engine.toggle_pause()
             
     def reset_timer(self):
         self.is_running = False
+        if self.engine:
+            self.engine.stop()
+            self.engine = None
+        self.track_segment_stats(None)
         self.is_paused = False
         self.current_set = 0
         self.current_rep = 0
         self.time_remaining = 0
         self.total_elapsed = 0
-        
+        self.workout_elapsed = 0.0
+        self.renderer.discard()
+        if "Timer" not in self.tabs_built:
+            return
+            
         self.current_rep_label.configure(text="Ready to Start", text_color="white")
         self.time_display.configure(text="00:00")
         self.set_rep_label.configure(text="")
@@ -425,12 +818,17 @@ class HIITTimer:
         self.remaining_label.configure(text="Remaining: 00:00:00")
         self.progress_bar.set(0)
         self.pause_btn.configure(text="⏸️ Pause", state="disabled")
+        self.back_btn.configure(state="disabled")
+        self.skip_btn.configure(state="disabled")
         
     def workout_complete(self):
         self.is_running = False
+        self.renderer.discard()
         self.current_rep_label.configure(text="🎉 Workout Complete!", text_color="#4CAF50")
         self.time_display.configure(text="DONE")
         self.pause_btn.configure(state="disabled")
+        self.back_btn.configure(state="disabled")
+        self.skip_btn.configure(state="disabled")
         
         # Save to history
         workout_data = {
@@ -439,46 +837,44 @@ class HIITTimer:
             "reps": self.reps,
             "total_time": self.total_elapsed
         }
-        self.workout_history.append(workout_data)
-        self.save_history()
-        self.load_history()
+        if self.workout_program is not None:
+            workout_data["program"] = self.workout_program
+        if self.telemetry is not None and self.telemetry.events:
+            workout_data["telemetry"] = self.telemetry_log.append(self.telemetry.encode())
+        heart_rate = self.track_segment_stats(None)
+        if heart_rate is not None:
+            workout_data["heart_rate"] = heart_rate
+        self.save_history(workout_data)
+        self.render_history()
+        self.render_stats()
         
         # Play completion sound
-        for _ in range(3):
-            self.play_beep()
-            time.sleep(0.2)
-            
-        messagebox.showinfo("Workout Complete", f"Great job! You completed your workout in {self.format_time(self.total_elapsed)}!")
+        self.play_beep("complete")
+        
+        messagebox.showinfo("Workout Complete", f"Great job! You completed your workout in {format_time(self.total_elapsed)}!")
+        
+    def play_beep(self, cue="beep"):
+        # Returns immediately; the audio worker does the playing
+        self.audio.play(cue)
         
-    def play_beep(self):
-        try:
-            winsound.Beep(800, 300)
-        except:
-            # Fallback for systems without winsound
-            print('\a')
-            
-    def format_time(self, seconds):
-        hours = seconds // 3600
-        minutes = (seconds % 3600) // 60
-        secs = seconds % 60
-        if hours > 0:
-            return f"{hours:02d}:{minutes:02d}:{secs:02d}"
-        else:
-            return f"{minutes:02d}:{secs:02d}"
-            
     def format_time_mm_ss(self, seconds):
         minutes = seconds // 60
         secs = seconds % 60
         return f"{minutes:02d}:{secs:02d}"
         
     def save_workout(self):
-        reps = self.get_reps_data()
         sets = self.sets_var.get()
-        
-        if not reps:
-            messagebox.showwarning("No Reps", "Please add at least one rep.")
-            return
-            
+        if self.program is not None:
+            # Saved under a new name as a copy of the loaded program
+            reps = None
+        else:
+            reps = self.validate_reps()
+            if reps is None:
+                return
+            if not reps:
+                messagebox.showwarning("No Reps", "Please add at least one rep.")
+                return
+                
         name = ctk.CTkInputDialog(text="Enter workout name:", title="Save Workout").get_input()
         if not name:
             return
@@ -486,16 +882,23 @@ class HIITTimer:
         workout_data = {
             "name": name,
             "sets": sets,
-            "reps": reps,
             "created": datetime.now().isoformat()
         }
-        
-        saved_workouts = self.load_saved_workouts_data()
-        saved_workouts[name] = workout_data
-        
-        with open(self.workouts_file, 'w') as f:
-            json.dump(saved_workouts, f, indent=2)
+        if reps is None:
+            workout_data["program"] = self.program["program"]
+        else:
+            workout_data["reps"] = reps
             
+        # Appends to the library's operation log; no full rewrite
+        self.workout_store.load()
+        with self.search_index_lock:
+            in_sync = self.search_index.version == self.workout_store.version
+            self.workout_store.put(workout_data)
+            if in_sync:
+                # Keep the search index current without a rebuild
+                self.search_index.add(name, workout_data)
+                self.search_index.version = self.workout_store.version
+                
         messagebox.showinfo("Success", f"Workout '{name}' saved successfully!")
         
     def load_workout(self):
@@ -504,123 +907,471 @@ class HIITTimer:
             messagebox.showinfo("No Workouts", "No saved workouts found.")
             return
             
+        index = self.workout_search_index()
+        if index is None:
+            messagebox.showinfo("Loading", "Saved workouts are still being indexed, please try again in a moment.")
+            return
+            
         # Create selection dialog
         dialog = ctk.CTkToplevel(self.root)
         dialog.title("Load Workout")
-        dialog.geometry("400x300")
+        dialog.geometry("400x400")
         dialog.transient(self.root)
         dialog.grab_set()
         
         ctk.CTkLabel(dialog, text="Select a workout to load:", font=ctk.CTkFont(size=16, weight="bold")).pack(pady=10)
         
+        search_entry = ctk.CTkEntry(dialog, placeholder_text="Search workouts or exercises")
+        search_entry.pack(fill="x", padx=20)
+        
+        count_label = ctk.CTkLabel(dialog, text="")
+        count_label.pack(pady=(5, 0))
+        
         # Workout list
         workout_frame = ctk.CTkScrollableFrame(dialog, height=200)
         workout_frame.pack(fill="both", expand=True, padx=20, pady=10)
         
         selected_workout = None
-        
-        def select_workout(workout_name):
+        # Result buttons are reused between keystrokes; only as many as
+        # are shown ever exist
+        buttons = []
+        shown = []
+        packed = 0
+        limit = self.search_page_size
+        search_pending = False
+        
+        def select_workout(slot):
             nonlocal selected_workout
-            selected_workout = workout_name
-            dialog.destroy()
+            if slot < len(shown):
+                selected_workout = shown[slot]
+                dialog.destroy()
+                
+        def render_results():
+            nonlocal search_pending, packed
+            search_pending = False
+            # One extra result tells us whether "Show more" is needed
+            names = index.search(search_entry.get(), limit + 1)
+            more = len(names) > limit
+            shown[:] = names[:limit]
+            while len(buttons) < len(shown):
+                slot = len(buttons)
+                buttons.append(ctk.CTkButton(workout_frame, command=lambda s=slot: select_workout(s)))
+            for slot, name in enumerate(shown):
+                data = saved_workouts[name]
+                buttons[slot].configure(text=f"{name} ({workout_summary(data)})")
+            # Only the change in result count touches the geometry manager
+            for slot in range(len(shown), packed):
+                buttons[slot].pack_forget()
+            more_btn.pack_forget()
+            for slot in range(packed, len(shown)):
+                buttons[slot].pack(fill="x", pady=2)
+            packed = len(shown)
+            if more:
+                more_btn.pack(fill="x", pady=2)
+            count_label.configure(text=f"Showing {len(shown)} of {len(saved_workouts)} workouts")
             
-        for name, data in saved_workouts.items():
-            workout_btn = ctk.CTkButton(
-                workout_frame, 
-                text=f"{name} ({data['sets']} sets, {len(data['reps'])} reps)",
-                command=lambda n=name: select_workout(n)
-            )
-            workout_btn.pack(fill="x", pady=2)
+        def on_search(event=None):
+            # Coalesce fast typing into one search per idle pass
+            nonlocal search_pending, limit
+            limit = self.search_page_size
+            if not search_pending:
+                search_pending = True
+                dialog.after_idle(render_results)
+                
+        def show_more():
+            nonlocal limit
+            limit += self.search_page_size
+            render_results()
             
+        more_btn = ctk.CTkButton(workout_frame, text="Show more", fg_color="gray", command=show_more)
+        search_entry.bind("<KeyRelease>", on_search)
+        search_entry.bind("<Return>", lambda event: select_workout(0))
+        render_results()
+        search_entry.focus_set()
+        
         dialog.wait_window()
         
         if selected_workout:
             workout_data = saved_workouts[selected_workout]
             
-            # Clear existing reps
-            for child in self.reps_frame.winfo_children():
-                child.destroy()
-                
-            # Load workout data
-            self.sets_var.set(workout_data["sets"])
-            
-            # Add reps
-            for rep_data in workout_data["reps"]:
-                self.add_rep()
-                children = self.reps_frame.winfo_children()
-                last_child = children[-1].winfo_children()
-                last_child[1].delete(0, 'end')
-                last_child[1].insert(0, rep_data["name"])
-                last_child[2].delete(0, 'end')
-                last_child[2].insert(0, str(rep_data["duration"]))
+            # Load workout data; the editor builds rows in the background
+            self.sets_var.set(workout_data.get("sets", 1))
+            if "program" in workout_data:
+                try:
+                    ProgramTimeline(workout_data["program"], workout_data.get("sets", 1))
+                except ProgramError as e:
+                    messagebox.showerror("Invalid Program", f"Workout '{selected_workout}' has an invalid program: {e}")
+                    return
+                self.rep_model.clear()
+                self.set_program(workout_data)
+            else:
+                self.rep_model.replace_all(workout_data["reps"])
                 
             messagebox.showinfo("Success", f"Workout '{selected_workout}' loaded successfully!")
             
+    def open_profile_switcher(self):
+        dialog = ctk.CTkToplevel(self.root)
+        dialog.title("Switch Profile")
+        dialog.geometry("400x400")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        ctk.CTkLabel(dialog, text="Who's training?", font=ctk.CTkFont(size=16, weight="bold")).pack(pady=10)
+        
+        search_entry = ctk.CTkEntry(dialog, placeholder_text="Search members")
+        search_entry.pack(fill="x", padx=20)
+        
+        count_label = ctk.CTkLabel(dialog, text="")
+        count_label.pack(pady=(5, 0))
+        
+        profile_frame = ctk.CTkScrollableFrame(dialog, height=200)
+        profile_frame.pack(fill="both", expand=True, padx=20, pady=10)
+        
+        chosen = None
+        # As in the Load dialog, result buttons are reused between keystrokes
+        buttons = []
+        shown = []
+        packed = 0
+        search_pending = False
+        
+        def choose(slot):
+            nonlocal chosen
+            if slot < len(shown):
+                chosen = shown[slot]
+                dialog.destroy()
+                
+        def new_profile():
+            nonlocal chosen
+            name = ctk.CTkInputDialog(text="Member name:", title="New Profile").get_input()
+            if not name:
+                return
+            try:
+                chosen = self.profiles.create(name)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("New Profile", str(e))
+                return
+            dialog.destroy()
+            
+        def render_results():
+            nonlocal search_pending, packed
+            search_pending = False
+            # The profile index is only read here, the first time
+            shown[:] = self.profiles.search(search_entry.get(), self.search_page_size)
+            while len(buttons) < len(shown):
+                slot = len(buttons)
+                buttons.append(ctk.CTkButton(profile_frame, command=lambda s=slot: choose(s)))
+            for slot, profile in enumerate(shown):
+                active = "  (active)" if profile.id == self.profile.id else ""
+                buttons[slot].configure(text=profile.name + active)
+            for slot in range(len(shown), packed):
+                buttons[slot].pack_forget()
+            for slot in range(packed, len(shown)):
+                buttons[slot].pack(fill="x", pady=2)
+            packed = len(shown)
+            count_label.configure(text=f"Showing {len(shown)} of {len(self.profiles) + 1} profiles")
+            
+        def on_search(event=None):
+            nonlocal search_pending
+            if not search_pending:
+                search_pending = True
+                dialog.after_idle(render_results)
+                
+        ctk.CTkButton(dialog, text="➕ New Profile", command=new_profile).pack(pady=(0, 10))
+        search_entry.bind("<KeyRelease>", on_search)
+        search_entry.bind("<Return>", lambda event: choose(0))
+        render_results()
+        search_entry.focus_set()
+        
+        dialog.wait_window()
+        
+        if chosen is not None:
+            self.switch_profile(chosen)
+            
+    def switch_profile(self, profile):
+        if profile.id == self.profile.id:
+            return
+        if self.engine and self.engine.is_running:
+            messagebox.showwarning("Workout Running", "Finish or reset the workout before switching profiles.")
+            return
+        if self.exporter and self.exporter.is_running:
+            messagebox.showwarning("Export Running", "Wait for the export to finish before switching profiles.")
+            return
+            
+        # Everything of the current member is saved to their own profile
+        self.save_settings()
+        self.checkpoint.close()
+        self.history_store.close()
+        self.profiles.activate(profile)
+        self.profile = profile
+        self.open_profile()
+        # Nothing of the previous member's settings may carry over
+        self.reset_settings()
+        self.load_settings()
+        self.apply_settings()
+        self.profile_btn.configure(text=f"👤 {profile.name}")
+        
+        self.history_range = (None, None)
+        if "History" in self.tabs_built:
+            self.history_from_entry.delete(0, 'end')
+            self.history_to_entry.delete(0, 'end')
+            self.history_frame.set_rows(0, lambda i: "")
+            self.history_count_label.configure(text="Loading history...")
+        self.render_stats()
+        
+        # Only the new profile's history is read, off the Tk thread
+        loader = threading.Thread(target=self.load_history_data, args=(self.history_store,))
+        loader.daemon = True
+        loader.start()
+        self.offer_resume()
+        
     def load_saved_workouts_data(self):
+        # Cached; only re-read when the library files change on disk
+        return self.workout_store.load()
+        
+    def workout_search_index(self):
+        """Return the search index if it covers the library, else None.
+        
+        Indexing a large library takes seconds, so it never runs on the Tk
+        thread: a stale index is rebuilt in the background, and a small
+        library is usually done within the short wait here.
+        """
+        if self.search_index.version != self.workout_store.version:
+            self.start_search_index_build()
+            self.search_index_idle.wait(0.25)
+        with self.search_index_lock:
+            if self.search_index.version == self.workout_store.version:
+                return self.search_index
+        return None
+        
+    def start_search_index_build(self):
+        if not self.search_index_idle.is_set():
+            # Already building; that build catches up with the library
+            return
+        self.search_index_idle.clear()
+        thread = threading.Thread(target=self.build_search_index)
+        thread.daemon = True
+        thread.start()
+        
+    def build_search_index(self):
+        # Off the Tk thread. Repeats if a workout was saved while indexing,
+        # so the index that gets swapped in always matches the library
         try:
-            with open(self.workouts_file, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+            while True:
+                workouts = dict(self.workout_store.load())
+                version = self.workout_store.version
+                index = WorkoutSearchIndex()
+                index.build(workouts, version)
+                with self.search_index_lock:
+                    if version == self.workout_store.version:
+                        self.search_index = index
+                        return
+        except Exception:
+            # The Load dialog reads the library again and reports problems
+            pass
+        finally:
+            self.search_index_idle.set()
             
-    def load_saved_workouts(self):
-        # This method can be used to populate a dropdown or list if needed
-        pass
+    def load_data(self):
+        # Runs on the loader thread; results are handed to Tk with after()
+        self.load_history_data(self.history_store)
+        try:
+            # Warm the library cache so the Load dialog opens instantly
+            self.workout_store.load()
+            self.record_startup("library_loaded")
+        except Exception:
+            # The Load dialog reads the library again and reports problems
+            pass
+        self.build_search_index()
         
-    def load_history(self):
-        # Clear existing history
-        for child in self.history_frame.winfo_children():
-            child.destroy()
-            
+    def load_history_data(self, store):
         try:
-            with open(self.history_file, 'r') as f:
-                self.workout_history = json.load(f)
-        except FileNotFoundError:
-            self.workout_history = []
+            store.open()
+            # Indexed here so the History tab never reads the extra file on Tk
+            store.load_extras()
+            # Stats cover the rows mapped now; later ones are added on Tk
+            count = len(store)
+            stats = HistoryStats()
+            stats.build_store(store)
+        except Exception as e:
+            self.root.after(0, self.history_load_failed, store, e)
+        else:
+            self.root.after(0, self.load_history, store, count, stats)
             
-        if not self.workout_history:
-            ctk.CTkLabel(self.history_frame, text="No workout history yet.").pack(pady=20)
+    def load_history(self, store, count, stats):
+        if store is not self.history_store:
+            # Loaded for a profile that has since been switched away from
+            return
+        # Workouts finished while loading are in the store, but only those
+        # appended after the stats were built still need counting
+        for row, entry in self.pending_history:
+            if row >= count:
+                stats.add(entry)
+        self.pending_history = []
+        self.history_stats = stats
+        self.history_loaded = True
+        self.record_startup("history_loaded", entries=len(self.history_store))
+        self.render_history()
+        self.render_stats()
+        
+    def history_load_failed(self, store, error):
+        if store is not self.history_store:
             return
+        self.history_loaded = True
+        self.render_history()
+        self.render_stats()
+        messagebox.showerror("History Error", f"Could not load workout history: {error}")
+        
+    def first_frame(self):
+        # Idle callbacks run once pending redraws are done: the window is up
+        self.root.update_idletasks()
+        self.record_startup("first_frame")
+        self.offer_resume()
+        
+    def record_startup(self, name, **extra):
+        self.startup_metrics[name] = round(time.perf_counter() - self.launch_time, 4)
+        self.startup_metrics.update((f"{name}_{key}", value) for key, value in extra.items())
+        if os.environ.get("HIIT_STARTUP_LOG"):
+            print(f"startup: {name} at {self.startup_metrics[name]:.3f}s", extra or "", file=sys.stderr)
             
-        for i, workout in enumerate(reversed(self.workout_history[-10:])):  # Show last 10
+    def render_history(self):
+        if "History" not in self.tabs_built or not self.history_loaded:
+            return
+        store = self.history_store
+        lo, hi = store.select(*self.history_range)
+        count = hi - lo
+        
+        def row_text(i):
+            # Newest first
+            workout = store[store.row_at(hi - 1 - i)]
             date = datetime.fromisoformat(workout["date"]).strftime("%Y-%m-%d %H:%M")
+            return f"{date} - {workout_summary(workout)}, {format_time(workout['total_time'])}"
             
-            history_frame = ctk.CTkFrame(self.history_frame)
-            history_frame.pack(fill="x", padx=5, pady=2)
+        self.history_frame.set_rows(count, row_text)
+        self.history_count_label.configure(text=f"{count} of {len(store)} sessions")
+        
+    def render_stats(self):
+        if "Stats" not in self.tabs_built:
+            return
+        if not self.history_loaded:
+            self.stats_labels["Sessions"].configure(text="Loading history...")
+            return
+        stats = self.history_stats
+        summary = stats.summary()
+        
+        def sessions_and_time(totals):
+            sessions, seconds = totals
+            return f"{sessions} sessions, {format_time(int(seconds))}"
             
-            info_text = f"{date} - {workout['sets']} sets, {len(workout['reps'])} reps, {self.format_time(workout['total_time'])}"
-            ctk.CTkLabel(history_frame, text=info_text, anchor="w").pack(fill="x", padx=10, pady=5)
+        ratio = summary["work_rest_ratio"]
+        values = {
+            "Sessions": str(summary["sessions"]),
+            "Total time": format_time(int(summary["total_time"])),
+            "Current streak": f"{summary['current_streak']} days",
+            "Longest streak": f"{summary['longest_streak']} days",
+            "This week": sessions_and_time(summary["this_week"]),
+            "This month": sessions_and_time(summary["this_month"]),
+            "Work time": format_time(int(summary["work_time"])),
+            "Work : rest": "-" if ratio is None else f"{ratio:.2f} : 1",
+        }
+        for name, text in values.items():
+            self.stats_labels[name].configure(text=text)
             
-    def save_history(self):
-        with open(self.history_file, 'w') as f:
-            json.dump(self.workout_history, f, indent=2)
+        # Text bars scaled to the busiest week
+        weeks = stats.recent_weeks(8)
+        busiest = max(seconds for _, _, seconds in weeks) or 1
+        lines = []
+        for monday, sessions, seconds in weeks:
+            bar = "█" * round(30 * seconds / busiest)
+            lines.append(f"{monday:%b %d}  {bar:<30}  {sessions:>2} × {format_time(int(seconds))}")
+        self.stats_weeks_label.configure(text="\n".join(lines))
+        
+        exercises = stats.top_exercises(10)
+        lines = [f"{name[:24]:<24}  {format_time(int(seconds)):>8}" for name, seconds in exercises]
+        self.stats_exercises_label.configure(text="\n".join(lines) or "No workouts yet")
+        
+    def filter_history(self):
+        try:
+            start = self.parse_filter_date(self.history_from_entry.get())
+            end = self.parse_filter_date(self.history_to_entry.get())
+        except ValueError:
+            messagebox.showwarning("Invalid Date", "Please enter dates as YYYY-MM-DD.")
+            return
             
+        # The "To" day is included in the range
+        if end is not None:
+            end += timedelta(days=1)
+        self.history_range = (start, end)
+        self.history_frame.scroll_to(0)
+        self.render_history()
+        
+    def clear_history_filter(self):
+        self.history_from_entry.delete(0, 'end')
+        self.history_to_entry.delete(0, 'end')
+        self.history_range = (None, None)
+        self.render_history()
+        
+    def parse_filter_date(self, text):
+        text = text.strip()
+        if not text:
+            return None
+        return datetime.strptime(text, "%Y-%m-%d")
+        
+    def save_history(self, workout_data):
+        # One 32-byte record per workout, however long the history is,
+        # written, fsync'd and timed by the persistence worker
+        row = self.history_store.append(workout_data)
+        if not self.history_loaded:
+            self.pending_history.append((row, workout_data))
+            return
+        # Aggregates are updated in place, never recomputed from the history
+        self.history_stats.add(workout_data)
+        
     def export_history(self):
-        if not self.workout_history:
+        # While an export runs the button cancels it
+        if self.exporter and self.exporter.is_running:
+            self.exporter.cancel()
+            return
+            
+        if not self.history_loaded:
+            messagebox.showinfo("Loading", "Workout history is still loading, please try again in a moment.")
+            return
+        if not len(self.history_store):
             messagebox.showinfo("No History", "No workout history to export.")
             return
             
         filename = filedialog.asksaveasfilename(
             defaultextension=".txt",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+            filetypes=[
+                ("Text files", "*.txt"),
+                ("CSV files", "*.csv"),
+                ("JSON Lines files", "*.jsonl"),
+                ("All files", "*.*")
+            ]
         )
         
         if filename:
-            with open(filename, 'w') as f:
-                f.write("HIIT Me Up - Workout History\n")
-                f.write("=" * 40 + "\n\n")
-                
-                for workout in self.workout_history:
-                    date = datetime.fromisoformat(workout["date"]).strftime("%Y-%m-%d %H:%M:%S")
-                    f.write(f"Date: {date}\n")
-                    f.write(f"Sets: {workout['sets']}\n")
-                    f.write(f"Total Time: {self.format_time(workout['total_time'])}\n")
-                    f.write("Reps:\n")
-                    for rep in workout["reps"]:
-                        f.write(f"  - {rep['name']}: {rep['duration']}s\n")
-                    f.write("\n" + "-" * 40 + "\n\n")
-                    
+            # rows() is a snapshot, so new workouts don't change it mid-export
+            count = len(self.history_store)
+            self.exporter = HistoryExporter(
+                self.history_store.rows(0, count),
+                filename,
+                total=count,
+                on_progress=lambda written, total: self.root.after(0, self.export_progress, written, total),
+                on_done=lambda status, written, error: self.root.after(0, self.export_done, filename, status, error)
+            )
+            self.export_btn.configure(text="Cancel Export")
+            self.exporter.start()
+            
+    def export_progress(self, written, total):
+        self.export_status_label.configure(text=f"Exported {written} of {total}")
+        
+    def export_done(self, filename, status, error):
+        self.export_btn.configure(text="Export History")
+        self.export_status_label.configure(text="")
+        if status == hiit_export.DONE:
             messagebox.showinfo("Success", f"History exported to {filename}")
+        elif status == hiit_export.FAILED:
+            messagebox.showerror("Export Failed", f"Could not export history: {error}")
             
     def toggle_dark_mode(self):
         self.dark_mode = self.dark_mode_var.get()
@@ -628,29 +1379,130 @@ class HIITTimer:
         ctk.set_appearance_mode(mode)
         self.save_settings()
         
+    def reset_settings(self):
+        # Built-in defaults, for a member without a settings file
+        self.dark_mode = True
+        self.tick_hz = 10
+        self.max_fps = 30
+        # "host:port" to mirror the timer to remote displays, e.g. ":8765"
+        self.broadcast_address = None
+        # Heart-rate source, e.g. "sim" or "file:hr.csv" (see hiit_sensors)
+        self.sensor_spec = None
+        
+    def apply_settings(self):
+        # After a profile switch: make what is running match the settings
+        self.tick_interval = 1.0 / self.tick_hz
+        self.dark_mode_var.set(self.dark_mode)
+        self.renderer.set_max_fps(self.max_fps)
+        if "Stations" in self.tabs_built:
+            self.station_renderer.set_max_fps(self.max_fps)
+        if self.broadcast:
+            self.broadcast.stop()
+            self.broadcast = None
+        self.start_broadcast()
+        if self.sensor:
+            self.sensor.stop()
+            self.sensor = None
+            self.renderer.submit({"sensor": ""})
+        self.start_sensor()
+        
     def load_settings(self):
         try:
             with open(self.settings_file, 'r') as f:
                 settings = json.load(f)
-                self.dark_mode = settings.get("dark_mode", True)
-                ctk.set_appearance_mode("dark" if self.dark_mode else "light")
+                if not isinstance(settings, dict):
+                    raise ValueError("expected a JSON object")
+                self.dark_mode = settings.get("dark_mode", self.dark_mode)
+                # Hand-edited rates are kept within what the display supports
+                self.tick_hz = clamp_rate(settings.get("tick_hz"), self.tick_hz)
+                self.max_fps = clamp_rate(settings.get("max_fps"), self.max_fps)
+                self.broadcast_address = settings.get("broadcast", self.broadcast_address)
+                self.sensor_spec = settings.get("sensor", self.sensor_spec)
         except FileNotFoundError:
             pass
-            
+        except (OSError, ValueError) as e:
+            # Defaults are used, and the next save replaces the broken file
+            print(f"Could not read settings from {self.settings_file}: {e}", file=sys.stderr)
+        ctk.set_appearance_mode("dark" if self.dark_mode else "light")
+        
     def save_settings(self):
         settings = {
-            "dark_mode": self.dark_mode
+            "dark_mode": self.dark_mode,
+            "tick_hz": self.tick_hz,
+            "max_fps": self.max_fps,
+            "broadcast": self.broadcast_address,
+            "sensor": self.sensor_spec
         }
-        with open(self.settings_file, 'w') as f:
-            json.dump(settings, f, indent=2)
+        # Queued; rapid toggles coalesce into one write
+        self.persist.replace(self.settings_file, json.dumps(settings, indent=2))
+        
+    def save_failed(self, what, error):
+        messagebox.showerror("Save Failed", f"Could not save {what}: {error}")
+        
+    def start_broadcast(self):
+        address = os.environ.get("HIIT_BROADCAST") or self.broadcast_address
+        if not address:
+            return
+        try:
+            host, port = parse_address(address)
+            self.broadcast = BroadcastServer(host, port).start()
+        except (OSError, ValueError) as e:
+            # The timer works fine without remote displays
+            print(f"Broadcast disabled: could not listen on {address}: {e}", file=sys.stderr)
+            self.broadcast = None
             
+    def start_sensor(self):
+        spec = os.environ.get("HIIT_SENSOR") or self.sensor_spec
+        if not spec:
+            return
+        try:
+            self.sensor = SensorReader(source_from_spec(spec))
+        except (OSError, ValueError) as e:
+            print(f"Sensor disabled: {spec}: {e}", file=sys.stderr)
+            return
+        # Samples can arrive at hundreds a second; the label gets one
+        # average a second, through the renderer like the countdown
+        self.sensor.subscribe(Downsampler(1.0, lambda start, bpm: self.renderer.submit({"sensor": f"♥ {bpm:.0f} bpm"})))
+        self.sensor.start()
+        
+    def track_segment_stats(self, engine):
+        # Starts collecting per-segment sensor stats for `engine`, or with
+        # None stops; returns the summary of the workout that was tracked
+        stats, self.segment_stats = self.segment_stats, None
+        if self.sensor is None:
+            return None
+        if stats is not None:
+            self.sensor.unsubscribe(stats)
+        if engine is not None:
+            self.segment_stats = self.sensor.subscribe(engine.subscribe(SegmentStats()))
+        return stats.summary() if stats is not None else None
+        
     def run(self):
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         self.root.mainloop()
         
     def on_closing(self):
         self.is_running = False
+        # Closed mid-workout: keep the checkpoint so it can be resumed
+        self.checkpoint.close()
+        if self.engine:
+            self.engine.stop()
+        self.stop_stations()
+        if self.broadcast:
+            self.broadcast.stop()
+        if self.sensor:
+            self.sensor.stop()
         self.save_settings()
+        if self.exporter and self.exporter.is_running:
+            # It reads from the history store, so it has to stop first; a
+            # cancelled export stops at the end of its current chunk
+            self.exporter.cancel()
+            self.exporter.join(1.0)
+        self.history_store.close()
+        self.audio.close()
+        hiit_metrics.shutdown()
+        # Last, so every write queued above reaches the disk
+        self.persist.close()
         self.root.destroy()
 
 def main():
@@ -0,0 +1,172 @@
+"""SessionCheckpoint: dual CRC'd slots, clearing and resuming."""
+import json
+
+import pytest
+
+import hiit_engine
+from hiit_checkpoint import FILE_SIZE, SLOT_SIZE, SessionCheckpoint, decode_slot, session_workout
+from hiit_engine import ManualClock, WorkoutEngine
+from hiit_persist import WriteBehind
+
+REPS = [{"name": "Work", "duration": 20}, {"name": "Rest", "duration": 10}]
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    return SessionCheckpoint(str(tmp_path / "hiit_session.ckpt"))
+
+
+def start_session(checkpoint, reps=REPS, sets=3):
+    clock = ManualClock()
+    engine = WorkoutEngine(reps, sets, clock=clock, sleep=clock.sleep, tick_interval=1.0)
+    engine.subscribe(checkpoint.begin(session_workout(reps, sets, name="Intervals")))
+    engine.start()
+    return engine, clock
+
+
+def advance(engine, clock, seconds):
+    for _ in range(int(seconds)):
+        clock.advance(1)
+        engine.poll()
+
+
+def slots(checkpoint):
+    with open(checkpoint.path, "rb") as f:
+        data = f.read()
+    assert len(data) == FILE_SIZE
+    return [decode_slot(data[i:i + SLOT_SIZE]) for i in (0, SLOT_SIZE)]
+
+
+def corrupt(checkpoint, slot):
+    with open(checkpoint.path, "r+b") as f:
+        f.seek(slot * SLOT_SIZE + 20)
+        byte = f.read(1)
+        f.seek(slot * SLOT_SIZE + 20)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+
+def test_interrupted_session_is_loaded(checkpoint):
+    engine, clock = start_session(checkpoint)
+    advance(engine, clock, 25)
+    checkpoint.close()
+    
+    saved = checkpoint.load()
+    assert saved.workout == {"sets": 3, "name": "Intervals", "reps": REPS}
+    assert (saved.segment_index, saved.elapsed, saved.paused) == (1, 25.0, False)
+
+
+def test_pause_is_recorded(checkpoint):
+    engine, clock = start_session(checkpoint)
+    advance(engine, clock, 3)
+    engine.pause()
+    checkpoint.close()
+    saved = checkpoint.load()
+    assert (saved.segment_index, saved.elapsed, saved.paused) == (0, 3.0, True)
+
+
+def test_newest_valid_slot_wins(checkpoint):
+    engine, clock = start_session(checkpoint)
+    advance(engine, clock, 12)
+    checkpoint.close()
+    first, second = slots(checkpoint)
+    assert first is not None and second is not None
+    assert abs(first[0] - second[0]) == 1
+    newest = max(first, second)
+    assert checkpoint.load().elapsed == newest[4] == 12.0
+
+
+def test_corrupt_newest_slot_falls_back_to_the_other(checkpoint):
+    engine, clock = start_session(checkpoint)
+    advance(engine, clock, 12)
+    checkpoint.close()
+    first, second = slots(checkpoint)
+    older = min(first, second)
+    corrupt(checkpoint, 0 if first > second else 1)
+    saved = checkpoint.load()
+    assert saved.elapsed == older[4] == 11.0
+    
+    corrupt(checkpoint, 0 if first < second else 1)
+    assert checkpoint.load() is None
+
+
+def test_torn_file_is_ignored(checkpoint):
+    engine, clock = start_session(checkpoint)
+    checkpoint.close()
+    with open(checkpoint.path, "r+b") as f:
+        f.truncate(SLOT_SIZE)
+    assert checkpoint.load() is None
+
+
+@pytest.mark.parametrize("finish", ["complete", "stop"])
+def test_finished_sessions_are_cleared(checkpoint, finish):
+    engine, clock = start_session(checkpoint, sets=1)
+    advance(engine, clock, 5)
+    if finish == "complete":
+        advance(engine, clock, 30)
+        assert engine.state == hiit_engine.COMPLETE
+    else:
+        engine.stop()
+    checkpoint.close()
+    assert checkpoint.load() is None
+
+
+def test_workout_file_from_another_session_is_rejected(checkpoint):
+    engine, clock = start_session(checkpoint)
+    advance(engine, clock, 5)
+    checkpoint.close()
+    with open(checkpoint.workout_path, "w") as f:
+        json.dump(session_workout(REPS, 4), f)
+    assert checkpoint.load() is None
+
+
+def test_old_checkpoints_expire(checkpoint):
+    engine, clock = start_session(checkpoint)
+    checkpoint.close()
+    assert checkpoint.load() is not None
+    assert checkpoint.load(max_age=-1) is None
+
+
+def test_listener_of_an_earlier_session_is_ignored(checkpoint):
+    engine, clock = start_session(checkpoint)
+    advance(engine, clock, 5)
+    # A new session begins while the old engine still has its listener
+    checkpoint.begin(session_workout([{"name": "Other", "duration": 5}], 1))
+    advance(engine, clock, 20)
+    checkpoint.close()
+    saved = checkpoint.load()
+    assert saved.workout["reps"] == [{"name": "Other", "duration": 5}]
+    assert saved.elapsed == 0.0
+
+
+def test_resume_from_the_saved_workout(checkpoint):
+    engine, clock = start_session(checkpoint)
+    advance(engine, clock, 47)
+    checkpoint.close()
+    saved = checkpoint.load()
+    
+    clock = ManualClock()
+    workout = saved.workout
+    resumed = WorkoutEngine(workout["reps"], workout["sets"], clock=clock, sleep=clock.sleep, tick_interval=None)
+    resumed.subscribe(checkpoint.begin(workout))
+    resumed.start(saved.elapsed)
+    assert (resumed.segment_index, resumed.segment.name, resumed.elapsed()) == (2, "Work", 47.0)
+    clock.advance(43)
+    resumed.poll()
+    assert resumed.state == hiit_engine.COMPLETE
+    checkpoint.close()
+    assert checkpoint.load() is None
+
+
+def test_writes_through_a_writer(tmp_path):
+    writer = WriteBehind()
+    try:
+        checkpoint = SessionCheckpoint(str(tmp_path / "hiit_session.ckpt"), writer=writer)
+        engine, clock = start_session(checkpoint)
+        advance(engine, clock, 8)
+        engine.pause()
+        checkpoint.close()
+        writer.flush(5)
+        saved = checkpoint.load()
+        assert (saved.segment_index, saved.elapsed, saved.paused) == (0, 8.0, True)
+    finally:
+        writer.close(5)
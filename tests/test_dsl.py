@@ -0,0 +1,140 @@
+"""Workout programs: compiled trees must agree with their expansion."""
+import pytest
+
+import hiit_engine
+from hiit_dsl import ProgramError, ProgramTimeline, compile_program, expand, program_names, workout_timeline
+from hiit_engine import ManualClock, WorkoutEngine
+from hiit_library import workout_rep_names
+
+PROGRAMS = {
+    "ladder": {"ladder": "Run", "from": 10, "to": 30, "step": 10, "rest": 15},
+    "pyramid": {"pyramid": "Burpees", "from": 10, "to": 40, "step": 10, "rest": {"name": "Walk", "duration": 15}},
+    "descending": {"ladder": "Row", "from": 50, "to": 20, "step": 15},
+    "repeat": {"repeat": 4, "do": [
+        {"name": "Sprint", "duration": 30},
+        {"name": "Rest", "duration": 60, "step": -10, "min": 20},
+    ]},
+    "emom": {"emom": 5, "work": [{"name": "Swings", "duration": 40}, {"name": "Push-ups", "duration": 60}]},
+    "nested": [
+        {"repeat": 2, "do": {"ladder": "Climb", "from": 5, "to": 15, "step": 5, "rest": {"name": "Shake", "duration": 10, "step": 5}}},
+        {"name": "Cool down", "duration": 90},
+    ],
+}
+
+
+def flat(program, sets=1):
+    return [(rep["name"], rep["duration"]) for rep in expand(program, sets)]
+
+
+def test_ladder_rungs_and_rests():
+    assert flat(PROGRAMS["ladder"]) == [("Run", 10), ("Rest", 15), ("Run", 20), ("Rest", 15), ("Run", 30)]
+
+
+def test_pyramid_goes_up_and_back_down():
+    durations = [duration for name, duration in flat(PROGRAMS["pyramid"]) if name == "Burpees"]
+    assert durations == [10, 20, 30, 40, 30, 20, 10]
+
+
+def test_descending_ladder():
+    assert flat(PROGRAMS["descending"]) == [("Row", 50), ("Row", 35), ("Row", 20)]
+
+
+def test_repeat_steps_each_round_within_its_bounds():
+    rests = [duration for name, duration in flat(PROGRAMS["repeat"]) if name == "Rest"]
+    assert rests == [60, 50, 40, 30]
+
+
+def test_emom_rotates_work_and_rests_out_the_minute():
+    assert flat(PROGRAMS["emom"]) == [
+        ("Swings", 40), ("Rest", 20), ("Push-ups", 60), ("Swings", 40), ("Rest", 20),
+        ("Push-ups", 60), ("Swings", 40), ("Rest", 20),
+    ]
+
+
+@pytest.mark.parametrize("name", sorted(PROGRAMS))
+@pytest.mark.parametrize("sets", [1, 3])
+def test_timeline_matches_the_expansion(name, sets):
+    program = PROGRAMS[name]
+    intervals = flat(program, sets)
+    timeline = ProgramTimeline(program, sets)
+    assert len(timeline) == len(intervals)
+    assert timeline.total == sum(duration for _, duration in intervals)
+    start = 0.0
+    for index, (rep_name, duration) in enumerate(intervals):
+        segment = timeline.segment(index)
+        assert (segment.name, segment.duration, segment.start) == (rep_name, duration, start)
+        assert timeline.offset(index) == start
+        assert timeline.index_at(start) == index
+        assert timeline.index_at(start + duration / 2) == index
+        start += duration
+    assert timeline.index_at(start) == len(timeline)
+    assert [tuple(segment) for segment in timeline] == [tuple(timeline.segment(i)) for i in range(len(timeline))]
+
+
+def test_huge_programs_are_not_expanded():
+    timeline = ProgramTimeline({"repeat": 10 ** 9, "do": [{"name": "Work", "duration": 20}, {"name": "Rest", "duration": 10}]})
+    assert len(timeline) == 2 * 10 ** 9
+    assert timeline.total == 30 * 10 ** 9
+    assert timeline.segment(len(timeline) - 1).name == "Rest"
+
+
+def test_engine_runs_a_program():
+    clock = ManualClock()
+    timeline = ProgramTimeline(PROGRAMS["ladder"], 2)
+    engine = WorkoutEngine([], 2, clock=clock, sleep=clock.sleep, tick_interval=None, timeline=timeline)
+    starts = []
+    engine.subscribe(lambda event: event.kind == hiit_engine.SEGMENT_START and starts.append((event.set_index, event.name)))
+    engine.run()
+    assert engine.state == hiit_engine.COMPLETE
+    assert clock.now == timeline.total
+    assert starts[:2] == [(0, "Run"), (0, "Rest")]
+    assert starts[5] == (1, "Run")
+
+
+def test_workout_timeline_picks_flat_reps_or_program():
+    assert len(workout_timeline({"sets": 2, "reps": [{"name": "A", "duration": 5}]})) == 2
+    assert len(workout_timeline({"sets": 2, "program": PROGRAMS["ladder"]})) == 10
+
+
+@pytest.mark.parametrize("program", [
+    [],
+    "Run",
+    {"name": "Run"},
+    {"name": "Run", "duration": 0},
+    {"name": "Run", "duration": True},
+    {"repeat": 0, "do": {"name": "Run", "duration": 5}},
+    {"repeat": 2},
+    {"ladder": "Run", "from": 10, "to": 30, "step": 0},
+    {"ladder": "", "from": 10, "to": 30, "step": 10},
+    {"emom": 3, "work": [{"name": "Row", "duration": 90}]},
+    {"emom": 3, "work": [{"name": "Row", "duration": 30, "step": 5}]},
+])
+def test_invalid_programs_raise_program_error(program):
+    with pytest.raises(ProgramError):
+        compile_program(program)
+
+
+def test_deep_nesting_is_rejected():
+    program = {"name": "Run", "duration": 5}
+    for _ in range(40):
+        program = {"repeat": 1, "do": program}
+    with pytest.raises(ProgramError):
+        compile_program(program)
+
+
+@pytest.mark.parametrize("name", sorted(PROGRAMS))
+def test_program_names_match_the_expansion(name):
+    program = PROGRAMS[name]
+    assert program_names(program) == list(dict.fromkeys(rep_name for rep_name, _ in flat(program)))
+
+
+def test_program_names_include_bare_number_rests_and_skip_unused_work():
+    assert program_names(PROGRAMS["ladder"]) == ["Run", "Rest"]
+    emom = {"emom": 1, "work": [{"name": "Swings", "duration": 60}, {"name": "Row", "duration": 30}]}
+    assert program_names(emom) == ["Swings"]
+
+
+def test_workout_rep_names_tolerates_broken_programs():
+    assert workout_rep_names({"program": PROGRAMS["ladder"]}) == ["Run", "Rest"]
+    assert workout_rep_names({"program": {"repeat": 0}}) == []
+    assert workout_rep_names({"reps": [{"name": "A", "duration": 5}]}) == ["A"]
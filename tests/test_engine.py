@@ -0,0 +1,206 @@
+"""WorkoutEngine on a ManualClock: no threads, no real time."""
+import pytest
+
+import hiit_engine
+from hiit_engine import ManualClock, WorkoutEngine, simulate_workout
+
+REPS = [{"name": "Work", "duration": 20}, {"name": "Rest", "duration": 10}]
+
+
+def make_engine(reps=REPS, sets=2, tick_interval=None):
+    clock = ManualClock()
+    engine = WorkoutEngine(reps, sets, clock=clock, sleep=clock.sleep, tick_interval=tick_interval)
+    events = []
+    engine.subscribe(events.append)
+    return engine, clock, events
+
+
+def kinds(events, *wanted):
+    return [event.kind for event in events if not wanted or event.kind in wanted]
+
+
+def test_simulate_runs_every_segment_in_order():
+    events = []
+    engine = simulate_workout(REPS, 2, listener=events.append)
+    starts = [event for event in events if event.kind == hiit_engine.SEGMENT_START]
+    assert [(e.set_index, e.rep_index, e.name) for e in starts] == [
+        (0, 0, "Work"), (0, 1, "Rest"), (1, 0, "Work"), (1, 1, "Rest"),
+    ]
+    assert [e.elapsed for e in starts] == [0.0, 20.0, 30.0, 50.0]
+    assert engine.state == hiit_engine.COMPLETE
+    assert kinds(events)[-1] == hiit_engine.COMPLETE_EVENT
+    assert events[-1].elapsed == 60.0
+    assert engine.active_time() == 60.0
+
+
+def test_ticks_follow_the_segment_grid():
+    events = []
+    simulate_workout([{"name": "Work", "duration": 3}], 1, tick_interval=1.0, listener=events.append)
+    ticks = [event for event in events if event.kind == hiit_engine.TICK]
+    assert [e.elapsed for e in ticks] == [0.0, 1.0, 2.0]
+    assert [e.remaining_seconds for e in ticks] == [3, 2, 1]
+
+
+def test_pause_freezes_the_workout_clock():
+    engine, clock, events = make_engine()
+    engine.start()
+    clock.advance(5)
+    engine.pause()
+    assert engine.is_paused
+    clock.advance(100)
+    engine.poll()
+    assert engine.elapsed() == 5.0
+    assert kinds(events, hiit_engine.SEGMENT_START) == [hiit_engine.SEGMENT_START]
+    
+    engine.resume()
+    clock.advance(15)
+    engine.poll()
+    assert engine.elapsed() == 20.0
+    assert engine.segment.name == "Rest"
+    assert kinds(events, hiit_engine.PAUSE, hiit_engine.RESUME) == [hiit_engine.PAUSE, hiit_engine.RESUME]
+    assert engine.active_time() == 20.0
+
+
+def test_pause_and_resume_only_act_when_they_apply():
+    engine, clock, events = make_engine()
+    engine.pause()
+    engine.start()
+    engine.resume()
+    engine.pause()
+    engine.pause()
+    engine.toggle_pause()
+    assert kinds(events, hiit_engine.PAUSE, hiit_engine.RESUME) == [hiit_engine.PAUSE, hiit_engine.RESUME]
+    assert engine.state == hiit_engine.RUNNING
+
+
+def test_skip_moves_to_the_next_segment():
+    engine, clock, events = make_engine()
+    engine.start()
+    clock.advance(4)
+    engine.skip()
+    assert engine.segment_index == 1
+    assert engine.elapsed() == 20.0
+    seek = [event for event in events if event.kind == hiit_engine.SEEK][0]
+    # The seek reports where the workout was, the segment start where it went
+    assert seek.elapsed == 4.0
+    assert events[-1].kind == hiit_engine.SEGMENT_START
+    assert events[-1].elapsed == 20.0
+
+
+def test_skip_past_the_last_segment_completes_with_the_time_trained():
+    engine, clock, events = make_engine(sets=1)
+    engine.start()
+    clock.advance(3)
+    engine.skip()
+    clock.advance(2)
+    engine.skip()
+    assert engine.state == hiit_engine.COMPLETE
+    assert events[-1].kind == hiit_engine.COMPLETE_EVENT
+    assert engine.active_time() == 5.0
+
+
+def test_back_restarts_the_segment_then_goes_to_the_previous_one():
+    engine, clock, events = make_engine()
+    engine.start()
+    clock.advance(25)
+    engine.poll()
+    assert engine.segment_index == 1
+    engine.back()
+    assert (engine.segment_index, engine.elapsed()) == (1, 20.0)
+    engine.back()
+    assert (engine.segment_index, engine.elapsed()) == (0, 0.0)
+    engine.back()
+    assert (engine.segment_index, engine.elapsed()) == (0, 0.0)
+    # Going back repeats work, so it counts again
+    clock.advance(60)
+    engine.poll()
+    assert engine.state == hiit_engine.COMPLETE
+    assert engine.active_time() == 85.0
+
+
+def test_seek_while_paused_stays_paused():
+    engine, clock, events = make_engine()
+    engine.start()
+    engine.pause()
+    engine.seek(35)
+    assert engine.is_paused
+    assert (engine.segment_index, engine.elapsed()) == (2, 35.0)
+    clock.advance(50)
+    engine.poll()
+    assert engine.elapsed() == 35.0
+
+
+def test_stop_emits_stop_and_ends_the_run():
+    engine, clock, events = make_engine()
+    engine.start()
+    clock.advance(7)
+    engine.stop()
+    assert engine.state == hiit_engine.STOPPED
+    assert events[-1].kind == hiit_engine.STOP
+    assert events[-1].elapsed == 7.0
+    clock.advance(100)
+    engine.poll()
+    engine.stop()
+    assert kinds(events, hiit_engine.STOP, hiit_engine.COMPLETE_EVENT) == [hiit_engine.STOP]
+    assert engine.active_time() == 7.0
+
+
+def test_run_returns_when_stopped_from_a_listener():
+    clock = ManualClock()
+    engine = WorkoutEngine(REPS, 3, clock=clock, sleep=clock.sleep, tick_interval=None)
+    
+    def stop_on_rest(event):
+        if event.kind == hiit_engine.SEGMENT_START and event.name == "Rest":
+            engine.stop()
+            
+    engine.subscribe(stop_on_rest)
+    engine.run()
+    assert engine.state == hiit_engine.STOPPED
+    assert clock.now == 20.0
+
+
+def test_zero_duration_segments_are_passed_through():
+    events = []
+    reps = [{"name": "Work", "duration": 5}, {"name": "Skip", "duration": 0}, {"name": "Rest", "duration": 5}]
+    engine = simulate_workout(reps, 1, listener=events.append)
+    starts = [(e.name, e.elapsed) for e in events if e.kind == hiit_engine.SEGMENT_START]
+    assert starts == [("Work", 0.0), ("Skip", 5.0), ("Rest", 5.0)]
+    assert engine.state == hiit_engine.COMPLETE
+
+
+@pytest.mark.parametrize("reps, sets", [([], 3), (REPS, 0), ([{"name": "Nothing", "duration": 0}], 1)])
+def test_empty_workouts_complete_immediately(reps, sets):
+    events = []
+    engine = simulate_workout(reps, sets, listener=events.append)
+    assert engine.state == hiit_engine.COMPLETE
+    assert kinds(events)[-1] == hiit_engine.COMPLETE_EVENT
+    assert events[-1].elapsed == 0.0
+
+
+def test_fractional_durations_do_not_drift():
+    events = []
+    reps = [{"name": "Work", "duration": 0.1}]
+    engine = simulate_workout(reps, 1000, listener=events.append)
+    starts = [e for e in events if e.kind == hiit_engine.SEGMENT_START]
+    assert len(starts) == 1000
+    assert starts[-1].elapsed == pytest.approx(99.9)
+    assert events[-1].kind == hiit_engine.COMPLETE_EVENT
+    assert engine.active_time() == pytest.approx(100.0)
+
+
+def test_fractional_ticks_land_on_the_grid():
+    events = []
+    simulate_workout([{"name": "Work", "duration": 1.5}], 1, tick_interval=0.25, listener=events.append)
+    ticks = [e.elapsed for e in events if e.kind == hiit_engine.TICK]
+    assert ticks == pytest.approx([0.25 * i for i in range(6)])
+
+
+def test_resume_part_way_counts_the_checkpointed_time():
+    engine, clock, events = make_engine()
+    engine.start(45)
+    assert engine.segment_index == 2
+    assert events[0].elapsed == 45.0
+    clock.advance(15)
+    engine.poll()
+    assert engine.state == hiit_engine.COMPLETE
+    assert engine.active_time() == 60.0
@@ -0,0 +1,113 @@
+"""History export in each format, and the shared time formatting."""
+import csv
+import json
+import threading
+
+import pytest
+
+from hiit_export import CANCELLED, CSV_COLUMNS, HistoryExporter, export_history, format_for_path
+from hiit_timeline import format_time
+
+REPS = [{"name": "Work", "duration": 20}, {"name": "Rest", "duration": 10}]
+PROGRAM = {"ladder": "Run", "from": 10, "to": 30, "step": 10}
+
+ENTRIES = [
+    {"date": "2026-03-01T09:00:00", "sets": 3, "reps": REPS, "total_time": 88},
+    {"date": "2026-03-02T18:30:05", "sets": 2, "reps": REPS, "total_time": 61.5,
+     "telemetry": [0, 128], "heart_rate": {"avg": 141, "max": 170}},
+    {"date": "2026-03-04T07:30:00", "sets": 1, "program": PROGRAM, "total_time": 3725},
+]
+
+
+def export(tmp_path, fmt, entries=ENTRIES):
+    path = tmp_path / f"history.{fmt}"
+    assert export_history(entries, str(path)) == len(entries)
+    return path.read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("seconds, text", [
+    (0, "00:00"),
+    (59.9, "00:59"),
+    (61.5, "01:01"),
+    (3599, "59:59"),
+    (3600, "01:00:00"),
+    (3725, "01:02:05"),
+    (-3, "00:00"),
+])
+def test_format_time(seconds, text):
+    assert format_time(seconds) == text
+
+
+@pytest.mark.parametrize("path, fmt", [("a.csv", "csv"), ("a.JSONL", "jsonl"), ("a.txt", "txt"), ("a.log", "txt"), ("a", "txt")])
+def test_format_follows_the_extension(path, fmt):
+    assert format_for_path(path) == fmt
+
+
+def test_text(tmp_path):
+    text = export(tmp_path, "txt")
+    assert text.startswith("HIIT Me Up - Workout History\n" + "=" * 40 + "\n\n")
+    entries = text.split("-" * 40 + "\n\n")
+    assert entries[-1] == ""
+    assert entries[0].endswith(
+        "Date: 2026-03-01 09:00:00\nSets: 3\nTotal Time: 01:28\n"
+        "Reps:\n  - Work: 20s\n  - Rest: 10s\n\n"
+    )
+    assert entries[1] == (
+        "Date: 2026-03-02 18:30:05\nSets: 2\nTotal Time: 01:01\n"
+        "Reps:\n  - Work: 20s\n  - Rest: 10s\n\n"
+    )
+    assert entries[2] == (
+        "Date: 2026-03-04 07:30:00\nSets: 1\nTotal Time: 01:02:05\n"
+        f"Program: {json.dumps(PROGRAM, separators=(',', ':'))}\n\n"
+    )
+
+
+def test_csv(tmp_path):
+    rows = list(csv.reader(export(tmp_path, "csv").splitlines()))
+    assert rows == [
+        CSV_COLUMNS,
+        ["2026-03-01T09:00:00", "3", "2", "88", "Work:20;Rest:10", ""],
+        ["2026-03-02T18:30:05", "2", "2", "61.5", "Work:20;Rest:10", ""],
+        ["2026-03-04T07:30:00", "1", "3", "3725", "", json.dumps(PROGRAM, separators=(",", ":"))],
+    ]
+
+
+def test_jsonl_keeps_every_field(tmp_path):
+    lines = export(tmp_path, "jsonl").splitlines()
+    assert [json.loads(line) for line in lines] == ENTRIES
+
+
+def test_cancelled_export_leaves_no_file(tmp_path):
+    path = tmp_path / "history.csv"
+    exporter = HistoryExporter(iter(ENTRIES * 10), str(path), chunk_size=5)
+    exporter.on_progress = lambda written, total: exporter.cancel()
+    assert exporter.run() == CANCELLED
+    assert exporter.written == 5
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_join_waits_for_a_cancelled_worker(tmp_path):
+    started = threading.Event()
+    
+    def entries():
+        while True:
+            started.set()
+            yield ENTRIES[0]
+            
+    exporter = HistoryExporter(entries(), str(tmp_path / "history.txt"), chunk_size=100)
+    exporter.start()
+    assert started.wait(5)
+    exporter.cancel()
+    exporter.join(5)
+    assert not exporter.is_running
+    assert exporter.status == CANCELLED
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_export_keeps_the_previous_file(tmp_path):
+    path = tmp_path / "history.txt"
+    path.write_text("previous export")
+    with pytest.raises(KeyError):
+        export_history(ENTRIES + [{"date": "2026-03-05T09:00:00"}], str(path))
+    assert path.read_text() == "previous export"
+    assert list(tmp_path.iterdir()) == [path]
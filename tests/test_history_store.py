@@ -0,0 +1,165 @@
+"""HistoryStore round trips through the sessions, template and extra files."""
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from hiit_history_store import RECORD, HistoryStore, extra_line_id
+from hiit_persist import WriteBehind
+
+REPS = [{"name": "Work", "duration": 20}, {"name": "Rest", "duration": 10}]
+
+
+def entry(day, hour=9, **extra):
+    return {"date": f"2026-03-{day:02d}T{hour:02d}:00:00", "sets": 3, "reps": REPS, "total_time": 88, **extra}
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / "hiit_history.jsonl")
+
+
+def open_store(journal, **kwargs):
+    return HistoryStore(journal, os.path.join(os.path.dirname(journal), "hiit_history.json"), fsync=False, **kwargs).open()
+
+
+def test_entries_round_trip_through_a_reopen(journal):
+    entries = [
+        entry(1),
+        entry(2, total_time=61.5),
+        entry(3, heart_rate={"avg": 141, "max": 170}),
+        {"date": "2026-03-04T07:30:00", "sets": 1, "program": {"ladder": "Run", "from": 10, "to": 30, "step": 10}, "total_time": 100},
+        entry(5, telemetry=[0, 128]),
+    ]
+    store = open_store(journal)
+    for e in entries:
+        store.append(e)
+    assert list(store) == entries
+    store.close()
+    
+    store = open_store(journal)
+    assert len(store) == len(entries)
+    assert list(store) == entries
+    assert store[-1] == entries[-1]
+    store.close()
+
+
+def test_each_workout_is_stored_once(journal):
+    store = open_store(journal)
+    for day in range(1, 21):
+        store.append(entry(day))
+    store.append({**entry(21), "reps": [{"name": "Other", "duration": 5}]})
+    store.close()
+    with open(store.templates_path) as f:
+        assert len(f.readlines()) == 2
+    assert os.path.getsize(store.path) == 21 * RECORD.size
+
+
+def test_journal_is_migrated_on_first_open(journal):
+    entries = [entry(1), entry(2, note="felt good"), entry(3)]
+    with open(journal, "w") as f:
+        f.writelines(json.dumps(e) + "\n" for e in entries)
+    store = open_store(journal)
+    assert list(store) == entries
+    assert os.path.exists(journal + ".migrated")
+    assert not os.path.exists(journal)
+    store.close()
+
+
+def test_back_dated_sessions_are_selected_in_date_order(journal):
+    store = open_store(journal)
+    for day in (1, 5, 3, 9, 2):
+        store.append(entry(day))
+        
+    def dates(lo, hi):
+        return [store[store.row_at(pos)]["date"][:10] for pos in range(lo, hi)]
+        
+    assert dates(*store.select()) == ["2026-03-01", "2026-03-02", "2026-03-03", "2026-03-05", "2026-03-09"]
+    assert dates(*store.select(datetime(2026, 3, 2), datetime(2026, 3, 6))) == ["2026-03-02", "2026-03-03", "2026-03-05"]
+    store.close()
+    
+    store = open_store(journal)
+    assert dates(*store.select()) == ["2026-03-01", "2026-03-02", "2026-03-03", "2026-03-05", "2026-03-09"]
+    store.close()
+
+
+def test_extras_are_read_by_offset_and_ids_keep_counting(journal):
+    store = open_store(journal)
+    for day in range(1, 6):
+        store.append(entry(day, heart_rate={"avg": 100 + day}))
+    store.close()
+    
+    store = open_store(journal)
+    store.load_extras()
+    assert store[2]["heart_rate"] == {"avg": 103}
+    store.append(entry(6, heart_rate={"avg": 106}))
+    # The new extra is readable before and after the reopen, under a fresh id
+    assert store[5]["heart_rate"] == {"avg": 106}
+    store.close()
+    store = open_store(journal)
+    assert [e["heart_rate"]["avg"] for e in store] == [101, 102, 103, 104, 105, 106]
+    with open(store.extra_path, "rb") as f:
+        assert [extra_line_id(line) for line in f] == [1, 2, 3, 4, 5, 6]
+    store.close()
+
+
+def test_unreadable_extra_lines_are_skipped(journal):
+    store = open_store(journal)
+    store.append(entry(1, note="kept"))
+    store.append(entry(2, note="lost"))
+    store.close()
+    with open(store.extra_path, "rb") as f:
+        lines = f.readlines()
+    with open(store.extra_path, "wb") as f:
+        f.write(lines[0] + b"not json\n" + lines[1][:10])
+    store = open_store(journal)
+    assert store[0]["note"] == "kept"
+    assert "note" not in store[1]
+    store.close()
+
+
+def test_extra_line_id():
+    assert extra_line_id(b'{"id":42,"note":"x"}\n') == 42
+    assert extra_line_id(b'{"note":"x","id":7}\n') == 7
+    assert extra_line_id(b'{"id":"7"}\n') is None
+    assert extra_line_id(b"garbage\n") is None
+
+
+def test_torn_record_is_dropped(journal):
+    store = open_store(journal)
+    store.append(entry(1))
+    store.append(entry(2))
+    store.close()
+    with open(store.path, "ab") as f:
+        f.write(b"\0" * (RECORD.size // 2))
+    store = open_store(journal)
+    assert len(store) == 2
+    assert os.path.getsize(store.path) == 2 * RECORD.size
+    store.close()
+
+
+def test_close_allows_reopening_and_is_idempotent(journal):
+    store = open_store(journal)
+    store.append(entry(1, note="a"))
+    store.close()
+    store.close()
+    assert len(store) == 0
+    store.open()
+    assert list(store) == [entry(1, note="a")]
+    store.close()
+
+
+def test_writes_through_a_writer_land_after_flush(journal):
+    writer = WriteBehind()
+    try:
+        store = open_store(journal, writer=writer)
+        store.append(entry(1, note="queued"))
+        assert store[0]["note"] == "queued"
+        writer.flush()
+        store.close()
+        store = open_store(journal)
+        assert list(store) == [entry(1, note="queued")]
+        store.close()
+    finally:
+        writer.close()
@@ -0,0 +1,132 @@
+"""WriteBehind ordering, coalescing and shutdown, and atomic_write."""
+import os
+import threading
+
+import pytest
+
+from hiit_persist import WriteBehind
+from hiit_storage import atomic_write
+
+
+@pytest.fixture
+def writer():
+    writer = WriteBehind()
+    yield writer
+    writer.close(timeout=5)
+
+
+def block(writer):
+    # Holds the worker inside a job until the returned event is set
+    entered, release = threading.Event(), threading.Event()
+    
+    def wait():
+        entered.set()
+        release.wait(5)
+        
+    writer.submit(wait, description="block")
+    assert entered.wait(5)
+    return release
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_queued_replaces_of_one_path_coalesce(writer, tmp_path):
+    path = str(tmp_path / "settings.json")
+    release = block(writer)
+    for i in range(10):
+        writer.replace(path, f"version {i}", fsync=False)
+    # The blocked job and a single replace
+    assert writer.pending == 2
+    release.set()
+    assert writer.flush(5)
+    assert read(path) == "version 9"
+
+
+def test_replaces_of_different_paths_are_kept(writer, tmp_path):
+    release = block(writer)
+    writer.replace(str(tmp_path / "a"), "a", fsync=False)
+    writer.replace(str(tmp_path / "b"), "b", fsync=False)
+    writer.replace(str(tmp_path / "a"), "a2", fsync=False)
+    assert writer.pending == 3
+    release.set()
+    writer.flush(5)
+    assert (read(str(tmp_path / "a")), read(str(tmp_path / "b"))) == ("a2", "b")
+
+
+def test_appends_and_submits_run_in_queue_order(writer, tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    seen = []
+    release = block(writer)
+    writer.append(path, "one", fsync=False)
+    writer.submit(lambda: seen.append(read(path)))
+    writer.append(path, "two", fsync=False)
+    writer.submit(lambda: seen.append(read(path)))
+    release.set()
+    writer.flush(5)
+    assert seen == ["one\n", "one\ntwo\n"]
+
+
+def test_flush_times_out_while_a_write_is_running(writer):
+    release = block(writer)
+    assert not writer.flush(0.05)
+    release.set()
+    assert writer.flush(5)
+    assert writer.pending == 0
+
+
+def test_close_drains_the_queue_then_writes_synchronously(tmp_path):
+    writer = WriteBehind()
+    path = str(tmp_path / "late.txt")
+    threads = []
+    release = block(writer)
+    writer.submit(lambda: threads.append(threading.current_thread()))
+    threading.Timer(0.05, release.set).start()
+    assert writer.close(5)
+    assert threads[0] is not threading.current_thread()
+    
+    writer.submit(lambda: threads.append(threading.current_thread()))
+    assert threads[1] is threading.current_thread()
+    writer.replace(path, "after close", fsync=False)
+    assert read(path) == "after close"
+
+
+def test_failed_writes_go_to_on_error(tmp_path):
+    errors = []
+    writer = WriteBehind(on_error=lambda what, error: errors.append((what, type(error))))
+    writer.append(str(tmp_path / "missing" / "file.jsonl"), "line", fsync=False)
+    writer.submit(lambda: 1 / 0, description="history")
+    writer.submit(lambda: None)
+    writer.close(5)
+    assert errors == [("file.jsonl", FileNotFoundError), ("history", ZeroDivisionError)]
+
+
+def test_failed_writes_without_on_error_are_printed(tmp_path, capsys):
+    writer = WriteBehind()
+    writer.close()
+    writer.submit(lambda: 1 / 0, description="settings")
+    assert "Could not save settings" in capsys.readouterr().err
+
+
+def test_atomic_write_replaces_the_whole_file(tmp_path):
+    path = str(tmp_path / "data.bin")
+    atomic_write(path, b"\x00\x01", fsync=False)
+    atomic_write(path, "text", fsync=False)
+    assert read(path) == "text"
+    assert os.listdir(str(tmp_path)) == ["data.bin"]
+
+
+def test_atomic_write_that_fails_leaves_the_old_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "settings.json")
+    atomic_write(path, "old", fsync=False)
+    
+    def fail(src, dst):
+        raise OSError("disk full")
+        
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        atomic_write(path, "new", fsync=False)
+    assert read(path) == "old"
+    assert os.listdir(str(tmp_path)) == ["settings.json"]
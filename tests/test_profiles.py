@@ -0,0 +1,141 @@
+"""ProfileDirectory: sharded member directories and the lazy name index."""
+import json
+import os
+import shutil
+import types
+
+import pytest
+
+from hiit_persist import WriteBehind
+from hiit_profiles import DEFAULT_ID, DEFAULT_NAME, ProfileDirectory
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return ProfileDirectory(str(tmp_path))
+
+
+def test_without_profiles_everything_is_default(directory, tmp_path):
+    assert directory.active() == directory.default()
+    assert directory.default().path == str(tmp_path)
+    assert [profile.name for profile in directory.profiles()] == [DEFAULT_NAME]
+    assert len(directory) == 0
+
+
+def test_profiles_live_in_sharded_directories(directory, tmp_path):
+    profile = directory.create("  Ana Lopez ")
+    assert profile.name == "Ana Lopez"
+    assert profile.path == os.path.join(str(tmp_path), "profiles", profile.id[:2], profile.id)
+    assert os.path.isdir(profile.path)
+    assert profile.file("hiit_settings.json") == os.path.join(profile.path, "hiit_settings.json")
+
+
+@pytest.mark.parametrize("name", ["", "   ", "default", "ANA LOPEZ"])
+def test_create_rejects_empty_and_taken_names(directory, name):
+    directory.create("Ana Lopez")
+    with pytest.raises(ValueError):
+        directory.create(name)
+
+
+def test_rename_rejects_taken_names_but_not_its_own(directory):
+    ana = directory.create("Ana Lopez")
+    bo = directory.create("Bo Chen")
+    for name in ["ana lopez", "Default", " "]:
+        with pytest.raises(ValueError):
+            directory.rename(bo, name)
+    with pytest.raises(ValueError):
+        directory.rename(directory.default(), "Someone")
+    assert directory.rename(ana, "ANA LOPEZ").name == "ANA LOPEZ"
+    assert [profile.name for profile in directory.profiles()] == [DEFAULT_NAME, "ANA LOPEZ", "Bo Chen"]
+
+
+def test_index_is_replayed_lazily_after_reopening(directory, tmp_path):
+    ana = directory.create("Ana Lopez")
+    bo = directory.create("Bo Chen")
+    directory.rename(bo, "Bo Chen-Wu")
+    
+    reopened = ProfileDirectory(str(tmp_path))
+    assert reopened._names is None
+    assert [(profile.id, profile.name) for profile in reopened.profiles()] == [
+        (DEFAULT_ID, DEFAULT_NAME), (ana.id, "Ana Lopez"), (bo.id, "Bo Chen-Wu"),
+    ]
+    with open(reopened.index_path) as f:
+        assert len(f.readlines()) == 3
+
+
+def test_search_matches_names_and_words_by_prefix(directory):
+    for name in ["Ana Lopez", "Bo Chen", "Lou Reed", "Chen Li"]:
+        directory.create(name)
+    assert [profile.name for profile in directory.search("lo")] == ["Ana Lopez", "Lou Reed"]
+    assert [profile.name for profile in directory.search("CHEN")] == ["Bo Chen", "Chen Li"]
+    assert [profile.name for profile in directory.search("def")] == [DEFAULT_NAME]
+    assert directory.search("zz") == []
+    assert len(directory.search("", limit=2)) == 2
+    # Renames reach the search keys
+    directory.rename(directory.search("lou")[0], "Lou Zhang")
+    assert [profile.name for profile in directory.search("zh")] == ["Lou Zhang"]
+
+
+def test_activate_persists_the_active_profile(directory, tmp_path):
+    ana = directory.create("Ana Lopez")
+    directory.activate(ana)
+    assert ProfileDirectory(str(tmp_path)).active() == ana
+    directory.activate(directory.default())
+    assert ProfileDirectory(str(tmp_path)).active() == directory.default()
+
+
+def test_active_falls_back_to_default(directory, tmp_path):
+    ana = directory.create("Ana Lopez")
+    directory.activate(ana)
+    shutil.rmtree(ana.path)
+    assert directory.active() == directory.default()
+    with open(directory.active_path, "w") as f:
+        f.write("not json")
+    assert directory.active() == directory.default()
+
+
+def test_writes_through_a_writer(tmp_path):
+    writer = WriteBehind()
+    try:
+        directory = ProfileDirectory(str(tmp_path), writer=writer)
+        ana = directory.create("Ana Lopez")
+        directory.activate(ana)
+        writer.flush()
+        reopened = ProfileDirectory(str(tmp_path))
+        assert reopened.active() == ana
+        assert [profile.name for profile in reopened.profiles()] == [DEFAULT_NAME, "Ana Lopez"]
+    finally:
+        writer.close()
+
+
+def test_settings_stay_with_their_profile(directory):
+    # The app's own settings code, run against plain attributes
+    app_module = pytest.importorskip("hiit_timer_app")
+    HIITTimer = app_module.HIITTimer
+    default = directory.default()
+    ana = directory.create("Ana Lopez")
+    with open(default.file("hiit_settings.json"), "w") as f:
+        json.dump({"dark_mode": False, "tick_hz": 50, "max_fps": 55, "broadcast": ":8765", "sensor": "sim"}, f)
+        
+    app = types.SimpleNamespace(settings_file=default.file("hiit_settings.json"))
+    HIITTimer.reset_settings(app)
+    HIITTimer.load_settings(app)
+    assert (app.dark_mode, app.tick_hz, app.max_fps, app.broadcast_address, app.sensor_spec) == (False, 50, 55, ":8765", "sim")
+    
+    # What switch_profile does for a member who never saved settings
+    app.settings_file = ana.file("hiit_settings.json")
+    HIITTimer.reset_settings(app)
+    HIITTimer.load_settings(app)
+    assert (app.dark_mode, app.tick_hz, app.max_fps, app.broadcast_address, app.sensor_spec) == (True, 10, 30, None, None)
+
+
+@pytest.mark.parametrize("content", ["[]", "1", '"dark"', "null", "{not json"])
+def test_unreadable_settings_fall_back_to_defaults(tmp_path, capsys, content):
+    app_module = pytest.importorskip("hiit_timer_app")
+    path = tmp_path / "hiit_settings.json"
+    path.write_text(content)
+    app = types.SimpleNamespace(settings_file=str(path))
+    app_module.HIITTimer.reset_settings(app)
+    app_module.HIITTimer.load_settings(app)
+    assert (app.dark_mode, app.tick_hz, app.max_fps, app.broadcast_address, app.sensor_spec) == (True, 10, 30, None, None)
+    assert "Could not read settings" in capsys.readouterr().err
@@ -0,0 +1,133 @@
+"""Telemetry encodes a session once and replays it the same way every time."""
+import pytest
+
+import hiit_engine
+from hiit_engine import ManualClock, WorkoutEngine
+from hiit_telemetry import (
+    VERSION, TelemetryLog, TelemetryRecorder, read_varint, rebuild, replay, unzigzag, write_varint, zigzag,
+)
+
+REPS = [{"name": "Work", "duration": 20}, {"name": "Rest", "duration": 10}]
+
+
+def recorded_session(sets=2):
+    clock = ManualClock()
+    engine = WorkoutEngine(REPS, sets, clock=clock, sleep=clock.sleep, tick_interval=1.0)
+    recorder = TelemetryRecorder(clock=clock)
+    engine.subscribe(recorder)
+    return engine, clock, recorder
+
+
+@pytest.mark.parametrize("n", [0, 1, -1, 63, -64, 2 ** 40, -(2 ** 40)])
+def test_zigzag_round_trips(n):
+    assert zigzag(n) >= 0
+    assert unzigzag(zigzag(n)) == n
+
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 2 ** 35])
+def test_varint_round_trips(value):
+    buffer = bytearray(b"x")
+    write_varint(buffer, value)
+    assert read_varint(buffer, 1) == (value, len(buffer))
+
+
+def test_truncated_varint_is_an_error():
+    with pytest.raises(ValueError):
+        read_varint(bytes([0x80, 0x80]), 0)
+
+
+def test_an_uninterrupted_run_replays_its_segments():
+    engine, clock, recorder = recorded_session()
+    engine.run()
+    events = replay(recorder.encode())
+    kinds = [event.kind for event in events]
+    assert kinds == [hiit_engine.SEGMENT_START] * 4 + [hiit_engine.COMPLETE_EVENT]
+    assert [event.time for event in events] == [0.0, 20.0, 30.0, 50.0, 60.0]
+    assert [event.segment_index for event in events[:4]] == [0, 1, 2, 3]
+    # Ticks are not recorded
+    assert recorder.events == 5
+    
+    trace = rebuild(recorder.encode())
+    assert trace.completed
+    assert trace.duration == 60.0
+    assert [(run.index, run.active, run.skipped) for run in trace.segments] == [
+        (0, 20.0, False), (1, 10.0, False), (2, 20.0, False), (3, 10.0, False),
+    ]
+    assert trace.pauses == []
+
+
+def test_pauses_and_skips_are_rebuilt():
+    engine, clock, recorder = recorded_session()
+    engine.start()
+    clock.advance(5)
+    engine.poll()
+    engine.pause()
+    clock.advance(30)
+    engine.resume()
+    clock.advance(3.25)
+    engine.poll()
+    engine.skip()
+    clock.advance(4)
+    engine.poll()
+    engine.stop()
+    
+    trace = rebuild(recorder.encode())
+    assert not trace.completed
+    assert trace.paused == 30.0
+    assert [(pause.start, pause.duration, pause.segment_index) for pause in trace.pauses] == [(5.0, 30.0, 0)]
+    first, second = trace.segments
+    assert (first.index, first.paused, first.active, first.skipped) == (0, 30.0, 8.25, True)
+    assert first.elapsed_end == pytest.approx(8.25)
+    assert (second.index, second.active, second.skipped) == (1, 4.0, False)
+    assert trace.duration == pytest.approx(42.25)
+
+
+def test_pause_still_running_at_stop_is_closed():
+    engine, clock, recorder = recorded_session()
+    engine.start()
+    clock.advance(2)
+    engine.pause()
+    clock.advance(10)
+    engine.stop()
+    trace = rebuild(recorder.encode())
+    assert trace.paused == 10.0
+    assert trace.segments[0].active == 2.0
+
+
+def test_times_round_against_the_session_start_without_drift():
+    clock = ManualClock()
+    engine = WorkoutEngine([{"name": "Work", "duration": 0.0013}], 5000, clock=clock, sleep=clock.sleep, tick_interval=None)
+    recorder = TelemetryRecorder(clock=clock)
+    engine.subscribe(recorder)
+    engine.run()
+    events = replay(recorder.encode())
+    assert events[-1].kind == hiit_engine.COMPLETE_EVENT
+    assert events[-1].time == pytest.approx(6.5, abs=0.001)
+    assert events[-1].elapsed == pytest.approx(6.5, abs=0.001)
+
+
+@pytest.mark.parametrize("data", [b"", bytes([VERSION + 1]), bytes([VERSION, 7, 0, 0]), bytes([VERSION, 0x80])])
+def test_bad_data_is_rejected(data):
+    with pytest.raises(ValueError):
+        replay(data)
+
+
+def test_log_addresses_sessions_by_offset(tmp_path):
+    log = TelemetryLog(str(tmp_path / "hiit_history.telemetry"), fsync=False)
+    first = log.append(b"\x01abc")
+    second = log.append(b"\x01defgh")
+    assert first == [0, 4]
+    assert second == [4, 6]
+    assert log.read(second) == b"\x01defgh"
+    assert log.read([8, 100]) is None
+    
+    # A new log on the same file keeps appending after what is there
+    assert TelemetryLog(log.path, fsync=False).append(b"\x01") == [10, 1]
+
+
+def test_recorded_session_survives_the_log(tmp_path):
+    engine, clock, recorder = recorded_session(sets=1)
+    engine.run()
+    log = TelemetryLog(str(tmp_path / "hiit_history.telemetry"), fsync=False)
+    ref = log.append(recorder.encode())
+    assert rebuild(log.read(ref)) == rebuild(recorder.encode())